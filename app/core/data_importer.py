@@ -1,10 +1,9 @@
 import pandas as pd
-import sqlalchemy as sa
-from sqlalchemy import create_engine, text
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 from app.core.database import DatabaseManager
 from app.utils.config import config
+from app.utils import metrics
 from app.utils.logger import logger
 
 
@@ -15,8 +14,11 @@ class ExternalDBImporter:
         self.external_engine = None
         self.local_db = DatabaseManager()
 
+    @metrics.timed('import.connect')
     def connect_external(self, db_type, host, port, user, password, db_name):
         """Создает подключение к БД в зависимости от типа"""
+        # sqlalchemy нужен только для импорта из внешней БД - не грузим его при старте
+        from sqlalchemy import create_engine, text
         try:
             if db_type == "PostgreSQL":
                 # Нужен: pip install psycopg2-binary
@@ -39,8 +41,10 @@ class ExternalDBImporter:
             logger.error(f"Ошибка подключения к внешней БД: {e}")
             return False
 
+    @metrics.timed('import.batches')
     def import_good_batches(self, days_back: int = 30, min_extraction: float = 85.0):
         """Импорт успешных партий. SQL адаптирован под универсальность"""
+        from sqlalchemy import text
         try:
             if not self.external_engine:
                 raise ValueError("Нет подключения к внешней БД")
@@ -78,8 +82,10 @@ class ExternalDBImporter:
             logger.error(f"Ошибка импорта партий: {e}")
             return 0
 
+    @metrics.timed('import.process_data')
     def import_process_data(self, batch_id: str):
         """Метод остается почти как был, но с защитой от пустых данных"""
+        from sqlalchemy import text
         try:
             query = text("SELECT * FROM process_history WHERE batch_id = :batch_id")
 
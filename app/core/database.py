@@ -1,13 +1,47 @@
 # app/core/database.py
+from __future__ import annotations
+
 import sqlite3
-import pandas as pd
+import threading
+import weakref
+from contextlib import nullcontext
+import numpy as np
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import TYPE_CHECKING, List, Dict, Optional, Any, Sequence
 from datetime import datetime
 import logging
+from app.core import feature_store
+from app.core import query_advisor
+from app.core.query_cache import QueryCache, is_cacheable, make_key
+from app.core.query_guard import QueryGuard
+from app.core.schema_cache import Schema, schema_cache
+from app.utils import tracing
+from app.utils import metrics
 from app.utils.config import config
 from app.utils.logger import logger
 
+# pandas (~0.5 с при холодном старте) импортируется в методах при первом чтении данных
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class _ThreadConnection:
+    """
+    Соединение фонового потока в threading.local. Когда поток завершается, Python
+    очищает его локальные данные, и финализатор закрывает соединение - иначе пул
+    потоков, который пересоздает простаивающие потоки, копил бы открытые соединения.
+    """
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn):
+        self.conn = conn
+
+
+def _release_thread_connection(connections, lock, conn):
+    with lock:
+        connections.discard(conn)
+    conn.close()
+
 
 class DatabaseManager:
     """Менеджер базы данных"""
@@ -16,8 +50,22 @@ class DatabaseManager:
         self.db_path = db_path or config.base_dir / 'data' / 'database.db'
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self.connection = None
+        # Соединения фоновых потоков (по одному на поток, см. get_connection)
+        self._local = threading.local()
+        self._thread_connections = set()
+        self._thread_lock = threading.Lock()
+        # Кэш результатов execute_query: действителен, пока не изменились данные
+        # (data_version по отдельному соединению) и не было записи через execute_query
+        self.query_cache = QueryCache()
+        self._probe = None
+        self._probe_lock = threading.Lock()
+        self._write_generation = 0
+        # Устаревшие признаки (старая схема, данные в обход add_process_data) пересчитываются
+        # один раз - при первом чтении матриц и после записи произвольным SQL (execute_query)
+        self._features_fresh = False
         self._init_database()
 
+    @tracing.traced(cat='db')
     def _init_database(self):
         """Инициализация структуры базы данных"""
         try:
@@ -65,30 +113,70 @@ class DatabaseManager:
                 )
                 ''')
 
+                # Таблица 3: Производные признаки для модели (матрицы по партиям)
+                conn.execute('''
+                CREATE TABLE IF NOT EXISTS batch_features (
+                    batch_id TEXT PRIMARY KEY,
+                    schema_version INTEGER NOT NULL,
+                    n_rows INTEGER NOT NULL,
+                    n_features INTEGER NOT NULL,
+                    features BLOB NOT NULL,
+                    targets BLOB NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (batch_id) REFERENCES batches(batch_id)
+                )
+                ''')
+
                 # Индексы
                 conn.execute(
                     'CREATE INDEX IF NOT EXISTS idx_batch_composition ON batches(ni_percent, cu_percent, pt_percent, pd_percent)')
                 conn.execute('CREATE INDEX IF NOT EXISTS idx_process_batch_time ON process_data(batch_id, timestamp)')
                 conn.execute('CREATE INDEX IF NOT EXISTS idx_process_sfr ON process_data(sulfate_number)')
+                # Под постраничный реестр партий: порядок (дата, id), в т.ч. внутри аппарата
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_batches_date_id ON batches(extraction_date, batch_id)')
+                conn.execute(
+                    'CREATE INDEX IF NOT EXISTS idx_batches_sfr_date_id ON batches(sulfate_number, extraction_date, batch_id)')
 
                 logger.info("База данных инициализирована: sulfate_number добавлен в процессные данные")
         except Exception as e:
             logger.error(f"Ошибка инициализации БД: {e}")
             raise
 
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False
+        )
+        # Включение поддержки внешних ключей
+        conn.execute("PRAGMA foreign_keys = ON")
+        # Журнал запросов для советника по индексам (если включен EXPERT_SQL_CAPTURE)
+        query_advisor.capture(conn)
+        return conn
+
     def get_connection(self):
-        """Получение соединения с БД"""
-        if self.connection is None:
-            self.connection = sqlite3.connect(
-                self.db_path,
-                check_same_thread=False
-            )
-            # Включение поддержки внешних ключей
-            self.connection.execute("PRAGMA foreign_keys = ON")
-        return self.connection
+        """
+        Получение соединения с БД. GUI-поток работает через общее соединение,
+        фоновые потоки (загрузка данных для экранов) получают собственное -
+        одно sqlite3-соединение нельзя использовать из нескольких потоков одновременно.
+        """
+        if threading.current_thread() is threading.main_thread():
+            if self.connection is None:
+                self.connection = self._connect()
+            return self.connection
+
+        holder = getattr(self._local, 'connection', None)
+        if holder is None:
+            holder = self._local.connection = _ThreadConnection(self._connect())
+            with self._thread_lock:
+                self._thread_connections.add(holder.conn)
+            weakref.finalize(holder, _release_thread_connection,
+                             self._thread_connections, self._thread_lock, holder.conn)
+        return holder.conn
 
+    @metrics.timed('db.write.add_batch')
     def add_batch(self, batch_data: Dict):
         """Добавление информации о партии в таблицу batches"""
+        import pandas as pd
         try:
             # Чистка от NaN
             clean_data = {k: (None if pd.isna(v) or v == "" else v) for k, v in batch_data.items()}
@@ -107,11 +195,14 @@ class DatabaseManager:
                 '''
                 conn.execute(query, clean_data)
                 conn.commit()
+                tracing.count('db.rows_written')
+                metrics.inc('db.rows_written')
                 logger.info(f"Партия {clean_data['batch_id']} успешно сохранена.")
         except Exception as e:
             logger.error(f"Ошибка сохранения партии {batch_data.get('batch_id')}: {e}")
             raise
 
+    @metrics.timed('db.read.all_batches')
     def get_all_batches(self):
         """Возвращает список всех партий из базы для анализа рекомендателем"""
         query = "SELECT * FROM batches"
@@ -119,12 +210,62 @@ class DatabaseManager:
             import sqlite3
             import pandas as pd
             with sqlite3.connect(self.db_path) as conn:
+                query_advisor.capture(conn)
                 df = pd.read_sql_query(query, conn)
+                tracing.count('db.rows_read', len(df))
+                metrics.inc('db.rows_read', len(df))
                 return df.to_dict('records')  # Превращаем в список словарей
         except Exception as e:
             print(f"Ошибка при получении всех партий: {e}")
             return []
 
+    @metrics.timed('db.read.query_batches')
+    def query_batches(self, sulfate_number: Optional[int] = None, min_mass: float = 0.0,
+                      min_extraction: float = 0.0, after: Optional[tuple] = None,
+                      limit: int = 500):
+        """
+        Страница реестра партий с фильтрами на стороне SQL.
+
+        Сортировка от новых к старым по (extraction_date, batch_id); after - ключ
+        последней строки предыдущей страницы (keyset-пагинация без OFFSET).
+        Возвращает (DataFrame, ключ для следующей страницы или None).
+        """
+        import pandas as pd
+        conditions = ["sample_weight >= ?", "extraction_percent >= ?"]
+        params = [min_mass, min_extraction]
+
+        if sulfate_number is not None:
+            conditions.append("sulfate_number = ?")
+            params.append(sulfate_number)
+
+        if after is not None:
+            conditions.append("(extraction_date, batch_id) < (?, ?)")
+            params.extend(after)
+
+        query = f'''
+        SELECT * FROM batches
+        WHERE {' AND '.join(conditions)}
+        ORDER BY extraction_date DESC, batch_id DESC
+        LIMIT ?
+        '''
+        params.append(limit)
+
+        try:
+            with self.get_connection() as conn:
+                df = pd.read_sql_query(query, conn, params=params)
+
+            tracing.count('db.rows_read', len(df))
+            metrics.inc('db.rows_read', len(df))
+            next_key = None
+            if len(df) == limit:
+                last = df.iloc[-1]
+                next_key = (last['extraction_date'], last['batch_id'])
+            return df, next_key
+        except Exception as e:
+            logger.error(f"Ошибка выборки партий: {e}")
+            return pd.DataFrame(), None
+
+    @metrics.timed('db.write.process_data')
     def add_process_data(self, batch_id: str, sulfate_number: int, process_records: List[Dict]) -> bool:
         try:
             with self.get_connection() as conn:
@@ -153,16 +294,23 @@ class DatabaseManager:
                     )
                     cursor.execute(sql, params)
 
+                # Признаки пересчитываются один раз здесь, а не при каждом обучении/прогнозе
+                self._refresh_batch_features(conn, batch_id)
+
                 conn.commit()
+                tracing.count('db.rows_written', len(process_records))
+                metrics.inc('db.rows_written', len(process_records))
                 logger.info(f"Добавлено {len(process_records)} записей для партии {batch_id} (СФР-{sulfate_number})")
                 return True
         except Exception as e:
             logger.error(f"Ошибка добавления процессных данных для {batch_id}: {e}")
             return False
 
+    @metrics.timed('db.read.similar_batches')
     def find_similar_batches(self, sample_data: Dict[str, float],
                              limit: int = 10) -> pd.DataFrame:
         """Поиск похожих партий по составу"""
+        import pandas as pd
         try:
             with self.get_connection() as conn:
                 query = '''
@@ -191,8 +339,11 @@ class DatabaseManager:
             logger.error(f"Ошибка поиска похожих партий: {e}")
             return pd.DataFrame()
 
+    @metrics.timed('db.read.process_data')
+    @tracing.traced(cat='db')
     def get_process_data(self, batch_id: str) -> pd.DataFrame:
         """Получение процессных данных по номеру партии"""
+        import pandas as pd
         try:
             with self.get_connection() as conn:
                 query = '''
@@ -202,35 +353,191 @@ class DatabaseManager:
                 '''
 
                 df = pd.read_sql_query(query, conn, params=[batch_id])
+                tracing.count('db.rows_read', len(df))
+                metrics.inc('db.rows_read', len(df))
                 return df
 
         except Exception as e:
             logger.error(f"Ошибка получения процессных данных: {e}")
             return pd.DataFrame()
 
-    def execute_query(self, query: str) -> Any:
-        """Универсальное выполнение SQL запросов"""
+    def _refresh_batch_features(self, conn, batch_id: str):
+        """Пересчет матрицы признаков партии по всем ее процессным данным"""
+        import pandas as pd
+        df = pd.read_sql_query(
+            "SELECT * FROM process_data WHERE batch_id = ? ORDER BY timestamp",
+            conn, params=[batch_id]
+        )
+        X, y = feature_store.compute_feature_matrix(df)
+        conn.execute('''
+            INSERT OR REPLACE INTO batch_features
+            (batch_id, schema_version, n_rows, n_features, features, targets)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (
+            batch_id, feature_store.FEATURE_SCHEMA_VERSION, X.shape[0], X.shape[1],
+            feature_store.pack_matrix(X), feature_store.pack_matrix(y)
+        ))
+
+    @metrics.timed('db.write.rebuild_features')
+    def rebuild_features(self, stale_only: bool = True) -> int:
+        """Пересчет признаков партий без матрицы или с устаревшей схемой"""
+        try:
+            with self.get_connection() as conn:
+                query = '''
+                SELECT DISTINCT p.batch_id FROM process_data p
+                LEFT JOIN batch_features f ON f.batch_id = p.batch_id
+                '''
+                params = []
+                if stale_only:
+                    query += " WHERE f.batch_id IS NULL OR f.schema_version != ?"
+                    params.append(feature_store.FEATURE_SCHEMA_VERSION)
+
+                batch_ids = [row[0] for row in conn.execute(query, params).fetchall()]
+                for batch_id in batch_ids:
+                    self._refresh_batch_features(conn, batch_id)
+                conn.commit()
+            self._features_fresh = True
+
+            if batch_ids:
+                logger.info(f"Пересчитаны признаки для {len(batch_ids)} партий")
+            return len(batch_ids)
+        except Exception as e:
+            logger.error(f"Ошибка пересчета признаков: {e}")
+            return 0
+
+    @metrics.timed('db.read.feature_matrix')
+    def get_feature_matrix(self, batch_id: str = None, min_extraction: float = 85.0):
+        """
+        Готовые матрицы признаков: (X, y) для одной партии или для всех успешных.
+        y содержит NaN для окон без следующей минуты (их отбрасывает обучение).
+        """
+        if not self._features_fresh:
+            self.rebuild_features(stale_only=True)
+        try:
+            with self.get_connection() as conn:
+                if batch_id:
+                    query = '''
+                    SELECT f.n_rows, f.n_features, f.features, f.targets FROM batch_features f
+                    WHERE f.schema_version = ? AND f.batch_id = ?
+                    '''
+                    params = [feature_store.FEATURE_SCHEMA_VERSION, batch_id]
+                else:
+                    query = '''
+                    SELECT f.n_rows, f.n_features, f.features, f.targets FROM batch_features f
+                    JOIN batches b ON f.batch_id = b.batch_id
+                    WHERE f.schema_version = ? AND b.is_good = 1 AND b.extraction_percent >= ?
+                    '''
+                    params = [feature_store.FEATURE_SCHEMA_VERSION, min_extraction]
+
+                X_parts, y_parts = [], []
+                for n_rows, n_features, features, targets in conn.execute(query, params):
+                    if n_rows == 0:
+                        continue
+                    X_parts.append(feature_store.unpack_matrix(features, n_rows, n_features))
+                    y_parts.append(feature_store.unpack_matrix(targets, n_rows))
+
+            if not X_parts:
+                return None, None
+            return np.vstack(X_parts), np.concatenate(y_parts)
+        except Exception as e:
+            logger.error(f"Ошибка чтения матрицы признаков: {e}")
+            return None, None
+
+    def _data_version(self) -> tuple:
+        """
+        Версия данных для кэша результатов. PRAGMA data_version не видит фиксаций своего
+        соединения, поэтому читается через отдельное соединение, которое никогда не пишет.
+        """
+        with self._probe_lock:
+            if self._probe is None:
+                self._probe = self._connect()
+            version = self._probe.execute("PRAGMA data_version").fetchone()[0]
+        return version, self._write_generation
+
+    def get_schema(self) -> Schema:
+        """Таблицы, столбцы, индексы и оценки числа строк (кэш до изменения схемы)"""
+        return schema_cache(self.db_path).get(self.get_connection())
+
+    def execute_query(self, query: str, params: Optional[Sequence] = None,
+                      guard: Optional[QueryGuard] = None) -> Any:
+        """
+        Универсальное выполнение SQL запросов. Результаты SELECT кэшируются до
+        изменения данных; вызывающий получает копию DataFrame.
+
+        guard ограничивает время и число строк и позволяет отменить запрос из
+        другого потока; результат, обрезанный по бюджету строк, не кэшируется.
+        """
+        import pandas as pd
         try:
             query_lower = query.strip().lower()
             with self.get_connection() as conn:
                 if query_lower.startswith('select'):
-                    return pd.read_sql_query(query, conn)
+                    cacheable = is_cacheable(query)
+                    if cacheable:
+                        key, version = make_key(query, params), self._data_version()
+                        df = self.query_cache.get(key, version)
+                        if df is not None:
+                            metrics.inc('db.query_cache.hit')
+                            return df.copy()
+                        metrics.inc('db.query_cache.miss')
+                    if guard is not None:
+                        with guard.attach(conn):
+                            cursor = conn.execute(query, params or ())
+                            columns = [d[0] for d in cursor.description]
+                            rows = guard.fetch_all(cursor)
+                            cursor.close()
+                        df = pd.DataFrame.from_records(rows, columns=columns)
+                        cacheable = cacheable and not guard.truncated
+                    else:
+                        df = pd.read_sql_query(query, conn, params=params)
+                    if cacheable:
+                        self.query_cache.put(key, version, df, len(df) or 1)
+                        metrics.set_gauge('db.query_cache.entries', self.query_cache.stats()['entries'])
+                    return df.copy() if cacheable else df
                 else:
                     cursor = conn.cursor()
-                    cursor.execute(query)
+                    with guard.attach(conn) if guard is not None else nullcontext():
+                        cursor.execute(query, params or ())
                     conn.commit()
+                    self._write_generation += 1
+                    self._features_fresh = False
+                    if query_lower.startswith('analyze'):
+                        # Оценки числа строк обновились, а номер схемы - нет
+                        schema_cache(self.db_path).invalidate()
                     return cursor.rowcount  # Возвращаем кол-во измененных строк
         except Exception as e:
             logger.error(f"Ошибка выполнения запроса: {e}")
             raise
 
+    def open_cursor(self, query: str, params: Optional[Sequence] = None,
+                    guard: Optional[QueryGuard] = None) -> sqlite3.Cursor:
+        """
+        Открытый курсор SELECT для чтения результата блоками (fetchmany) по мере надобности.
+
+        Курсор работает на собственном соединении только для чтения, которое можно
+        использовать из любого потока; вызывающий закрывает его: cursor.connection.close().
+        guard действует только на время выполнения (до первой строки результата).
+        """
+        conn = sqlite3.connect(f"file:{Path(self.db_path).resolve().as_posix()}?mode=ro",
+                               uri=True, check_same_thread=False)
+        query_advisor.capture(conn)
+        try:
+            with guard.attach(conn) if guard is not None else nullcontext():
+                return conn.execute(query, params or ())
+        except Exception as e:
+            conn.close()
+            logger.error(f"Ошибка выполнения запроса: {e}")
+            raise
+
+    @metrics.timed('db.write.delete_batch')
     def delete_batch(self, batch_id: str):
         """Полное удаление партии и всех её процессных данных"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                # Удаляем данные процесса
+                # Удаляем данные процесса и производные признаки
                 cursor.execute("DELETE FROM process_data WHERE batch_id = ?", (batch_id,))
+                cursor.execute("DELETE FROM batch_features WHERE batch_id = ?", (batch_id,))
                 # Удаляем саму партию
                 cursor.execute("DELETE FROM batches WHERE batch_id = ?", (batch_id,))
                 conn.commit()
@@ -244,6 +551,16 @@ class DatabaseManager:
         if self.connection:
             self.connection.close()
             self.connection = None
+        with self._thread_lock:
+            for conn in self._thread_connections:
+                conn.close()
+            self._thread_connections.clear()
+        self._local = threading.local()
+        with self._probe_lock:
+            if self._probe is not None:
+                self._probe.close()
+                self._probe = None
+        self.query_cache.clear()
 
     def __enter__(self):
         return self
@@ -0,0 +1,113 @@
+# app/core/downsample.py
+from typing import Tuple
+
+import numpy as np
+
+# Во сколько раз укрупняется каждый следующий уровень пирамиды
+LEVEL_FACTOR = 4
+# Уровни строятся, пока ведер больше этого числа (самый грубый слой - "обзор")
+MIN_BUCKETS = 256
+
+
+class MinMaxPyramid:
+    """
+    Многоуровневое прореживание ряда с сохранением пиков.
+
+    Уровень 0 - исходные точки; на уровне k каждое "ведро" покрывает LEVEL_FACTOR**k
+    минут и хранит минимум и максимум. При отрисовке ведро дает две точки (min, max),
+    поэтому экстремумы видны при любом масштабе.
+    """
+
+    def __init__(self, y, x0: float = 0.0, dx: float = 1.0):
+        self.y = np.asarray(y, dtype=np.float64)
+        self.x0 = float(x0)
+        self.dx = float(dx)
+        self.levels = []  # [(bucket_size, mins, maxs)]
+
+        mins = maxs = self.y
+        size = 1
+        while len(mins) > MIN_BUCKETS:
+            pad = (-len(mins)) % LEVEL_FACTOR
+            if pad:
+                mins = np.concatenate((mins, np.full(pad, np.nan)))
+                maxs = np.concatenate((maxs, np.full(pad, np.nan)))
+            # fmin/fmax пропускают NaN, если в ведре есть хотя бы одно число
+            mins = np.fmin.reduce(mins.reshape(-1, LEVEL_FACTOR), axis=1)
+            maxs = np.fmax.reduce(maxs.reshape(-1, LEVEL_FACTOR), axis=1)
+            size *= LEVEL_FACTOR
+            self.levels.append((size, mins, maxs))
+
+    def __len__(self):
+        return len(self.y)
+
+    def _raw(self, i0: int, i1: int) -> Tuple[np.ndarray, np.ndarray]:
+        x = self.x0 + np.arange(i0, i1) * self.dx
+        return x, self.y[i0:i1]
+
+    def _buckets(self, level: int, i0: int, i1: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Точки (min, max) ведер уровня, покрывающих исходные индексы [i0, i1)"""
+        size, mins, maxs = self.levels[level]
+        b0, b1 = i0 // size, -(-i1 // size)
+        starts = np.arange(b0, b1) * size
+        ends = np.minimum(starts + size, len(self.y))
+        centers = self.x0 + (starts + ends - 1) / 2 * self.dx
+        x = np.repeat(centers, 2)
+        y = np.empty(2 * (b1 - b0))
+        y[0::2] = mins[b0:b1]
+        y[1::2] = maxs[b0:b1]
+        return x, y
+
+    def _segment(self, level: int, i0: int, i1: int) -> Tuple[np.ndarray, np.ndarray]:
+        if i1 <= i0:
+            return np.empty(0), np.empty(0)
+        return self._raw(i0, i1) if level < 0 else self._buckets(level, i0, i1)
+
+    def query(self, x_min: float, x_max: float, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Точки для отображения диапазона [x_min, x_max]: внутри окна не более max_points,
+        снаружи - все более грубые уровни, чтобы кривая сохраняла полный охват по X
+        (нужно для автомасштаба "показать все").
+        """
+        n = len(self.y)
+        if n == 0:
+            return np.empty(0), np.empty(0)
+        if not self.levels:
+            # Короткий ряд (не больше MIN_BUCKETS точек) не прореживается: весь целиком
+            return self._raw(0, n)
+
+        i0 = int(np.clip(np.floor((x_min - self.x0) / self.dx) - 1, 0, n))
+        i1 = int(np.clip(np.ceil((x_max - self.x0) / self.dx) + 2, 0, n))
+
+        # Самый детальный уровень, укладывающийся в бюджет точек
+        level = -1
+        if i1 - i0 > max_points:
+            for k, (size, _, _) in enumerate(self.levels):
+                level = k
+                if 2 * (-(-(i1 - i0) // size)) <= max_points:
+                    break
+
+        if level == len(self.levels) - 1:
+            # Самый грубый уровень - весь ряд, колец вокруг окна нет
+            return self._buckets(level, 0, n)
+
+        # Окно на выбранном уровне, далее "кольца" все более грубых уровней до границ
+        # ведер следующего уровня и, наконец, самый грубый слой до краев ряда
+        if level >= 0:
+            size = self.levels[level][0]
+            i0 = (i0 // size) * size
+            i1 = min(n, -(-i1 // size) * size)
+
+        left, right = [], []
+        middle = self._segment(level, i0, i1)
+        for k in range(level + 1, len(self.levels)):
+            size = self.levels[k][0]
+            lo = (i0 // size) * size
+            hi = min(n, -(-i1 // size) * size)
+            left.insert(0, self._segment(k - 1, lo, i0))
+            right.append(self._segment(k - 1, i1, hi))
+            i0, i1 = lo, hi
+        left.insert(0, self._segment(len(self.levels) - 1, 0, i0))
+        right.append(self._segment(len(self.levels) - 1, i1, n))
+
+        parts = left + [middle] + right
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
@@ -0,0 +1,89 @@
+# app/core/feature_store.py
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Модуль импортируется вместе с DatabaseManager при старте - pandas подгружаем по месту
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Версия схемы признаков: при любом изменении набора/порядка признаков увеличить,
+# тогда сохраненные матрицы будут пересчитаны, а старые модели потребуют переобучения
+FEATURE_SCHEMA_VERSION = 1
+
+# Окно истории (минут) и базовые сигналы
+WINDOW = 6
+BASE_COLUMNS = ['temperature_1', 'temperature_2', 'temperature_3', 'acid_flow', 'current_value']
+TARGET_COLUMN = 'temperature_1'
+
+# Лаги (6 x 5) + средние по окну (5) + наклоны по окну (5) + накопленная кислота (1)
+N_FEATURES = WINDOW * len(BASE_COLUMNS) + 2 * len(BASE_COLUMNS) + 1
+
+# Центрированная ось времени окна для расчета наклона МНК
+_T = np.arange(WINDOW, dtype=np.float64) - (WINDOW - 1) / 2
+_T_NORM = float((_T ** 2).sum())
+
+
+def _signal_matrix(df: pd.DataFrame) -> np.ndarray:
+    """Матрица (n, 5) базовых сигналов, пропуски заменены нулями"""
+    import pandas as pd
+    cols = []
+    for col in BASE_COLUMNS:
+        if col in df.columns:
+            cols.append(pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(dtype=np.float64))
+        else:
+            cols.append(np.zeros(len(df)))
+    return np.column_stack(cols) if cols else np.empty((len(df), 0))
+
+
+def compute_feature_matrix(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Признаки для каждой минуты профиля партии (df упорядочен по времени).
+
+    Строка k описывает окно минут [k, k + WINDOW - 1]; цель - temperature_1
+    в следующую минуту (NaN для последнего окна, по нему строится прогноз).
+    Возвращает X формы (n - WINDOW + 1, N_FEATURES) и y той же длины.
+    """
+    n = len(df)
+    if n < WINDOW:
+        return np.empty((0, N_FEATURES)), np.empty(0)
+
+    signals = _signal_matrix(df)
+    windows = sliding_window_view(signals, WINDOW, axis=0)  # (n_win, 5, WINDOW)
+    n_win = windows.shape[0]
+
+    lags = windows.reshape(n_win, -1)  # по каждому сигналу: от старых к новым
+    means = windows.mean(axis=2)
+    slopes = (windows * _T).sum(axis=2) / _T_NORM
+    cum_acid = np.cumsum(signals[:, BASE_COLUMNS.index('acid_flow')])[WINDOW - 1:]
+
+    X = np.hstack([lags, means, slopes, cum_acid[:, None]])
+
+    y = np.full(n_win, np.nan)
+    if TARGET_COLUMN in df.columns:
+        import pandas as pd
+        target = pd.to_numeric(df[TARGET_COLUMN], errors='coerce').to_numpy(dtype=np.float64)
+        y[:-1] = target[WINDOW:]
+
+    return X, y
+
+
+def compute_latest_features(df: pd.DataFrame) -> np.ndarray:
+    """
+    Признаки последнего окна для онлайн-прогноза: массив (1, N_FEATURES).
+    Для корректной накопленной кислоты df должен содержать весь профиль с начала партии.
+    """
+    X, _ = compute_feature_matrix(df)
+    return X[-1:]
+
+
+def pack_matrix(arr: np.ndarray) -> bytes:
+    return np.ascontiguousarray(arr, dtype=np.float64).tobytes()
+
+
+def unpack_matrix(blob: bytes, n_rows: int, n_cols: int = None) -> np.ndarray:
+    arr = np.frombuffer(blob, dtype=np.float64)
+    return arr.reshape(n_rows, n_cols) if n_cols is not None else arr
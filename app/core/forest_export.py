@@ -0,0 +1,129 @@
+# app/core/forest_export.py
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.utils.logger import logger
+
+# Версия формата упаковки (меняется при изменении набора/смысла массивов)
+FOREST_FORMAT_VERSION = 1
+
+_NODE_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value')
+
+
+def export_forest(model, scaler, export_dir: Path, extra_meta: Optional[Dict] = None) -> Path:
+    """
+    Упаковка обученного RandomForestRegressor вместе со StandardScaler
+    в плоские массивы узлов NumPy (по одному .npy на массив + meta.json).
+
+    Масштабирование сворачивается в пороги: (x - mean) / scale <= t  <=>  x <= t * scale + mean,
+    поэтому при инференсе скейлер не нужен. Листья ссылаются сами на себя,
+    чтобы обход всех деревьев шел фиксированное число шагов без ветвлений.
+    """
+    export_dir = Path(export_dir)
+    export_dir.mkdir(parents=True, exist_ok=True)
+    # Прежний экспорт перестает считаться готовым до записи нового meta.json:
+    # прерванная запись не оставит смесь старых и новых массивов
+    (export_dir / 'meta.json').unlink(missing_ok=True)
+
+    trees = [est.tree_ for est in model.estimators_]
+    n_features = int(model.n_features_in_)
+
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+
+    counts = np.array([t.node_count for t in trees], dtype=np.int64)
+    roots = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int32)
+    n_nodes = int(counts.sum())
+
+    feature = np.zeros(n_nodes, dtype=np.int32)
+    threshold = np.zeros(n_nodes, dtype=np.float64)
+    left = np.zeros(n_nodes, dtype=np.int32)
+    right = np.zeros(n_nodes, dtype=np.int32)
+    value = np.zeros(n_nodes, dtype=np.float64)
+
+    for tree, offset in zip(trees, roots):
+        sl = slice(int(offset), int(offset) + tree.node_count)
+        is_leaf = tree.children_left == -1
+        own_idx = np.arange(tree.node_count, dtype=np.int32) + offset
+        feat = np.where(is_leaf, 0, tree.feature)
+
+        feature[sl] = feat
+        threshold[sl] = np.where(is_leaf, 0.0, tree.threshold * scale[feat] + mean[feat])
+        left[sl] = np.where(is_leaf, own_idx, tree.children_left + offset)
+        right[sl] = np.where(is_leaf, own_idx, tree.children_right + offset)
+        value[sl] = tree.value[:, 0, 0]
+
+    arrays = {
+        'feature': feature, 'threshold': threshold,
+        'left': left, 'right': right, 'value': value, 'roots': roots
+    }
+    for name, arr in arrays.items():
+        np.save(export_dir / f'{name}.npy', arr)
+
+    meta = {
+        'format_version': FOREST_FORMAT_VERSION,
+        'n_trees': len(trees),
+        'n_nodes': n_nodes,
+        'n_features': n_features,
+        'max_depth': int(max(t.max_depth for t in trees)),
+    }
+    if extra_meta:
+        meta.update(extra_meta)
+
+    # meta.json пишется последним: его наличие означает, что экспорт завершен
+    with open(export_dir / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"Лес экспортирован: {len(trees)} деревьев, {n_nodes} узлов -> {export_dir}")
+    return export_dir
+
+
+class CompactForest:
+    """Пакетный инференс упакованного леса на чистом NumPy (без scikit-learn)"""
+
+    def __init__(self, export_dir: Path):
+        self.export_dir = Path(export_dir)
+        with open(self.export_dir / 'meta.json', 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+        if self.meta.get('format_version') != FOREST_FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия формата леса: {self.meta.get('format_version')}")
+
+        # mmap: файлы не читаются целиком, страницы подгружаются ОС по мере обхода
+        for name in _NODE_ARRAYS + ('roots',):
+            setattr(self, name, np.load(self.export_dir / f'{name}.npy', mmap_mode='r'))
+
+        self.n_trees = int(self.meta['n_trees'])
+        self.n_features = int(self.meta['n_features'])
+        self.max_depth = int(self.meta['max_depth'])
+
+    @staticmethod
+    def exists(export_dir: Path) -> bool:
+        return (Path(export_dir) / 'meta.json').exists()
+
+    def predict_trees(self, X) -> np.ndarray:
+        """Прогнозы каждого дерева: массив (n_samples, n_trees)"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Ожидалось {self.n_features} признаков, получено {X.shape[1]}")
+
+        rows = np.arange(X.shape[0])[:, None]
+        idx = np.repeat(np.asarray(self.roots)[None, :], X.shape[0], axis=0)
+
+        # Все образцы и все деревья спускаются одновременно, уровень за уровнем
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[idx]] <= self.threshold[idx]
+            idx = np.where(go_left, self.left[idx], self.right[idx])
+
+        return self.value[idx]
+
+    def predict(self, X) -> np.ndarray:
+        """Средний прогноз леса для каждого образца"""
+        return self.predict_trees(X).mean(axis=1)
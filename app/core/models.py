@@ -4,18 +4,16 @@ import numpy as np
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
 import logging
-import joblib
 from pathlib import Path
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, r2_score
-from sklearn.preprocessing import StandardScaler
 import warnings
 
 warnings.filterwarnings('ignore')
 
+from app.core import feature_store
 from app.core.database import DatabaseManager
+from app.core.forest_export import CompactForest, export_forest
 from app.utils.config import config
+from app.utils import metrics
 from app.utils.logger import logger
 
 
@@ -23,6 +21,21 @@ class TemperaturePredictor:
     """Модель для прогнозирования температурного режима"""
 
     def __init__(self):
+        # sklearn-модель и скейлер создаются только для обучения,
+        # для прогноза используется упакованный лес (CompactForest)
+        self.model = None
+        self.scaler = None
+        self.forest = None
+        self.is_trained = False
+        self.model_path = config.base_dir / 'data' / 'models' / 'temperature_model.pkl'
+        self.forest_path = config.base_dir / 'data' / 'models' / 'temperature_forest'
+        self.model_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _create_model(self):
+        """Создание sklearn-модели и скейлера (импорт scikit-learn только здесь)"""
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+
         self.model = RandomForestRegressor(
             n_estimators=100,
             max_depth=10,
@@ -30,67 +43,26 @@ class TemperaturePredictor:
             n_jobs=-1
         )
         self.scaler = StandardScaler()
-        self.is_trained = False
-        self.model_path = config.base_dir / 'data' / 'models' / 'temperature_model.pkl'
-        self.model_path.parent.mkdir(parents=True, exist_ok=True)
 
     def prepare_training_data(self, batch_id: str = None) -> Tuple[np.ndarray, np.ndarray]:
-        """Подготовка данных для обучения"""
+        """Подготовка данных для обучения (готовые матрицы из хранилища признаков)"""
         db = DatabaseManager()
 
-        if batch_id:
-            # Данные конкретной партии
-            query = f"""
-            SELECT * FROM process_data 
-            WHERE batch_id = '{batch_id}'
-            ORDER BY timestamp
-            """
-        else:
-            # Все успешные партии
-            query = """
-            SELECT p.* FROM process_data p
-            JOIN batches b ON p.batch_id = b.batch_id
-            WHERE b.is_good = 1 AND b.extraction_percent >= 85
-            ORDER BY p.timestamp
-            LIMIT 10000
-            """
-
-        df = db.execute_query(query)
-
-        if df.empty:
+        # Одна партия или все успешные (is_good, извлечение >= 85%)
+        X, y = db.get_feature_matrix(batch_id)
+
+        if X is None:
             logger.warning("Нет данных для обучения")
             return None, None
 
-        # Признаки: предыдущие значения температуры, подача кислоты, ток
-        features = []
-        targets = []
-
-        for i in range(6, len(df)):
-            # Целевая переменная - температура в следующий момент времени
-            if i + 1 < len(df):
-                target = df.iloc[i + 1]['temperature_1']
-                if pd.isna(target):
-                    continue
-
-                # Признаки: последние 6 значений
-                window = df.iloc[i - 5:i + 1]
-                feature_row = []
-
-                for col in ['temperature_1', 'temperature_2', 'temperature_3', 'acid_flow', 'current_value']:
-                    if col in window.columns:
-                        feature_row.extend(window[col].fillna(0).values)
-                    else:
-                        feature_row.extend([0] * 6)
-
-                features.append(feature_row)
-                targets.append(target)
-
-        X = np.array(features)
-        y = np.array(targets)
+        # Последнее окно каждой партии не имеет следующей минуты - в обучение не идет
+        mask = ~np.isnan(y)
+        X, y = X[mask], y[mask]
 
         logger.info(f"Подготовлено {len(X)} образцов для обучения")
         return X, y
 
+    @metrics.timed('model.train')
     def train(self, batch_id: str = None):
         """Обучение модели"""
         try:
@@ -100,6 +72,11 @@ class TemperaturePredictor:
                 logger.warning("Недостаточно данных для обучения")
                 return False
 
+            from sklearn.model_selection import train_test_split
+            from sklearn.metrics import mean_absolute_error, r2_score
+
+            self._create_model()
+
             # Разделение на train/test
             X_train, X_test, y_train, y_test = train_test_split(
                 X, y, test_size=0.2, random_state=42
@@ -119,9 +96,15 @@ class TemperaturePredictor:
 
             logger.info(f"Модель обучена. MAE: {mae:.2f}, R²: {r2:.3f}")
 
-            # Сохранение модели
-            self.save_model()
+            # Сохранение модели; лес заменяется только успешно записанным экспортом
             self.is_trained = True
+            if self.save_model():
+                try:
+                    self.forest = CompactForest(self.forest_path)
+                except Exception as e:
+                    logger.error(f"Ошибка загрузки упакованного леса: {e}")
+            if self.forest is None:
+                logger.warning("Упакованный лес недоступен, прогноз по модели в памяти")
 
             return True
 
@@ -129,36 +112,26 @@ class TemperaturePredictor:
             logger.error(f"Ошибка обучения модели: {e}")
             return False
 
+    @metrics.timed('model.predict')
     def predict_temperature(self, recent_data: pd.DataFrame) -> Dict:
-        """Прогноз температуры на следующий шаг"""
+        """Прогноз температуры на следующий шаг (recent_data - профиль партии с начала процесса)"""
         try:
             if not self.is_trained:
                 self.load_model()
                 if not self.is_trained:
                     return {"error": "Модель не обучена"}
 
-            # Подготовка последних 6 записей
-            if len(recent_data) < 6:
+            if len(recent_data) < feature_store.WINDOW:
                 return {"error": "Недостаточно данных для прогноза"}
 
-            recent_data = recent_data.tail(6).reset_index(drop=True)
-
-            # Формирование признаков
-            feature_row = []
-            for col in ['temperature_1', 'temperature_2', 'temperature_3', 'acid_flow', 'current_value']:
-                if col in recent_data.columns:
-                    feature_row.extend(recent_data[col].fillna(0).values)
-                else:
-                    feature_row.extend([0] * 6)
+            # Признаки последнего окна (накопленная кислота - по всему переданному профилю)
+            X = feature_store.compute_latest_features(recent_data.reset_index(drop=True))
 
-            X = np.array([feature_row])
-            X_scaled = self.scaler.transform(X)
-
-            # Прогноз
-            prediction = self.model.predict(X_scaled)[0]
+            tree_predictions = self._tree_predictions(X)
+            prediction = tree_predictions.mean()
 
             # Доверительный интервал (упрощенно)
-            std_dev = np.std([tree.predict(X_scaled)[0] for tree in self.model.estimators_])
+            std_dev = np.std(tree_predictions)
 
             return {
                 'predicted_temperature': float(prediction),
@@ -174,6 +147,15 @@ class TemperaturePredictor:
             logger.error(f"Ошибка прогнозирования: {e}")
             return {"error": str(e)}
 
+    def _tree_predictions(self, X) -> np.ndarray:
+        """Прогнозы деревьев для одного окна признаков"""
+        if self.forest is not None:
+            # Масштабирование уже свернуто в пороги упакованного леса
+            return self.forest.predict_trees(X)[0]
+        # Экспорт не удался: sklearn-модель последнего обучения
+        X_scaled = self.scaler.transform(np.atleast_2d(X))
+        return np.array([tree.predict(X_scaled)[0] for tree in self.model.estimators_])
+
     def generate_temperature_recommendation(self, predicted_temp: float) -> str:
         """Генерация рекомендации по температуре"""
         optimal_range = (85.0, 95.0)  # Оптимальный диапазон
@@ -185,9 +167,14 @@ class TemperaturePredictor:
         else:
             return f"Температура в оптимальном диапазоне ({predicted_temp:.1f}°C). Продолжайте текущий режим."
 
-    def save_model(self):
-        """Сохранение модели в файл"""
+    def save_model(self) -> bool:
+        """
+        Сохранение модели в файл (pickle для дообучения + упакованный лес для прогноза).
+        Возвращает False, если что-то не записалось - тогда лес на диске не годится для прогноза.
+        """
         try:
+            import joblib
+
             model_data = {
                 'model': self.model,
                 'scaler': self.scaler,
@@ -195,18 +182,45 @@ class TemperaturePredictor:
             }
             joblib.dump(model_data, self.model_path)
             logger.info(f"Модель сохранена: {self.model_path}")
+
+            # Отпускаем mmap старого экспорта, иначе Windows не даст перезаписать файлы
+            self.forest = None
+            export_forest(self.model, self.scaler, self.forest_path,
+                          extra_meta={'feature_schema': feature_store.FEATURE_SCHEMA_VERSION})
+            return True
         except Exception as e:
             logger.error(f"Ошибка сохранения модели: {e}")
+            return False
 
+    @metrics.timed('model.load')
     def load_model(self):
-        """Загрузка модели из файла"""
+        """Загрузка модели: сначала упакованный лес, затем (для старых версий) pickle"""
         try:
-            if self.model_path.exists():
+            if CompactForest.exists(self.forest_path):
+                forest = CompactForest(self.forest_path)
+                if forest.meta.get('feature_schema') != feature_store.FEATURE_SCHEMA_VERSION:
+                    logger.warning("Модель обучена на другой схеме признаков, требуется переобучение")
+                    return False
+                self.forest = forest
+                self.is_trained = True
+                logger.info(f"Модель загружена: {self.forest_path}")
+                return True
+            elif self.model_path.exists():
+                import joblib
+
                 model_data = joblib.load(self.model_path)
+                if model_data['model'].n_features_in_ != feature_store.N_FEATURES:
+                    logger.warning("Модель обучена на другой схеме признаков, требуется переобучение")
+                    return False
                 self.model = model_data['model']
                 self.scaler = model_data['scaler']
+
+                # Однократная миграция: дальше прогноз идет без scikit-learn
+                export_forest(self.model, self.scaler, self.forest_path,
+                              extra_meta={'feature_schema': feature_store.FEATURE_SCHEMA_VERSION})
+                self.forest = CompactForest(self.forest_path)
                 self.is_trained = model_data['is_trained']
-                logger.info(f"Модель загружена: {self.model_path}")
+                logger.info(f"Модель загружена и упакована: {self.model_path}")
                 return True
             else:
                 logger.warning("Файл модели не найден")
@@ -0,0 +1,81 @@
+# app/core/playback.py
+import numpy as np
+import pandas as pd
+
+from app.core.recommender import AcidPulses, extract_acid_pulses
+
+# Коды состояния советника (прогноз на LOOKAHEAD минут вперед)
+STATUS_NONE = -1       # прогноз за пределами профиля
+STATUS_NORMAL = 0
+STATUS_LOW = 1         # ниже регламента
+STATUS_OVERHEAT = 2    # риск перегрева
+
+# Горизонт прогноза и допуски отклонения от регламентной температуры
+LOOKAHEAD = 10
+LOW_DELTA = -2.0
+HIGH_DELTA = 7.0
+
+
+def _column(df: pd.DataFrame, name: str) -> np.ndarray:
+    if name in df.columns:
+        return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=np.float64)
+    return np.zeros(len(df))
+
+
+class PlaybackEngine:
+    """
+    Кадры воспроизведения профиля, рассчитанные один раз при загрузке партии.
+    На каждом тике таймера остается только выборка по индексу минуты.
+    """
+
+    def __init__(self, history_df: pd.DataFrame, pulses: AcidPulses = None):
+        n = len(history_df)
+        self.n_minutes = n
+
+        # Параметры мнемосхемы по минутам
+        self.g = np.round(_column(history_df, 'acid_flow'), 3)
+        self.ip = np.nan_to_num(_column(history_df, 'current_value')).astype(np.int64)
+        self.tr = _column(history_df, 'temperature_1')
+        self.tg = _column(history_df, 'temperature_3')
+        self.lte = _column(history_df, 'electrodes_pos')
+        self.ltr = _column(history_df, 'level_mixer')
+
+        # Советник: прогноз температуры через LOOKAHEAD минут и его отклонение от регламента
+        t1 = self.tr
+        opt = _column(history_df, 'optimal_temp')
+        self.future_t = np.full(n, np.nan)
+        self.future_delta = np.full(n, np.nan)
+        self.status = np.full(n, STATUS_NONE, dtype=np.int8)
+        if n > LOOKAHEAD:
+            self.future_t[:-LOOKAHEAD] = t1[LOOKAHEAD:]
+            self.future_delta[:-LOOKAHEAD] = t1[LOOKAHEAD:] - opt[LOOKAHEAD:]
+            delta = self.future_delta[:-LOOKAHEAD]
+            self.status[:-LOOKAHEAD] = np.select(
+                [delta < LOW_DELTA, delta > HIGH_DELTA],
+                [STATUS_LOW, STATUS_OVERHEAT],
+                default=STATUS_NORMAL
+            )
+
+        # Номер активного импульса лестницы для каждой минуты (-1 - подачи нет)
+        if pulses is None:
+            pulses = extract_acid_pulses(_column(history_df, 'acid_flow'))
+        self.active_pulse = np.full(n, -1, dtype=np.int32)
+        if len(pulses):
+            minutes = np.arange(n)
+            pos = np.searchsorted(pulses.start, minutes, side='right') - 1
+            inside = (pos >= 0) & (minutes < pulses.end[np.maximum(pos, 0)])
+            self.active_pulse[inside] = pos[inside]
+
+    def __len__(self):
+        return self.n_minutes
+
+    def params(self, minute: int) -> dict:
+        """Аргументы для SulfatizerWidget.set_params"""
+        return {
+            'g': float(self.g[minute]),
+            'ip': int(self.ip[minute]),
+            'tr': float(self.tr[minute]),
+            'tg': float(self.tg[minute]),
+            'lte': float(self.lte[minute]),
+            'ltr': float(self.ltr[minute]),
+        }
@@ -0,0 +1,364 @@
+# app/core/query_advisor.py
+"""
+Советник по индексам: сбор выполненных SQL-запросов и разбор их планов.
+
+Запросы собираются через Connection.set_trace_callback (SQLite передает текст с
+подставленными значениями параметров) и группируются по "отпечатку" - тексту, в
+котором литералы заменены на '?'. Для каждого отпечатка выполняется EXPLAIN QUERY
+PLAN: отмечаются полные просмотры таблиц и временные B-деревья (сортировка,
+группировка), предлагаются индексы с оценкой выигрыша и перечисляются индексы,
+которыми не воспользовался ни один запрос.
+
+Сбор в приложении включается переменной окружения EXPERT_SQL_CAPTURE (как и
+EXPERT_TRACE: 1 - файл logs/sql_capture_<дата_время>.json, иначе - путь к файлу);
+журнал сохраняется при выходе и разбирается scripts/query_advisor.py. Модуль
+использует только стандартную библиотеку - его импортирует и sqlite_web.py.
+"""
+import atexit
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.schema_cache import INTERNAL_SQL_MARK, Schema, SchemaCache
+
+CAPTURE_ENV = 'EXPERT_SQL_CAPTURE'
+
+# Сколько разных запросов хранит журнал (дальше новые отпечатки не добавляются)
+MAX_STATEMENTS = 1000
+# Служебные инструкции, которые не разбираются
+SKIP_PREFIXES = ('begin', 'commit', 'end', 'rollback', 'savepoint', 'release', 'pragma', 'explain',
+                 'create', 'drop', 'alter', 'analyze', 'vacuum', 'reindex', 'attach', 'detach')
+SKIP_TABLES = ('sqlite_master', 'sqlite_schema', 'sqlite_stat1', 'sqlite_sequence')
+# Предлагаемый индекс: не больше столбцов ключа и всего (с покрывающими)
+MAX_KEY_COLUMNS = 4
+MAX_INDEX_COLUMNS = 6
+# Допущения оценки (как у планировщика SQLite без статистики): равенство сужает
+# выборку в 10 раз, диапазон - в 4
+EQ_SELECTIVITY = 10
+RANGE_SELECTIVITY = 4
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+_SCAN_RE = re.compile(r"^SCAN (\S+)(?: AS \S+)?(?: USING (?:COVERING )?INDEX (\S+))?")
+_INDEX_USE_RE = re.compile(r"USING (?:COVERING )?INDEX (\S+)")
+_TABLE_REF_RE = re.compile(r'\b(?:from|join)\s+"?(\w+)"?(?:\s+(?:as\s+)?(\w+))?', re.I)
+_NOT_ALIAS = {'where', 'join', 'left', 'right', 'inner', 'outer', 'cross', 'natural', 'on', 'using',
+              'group', 'order', 'limit', 'union', 'set', 'values', 'window', 'having'}
+_CLAUSE_END = r"(?=\bgroup\s+by\b|\border\s+by\b|\blimit\b|\bhaving\b|\bwindow\b|\bunion\b|$)"
+
+
+def fingerprint(sql: str) -> str:
+    """Текст запроса без значений литералов: одинаковые запросы с разными параметрами совпадают"""
+    text = _STRING_RE.sub('?', sql.strip().rstrip(';'))
+    text = _NUMBER_RE.sub('?', text)
+    text = _IN_LIST_RE.sub('(?)', text)
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+class StatementLog:
+    """Журнал выполненных запросов: отпечаток -> число выполнений и последний текст"""
+
+    def __init__(self, max_statements: int = MAX_STATEMENTS):
+        self.max_statements = max_statements
+        self._statements: Dict[str, List] = {}
+        self._lock = threading.Lock()
+
+    def record(self, sql: str):
+        """Обработчик set_trace_callback (вызывается в потоке соединения)"""
+        lowered = sql.lstrip().lower()
+        if INTERNAL_SQL_MARK in sql or lowered.startswith(SKIP_PREFIXES) \
+                or any(t in lowered for t in SKIP_TABLES):
+            return
+        key = fingerprint(sql)
+        with self._lock:
+            entry = self._statements.get(key)
+            if entry is not None:
+                entry[0] += 1
+                entry[1] = sql
+            elif len(self._statements) < self.max_statements:
+                self._statements[key] = [1, sql]
+
+    def attach(self, conn):
+        conn.set_trace_callback(self.record)
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            items = list(self._statements.items())
+        return [{'fingerprint': key, 'count': count, 'sql': sql} for key, (count, sql) in items]
+
+    def clear(self):
+        with self._lock:
+            self._statements.clear()
+
+    def merge(self, statements: List[Dict]):
+        """Добавление записей из snapshot() другого журнала (например, из файла)"""
+        with self._lock:
+            for item in statements:
+                key = item.get('fingerprint') or fingerprint(item['sql'])
+                entry = self._statements.setdefault(key, [0, item['sql']])
+                entry[0] += int(item.get('count', 1))
+
+    def save(self, path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'statements': self.snapshot()}, f, ensure_ascii=False, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path) -> 'StatementLog':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        log = cls()
+        log.merge(data.get('statements', []))
+        return log
+
+
+# --- Разбор планов ---
+
+def explain(conn, sql: str) -> List[str]:
+    """Строки EXPLAIN QUERY PLAN с отступами по вложенности"""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+def _table_aliases(sql: str) -> Dict[str, str]:
+    """Псевдоним или имя -> таблица (в плане SQLite показывает псевдоним)"""
+    aliases = {}
+    for table, alias in _TABLE_REF_RE.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in _NOT_ALIAS:
+            aliases[alias] = table
+    return aliases
+
+
+def _where_clause(text: str) -> str:
+    match = re.search(r"\bwhere\b(.*?)" + _CLAUSE_END, text, re.S)
+    return match.group(1) if match else ''
+
+
+def _column_list(text: str, clause: str) -> List[str]:
+    match = re.search(rf"\b{clause}\b(.*?)(?=\border\s+by\b|\blimit\b|\bhaving\b|\bwindow\b|\bunion\b|$)",
+                      text, re.S)
+    if not match:
+        return []
+    columns = []
+    for term in match.group(1).split(','):
+        name = re.sub(r"\s+(asc|desc|collate\s+\w+|nulls\s+(first|last))\b", '', term.strip())
+        columns.append(name.split('.')[-1].strip('"[]` '))
+    return columns
+
+
+def _selected_columns(text: str) -> Optional[List[str]]:
+    """Явный список столбцов SELECT (None, если там * или выражения)"""
+    match = re.match(r"\s*select\s+(distinct\s+)?(.*?)\bfrom\b", text, re.S)
+    if not match or '*' in match.group(2) or '(' in match.group(2):
+        return None
+    return [term.strip().split()[0].split('.')[-1].strip('"[]`') for term in match.group(2).split(',')]
+
+
+def _suggest_index(sql: str, table: str, schema: Schema, sort_in_temp: bool) -> Optional[Dict]:
+    """Ключ индекса по условиям WHERE (равенства, затем диапазон) и порядку ORDER/GROUP BY"""
+    info = schema.tables.get(table)
+    if info is None or info.type != 'table':
+        return None
+    text = fingerprint(sql).lower()
+    columns = {col.name.lower(): col.name for col in info.columns}
+    where = _where_clause(text)
+
+    equal, ranged = [], []
+    for lowered, name in columns.items():
+        # Столбец с псевдонимом таблицы или без него
+        pattern = rf"(?<!\w){re.escape(lowered)}\s*"
+        if re.search(rf"{pattern}(?:==?|is\b|in\b)", where):
+            equal.append(name)
+        elif re.search(rf"{pattern}(?:[<>]=?|between\b)", where):
+            ranged.append(name)
+
+    order = _column_list(text, r"order\s+by") or _column_list(text, r"group\s+by")
+    order = [columns[c] for c in order if c in columns] if order and all(c in columns for c in order) else []
+
+    key = equal[:MAX_KEY_COLUMNS]
+    if order and sort_in_temp:
+        # Сортировку индекс снимает, только если она идет сразу за равенствами
+        key += [c for c in order if c not in key]
+    elif ranged:
+        key.append(ranged[0])
+    key = key[:MAX_KEY_COLUMNS]
+    if not key:
+        return None
+
+    # Уже есть индекс с тем же началом ключа - новый не поможет
+    for index in info.indexes:
+        if [c.lower() for c in index.columns[:len(key)]] == [c.lower() for c in key]:
+            return None
+
+    index_columns = list(key)
+    covering = False
+    selected = _selected_columns(text)
+    if selected is not None and all(c in columns for c in selected):
+        # rowid (INTEGER PRIMARY KEY) и так хранится в каждой записи индекса
+        rowid_alias = {col.name for col in info.columns
+                       if col.pk and not info.without_rowid and col.type.upper() == 'INTEGER'
+                       and len(info.pk_columns) == 1}
+        extra = [columns[c] for c in selected
+                 if columns[c] not in index_columns and columns[c] not in rowid_alias]
+        if len(index_columns) + len(extra) <= MAX_INDEX_COLUMNS:
+            index_columns += extra
+            covering = True
+
+    rows = info.row_estimate or 0
+    after = rows / (EQ_SELECTIVITY ** len([c for c in key if c in equal]))
+    if any(c in ranged for c in key):
+        after /= RANGE_SELECTIVITY
+    name = f"idx_{table}_{'_'.join(key)}".lower()
+    quoted = ', '.join(f'"{c}"' for c in index_columns)
+    return {
+        'table': table,
+        'columns': index_columns,
+        'covering': covering,
+        'sql': f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({quoted})',
+        'rows_before': rows,
+        'rows_after': max(1, int(math.ceil(after))) if rows else 0,
+        'removes_sort': bool(order and sort_in_temp),
+    }
+
+
+def analyze_statement(conn, sql: str, schema: Schema) -> Dict:
+    result = {'plan': [], 'full_scans': [], 'temp_btrees': [], 'indexes_used': [], 'suggestions': []}
+    try:
+        result['plan'] = explain(conn, sql)
+    except sqlite3.Error as e:
+        result['error'] = str(e)
+        return result
+
+    aliases = _table_aliases(sql)
+    for line in result['plan']:
+        detail = line.strip()
+        result['indexes_used'] += _INDEX_USE_RE.findall(detail)
+        scan = _SCAN_RE.match(detail)
+        table = aliases.get(scan.group(1), scan.group(1)) if scan else None
+        if scan and scan.group(2) is None and table in schema.tables:
+            result['full_scans'].append(table)
+        if detail.startswith('USE TEMP B-TREE'):
+            result['temp_btrees'].append(detail[len('USE TEMP B-TREE FOR '):])
+
+    sort_in_temp = any(reason.startswith(('ORDER BY', 'GROUP BY', 'RIGHT PART OF ORDER BY'))
+                       for reason in result['temp_btrees'])
+    tables = list(dict.fromkeys(result['full_scans']))
+    if not tables and sort_in_temp:
+        # Индекс используется, но не снимает сортировку - пробуем таблицу из FROM
+        tables = [t for t in dict.fromkeys(aliases.values()) if t in schema.tables][:1]
+    for table in tables:
+        suggestion = _suggest_index(sql, table, schema, sort_in_temp)
+        if suggestion:
+            result['suggestions'].append(suggestion)
+    return result
+
+
+def analyze(conn, statements: List[Dict], schema_cache: Optional[SchemaCache] = None) -> Dict:
+    """
+    Отчет по журналу запросов (StatementLog.snapshot()): план и замечания по каждому
+    запросу, предложенные индексы по убыванию оценочного выигрыша и неиспользуемые индексы.
+    """
+    schema = (schema_cache or SchemaCache()).get(conn)
+    report_statements = []
+    suggestions = {}
+    used = set()
+
+    for item in sorted(statements, key=lambda s: -s['count']):
+        entry = dict(item, **analyze_statement(conn, item['sql'], schema))
+        used.update(entry['indexes_used'])
+        for suggestion in entry['suggestions']:
+            # Выигрыш: меньше прочитанных строк на каждое выполнение, плюс снятая сортировка
+            per_run = suggestion['rows_before'] - suggestion['rows_after']
+            if suggestion['removes_sort'] and suggestion['rows_before']:
+                per_run += int(suggestion['rows_before'] * math.log2(max(2, suggestion['rows_before'])))
+            total = suggestions.setdefault(suggestion['sql'], dict(suggestion, benefit=0, statements=0))
+            total['benefit'] += per_run * item['count']
+            total['statements'] += 1
+        report_statements.append(entry)
+
+    unused = [
+        {'index': index.name, 'table': table.name, 'columns': index.columns}
+        for table in schema.tables.values() for index in table.indexes
+        if index.origin == 'c' and index.name not in used
+    ]
+    return {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'statements': report_statements,
+        'suggestions': sorted(suggestions.values(), key=lambda s: -s['benefit']),
+        'unused_indexes': unused if report_statements else [],
+    }
+
+
+def format_report(report: Dict) -> str:
+    """Текстовый отчет для консоли"""
+    statements = report['statements']
+    lines = [f"Проанализировано запросов: {len(statements)} ({report['generated']})", ""]
+    problems = [s for s in statements if s['full_scans'] or s['temp_btrees'] or s.get('error')]
+    lines.append(f"Запросы с полным просмотром или временным B-деревом: {len(problems)}")
+    for s in problems:
+        flags = [f"SCAN {t}" for t in s['full_scans']] + [f"TEMP B-TREE {r}" for r in s['temp_btrees']]
+        if s.get('error'):
+            flags.append(f"ошибка: {s['error']}")
+        lines.append(f"  [{s['count']:>6}x] {s['fingerprint'][:110]}")
+        lines.append(f"           {'; '.join(flags)}")
+
+    lines += ["", "Предлагаемые индексы (по убыванию оценочного выигрыша):"]
+    if not report['suggestions']:
+        lines.append("  нет")
+    for s in report['suggestions']:
+        lines.append(f"  {s['sql']};")
+        lines.append(
+            f"      строк на выполнение: ~{s['rows_before']} -> ~{s['rows_after']}"
+            + (", без сортировки" if s['removes_sort'] else "")
+            + (", покрывающий" if s['covering'] else "")
+            + f"; запросов: {s['statements']}, оценка выигрыша: {s['benefit']}"
+        )
+
+    lines += ["", "Индексы, не использованные ни одним запросом:"]
+    lines += [f"  {u['index']} ON {u['table']}({', '.join(u['columns'])})" for u in report['unused_indexes']] or ["  нет"]
+    return "\n".join(lines)
+
+
+# --- Сбор запросов приложения ---
+
+_setting = os.environ.get(CAPTURE_ENV, '').strip()
+session_log: Optional[StatementLog] = StatementLog() if _setting not in ('', '0') else None
+
+
+def capture(conn):
+    """Подключает соединение к журналу сессии, если сбор включен"""
+    if session_log is not None:
+        session_log.attach(conn)
+
+
+def _save_at_exit():
+    if _setting in ('1', 'true', 'yes'):
+        path = Path(__file__).parent.parent.parent / 'logs' / \
+            f'sql_capture_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    else:
+        path = Path(_setting)
+    try:
+        print(f"Журнал SQL сохранен: {session_log.save(path)}", file=sys.stderr)
+    except Exception as e:
+        print(f"Не удалось сохранить журнал SQL: {e}", file=sys.stderr)
+
+
+if session_log is not None:
+    atexit.register(_save_at_exit)
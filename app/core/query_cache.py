@@ -0,0 +1,133 @@
+# app/core/query_cache.py
+"""
+LRU-кэш результатов читающих SQL-запросов.
+
+Ключ - нормализованный текст запроса и параметры. Вместе с результатом хранится
+версия данных, на которой он получен (например, PRAGMA data_version); при чтении
+с другой версией запись считается устаревшей и удаляется. Модуль использует только
+стандартную библиотеку - его импортирует и sqlite_web.py.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Ограничения по умолчанию: записей и суммарно строк результатов в кэше
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_ROWS = 200_000
+
+# Кэшируются только запросы на чтение без функций, результат которых зависит от момента вызова
+CACHEABLE_KEYWORDS = ('select', 'with', 'values')
+NONDETERMINISTIC = ('random(', 'randomblob(', "'now'", 'current_time', 'current_date',
+                    'changes(', 'last_insert_rowid(')
+
+
+def normalize_sql(sql: str) -> str:
+    """Схлопывает пробельные символы вне строковых литералов и убирает завершающую ';'"""
+    out = []
+    quote = None
+    pending_space = False
+    for ch in sql.strip().rstrip(';').strip():
+        if quote:
+            out.append(ch)
+            if ch == quote:
+                quote = None
+        elif ch.isspace():
+            pending_space = True
+        else:
+            if pending_space and out:
+                out.append(' ')
+            pending_space = False
+            if ch in ('"', "'", '`'):
+                quote = ch
+            elif ch == '[':
+                quote = ']'
+            out.append(ch)
+    return ''.join(out)
+
+
+def is_cacheable(sql: str) -> bool:
+    lowered = sql.lstrip().lower()
+    return lowered.startswith(CACHEABLE_KEYWORDS) and not any(f in lowered for f in NONDETERMINISTIC)
+
+
+def make_key(sql: str, params=None) -> Tuple[str, Hashable]:
+    if params is None:
+        frozen = ()
+    elif isinstance(params, dict):
+        frozen = tuple(sorted(params.items()))
+    else:
+        frozen = tuple(params)
+    return normalize_sql(sql), frozen
+
+
+class QueryCache:
+    """
+    Кэш с вытеснением давно не использованных записей. Размер ограничен числом
+    записей и суммой строк результатов; слишком большой результат не кэшируется.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_rows: int = DEFAULT_MAX_ROWS):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[Tuple, Tuple[Hashable, Any, int]]" = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key, version) -> Optional[Any]:
+        """Результат, полученный на той же версии данных, или None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != version:
+                self._drop(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, value, rows: int = 1):
+        if not self.enabled or rows > self.max_rows:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, value, rows)
+            self._rows += rows
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        self._rows -= self._entries.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'rows': self._rows,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'stale': self.stale,
+                'evictions': self.evictions,
+                'max_entries': self.max_entries,
+                'max_rows': self.max_rows,
+            }
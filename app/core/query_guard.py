@@ -0,0 +1,157 @@
+# app/core/query_guard.py
+"""
+Контроль выполнения произвольных SQL-запросов: бюджет времени, бюджет строк и отмена.
+
+Время и отмена проверяются обработчиком прогресса SQLite (set_progress_handler): он
+вызывается каждые steps инструкций виртуальной машины, и ненулевой ответ прерывает
+запрос (OperationalError: interrupted). Отмена из другого потока дополнительно
+вызывает Connection.interrupt(). Модуль использует только стандартную библиотеку -
+его импортирует и sqlite_web.py.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Как часто (в инструкциях виртуальной машины SQLite) вызывается обработчик прогресса
+PROGRESS_STEPS = 10000
+
+# Причины остановки запроса
+TIMEOUT = 'timeout'
+CANCELLED = 'cancelled'
+
+
+class QueryGuard:
+    """
+    Бюджеты одного запроса. Срок отсчитывается от создания, поэтому покрывает и
+    ожидание соединения, и несколько выполнений подряд (например, повтор на писателе).
+
+    Строки SQLite не сообщает, поэтому объем работы оценивается числом инструкций
+    виртуальной машины (steps), а бюджет строк ограничивает выборку через fetch().
+    """
+
+    def __init__(self, time_budget: Optional[float] = None, row_budget: Optional[int] = None,
+                 sql: str = '', steps: int = PROGRESS_STEPS):
+        self.time_budget = time_budget
+        self.row_budget = row_budget
+        self.sql = sql
+        self.steps = steps
+        self.started = time.monotonic()
+        self.deadline = self.started + time_budget if time_budget else None
+        self.reason: Optional[str] = None
+        self.vm_steps = 0
+        self.rows = 0
+        self.truncated = False
+        self._cancelled = False
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def _progress(self):
+        self.vm_steps += self.steps
+        if self._cancelled:
+            self.reason = CANCELLED
+            return 1
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.reason = TIMEOUT
+            return 1
+        return 0
+
+    @contextmanager
+    def attach(self, conn):
+        """Обработчик прогресса на время выполнения запросов соединения"""
+        with self._lock:
+            self._conn = conn
+        conn.set_progress_handler(self._progress, self.steps)
+        try:
+            yield conn
+        finally:
+            conn.set_progress_handler(None, 0)
+            with self._lock:
+                self._conn = None
+
+    def cancel(self):
+        """Отмена из любого потока: запрос прервется при ближайшей проверке"""
+        with self._lock:
+            self._cancelled = True
+            # interrupt() может прервать запрос раньше обработчика прогресса
+            self.reason = self.reason or CANCELLED
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def fetch(self, cursor, size: int) -> List:
+        """fetchmany с учетом бюджета строк; после исчерпания бюджета возвращает []"""
+        if self.row_budget is not None:
+            size = min(size, self.row_budget - self.rows)
+            if size <= 0:
+                self.truncated = self.truncated or cursor.fetchone() is not None
+                return []
+        rows = cursor.fetchmany(size)
+        self.rows += len(rows)
+        if self.row_budget is not None and self.rows >= self.row_budget and not self.truncated:
+            # Бюджет исчерпан этим блоком: сразу отмечаем, остались ли строки
+            self.truncated = cursor.fetchone() is not None
+        return rows
+
+    def fetch_all(self, cursor, batch: int = 1000) -> List:
+        result = []
+        while True:
+            rows = self.fetch(cursor, batch)
+            if not rows:
+                return result
+            result.extend(rows)
+
+    def error_message(self, error) -> str:
+        if 'interrupted' in str(error):
+            if self.reason == CANCELLED:
+                return "Запрос отменен"
+            if self.time_budget:
+                return f"Превышено время выполнения запроса ({self.time_budget:g} с)"
+        return str(error)
+
+    def stats(self) -> Dict:
+        return {
+            'elapsed_ms': round(self.elapsed * 1000, 1),
+            'vm_steps': self.vm_steps,
+            'rows': self.rows,
+            'truncated': self.truncated,
+            'stopped': self.reason,
+        }
+
+
+class ActiveQueries:
+    """Выполняющиеся запросы по идентификатору, выданному клиентом (для отмены)"""
+
+    def __init__(self):
+        self._guards: Dict[str, QueryGuard] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, query_id: Optional[str], guard: QueryGuard):
+        if not query_id:
+            yield guard
+            return
+        with self._lock:
+            self._guards[query_id] = guard
+        try:
+            yield guard
+        finally:
+            with self._lock:
+                if self._guards.get(query_id) is guard:
+                    del self._guards[query_id]
+
+    def cancel(self, query_id: str) -> bool:
+        with self._lock:
+            guard = self._guards.get(query_id)
+        if guard is None:
+            return False
+        guard.cancel()
+        return True
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            items = list(self._guards.items())
+        return [dict(guard.stats(), id=query_id, sql=guard.sql[:200]) for query_id, guard in items]
@@ -1,14 +1,76 @@
 import logging
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.utils import tracing
+from app.utils import metrics
 
 # Настраиваем логгер для модуля
 logger = logging.getLogger('expert_system.recommender')
 
+# Порог расхода кислоты, выше которого считается, что идет импульс подачи
+ACID_PULSE_THRESHOLD = 1.0
+# Сколько профилей держать в кэше лестниц
+PULSE_CACHE_SIZE = 32
+
+
+@dataclass
+class AcidPulses:
+    """Ступени "лестницы" подачи кислоты: индексы минут профиля [start, end)"""
+    start: np.ndarray
+    end: np.ndarray
+    duration: np.ndarray
+    avg_flow: np.ndarray
+
+    def __len__(self):
+        return len(self.start)
+
+
+def extract_acid_pulses(acid_flow, threshold: float = ACID_PULSE_THRESHOLD) -> AcidPulses:
+    """Все импульсы подачи кислоты за один проход (RLE маски acid_flow > threshold)"""
+    flow = np.asarray(acid_flow, dtype=np.float64)
+    active = flow > threshold
+
+    # Границы серий: +1 - начало импульса, -1 - минута после его конца
+    edges = np.diff(active.astype(np.int8), prepend=0, append=0)
+    start = np.flatnonzero(edges == 1)
+    end = np.flatnonzero(edges == -1)
+    duration = end - start
+
+    # Сумма расхода внутри каждого импульса через накопленную сумму (NaN вне импульсов не мешает)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(active, flow, 0.0))))
+    avg_flow = (csum[end] - csum[start]) / np.maximum(duration, 1)
+
+    return AcidPulses(start=start, end=end, duration=duration, avg_flow=avg_flow)
+
 
 class ProcessRecommender:
     def __init__(self, db_manager):
         self.db = db_manager
+        self._pulse_cache = {}
 
+    def get_acid_pulses(self, batch_id, history_df) -> AcidPulses:
+        """Лестница подачи кислоты для профиля партии (кэш общий для всех аппаратов)"""
+        flow = history_df['acid_flow'].to_numpy(dtype=np.float64)
+        # В ключ входит "отпечаток" профиля, чтобы переимпорт партии не отдавал старые ступени
+        key = (batch_id, len(flow), float(np.nansum(flow)))
+        pulses = self._pulse_cache.get(key)
+        if pulses is None:
+            metrics.inc('recommender.pulse_cache.miss')
+            pulses = extract_acid_pulses(flow)
+            for old_key in [k for k in self._pulse_cache if k[0] == batch_id]:
+                del self._pulse_cache[old_key]
+            if len(self._pulse_cache) >= PULSE_CACHE_SIZE:
+                self._pulse_cache.pop(next(iter(self._pulse_cache)))
+            self._pulse_cache[key] = pulses
+            metrics.set_gauge('recommender.pulse_cache.size', len(self._pulse_cache))
+        else:
+            metrics.inc('recommender.pulse_cache.hit')
+        return pulses
 
+    @metrics.timed('recommender.find_best_match')
+    @tracing.traced(cat='recommender')
     def find_best_match(self, input_data):
         logger.info("--- Запуск поиска эталонной партии ---")
 
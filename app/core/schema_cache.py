@@ -0,0 +1,176 @@
+# app/core/schema_cache.py
+"""
+Кэш метаданных схемы SQLite: таблицы, столбцы, индексы и оценки числа строк.
+
+Снимок перечитывается, только когда меняется PRAGMA schema_version (номер хранится
+в заголовке файла БД, поэтому он общий для всех соединений и процессов). Модуль
+использует только стандартную библиотеку - его импортирует и sqlite_web.py.
+"""
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Метка служебных запросов модуля: журнал запросов (query_advisor) их пропускает
+INTERNAL_SQL_MARK = '/* internal */'
+
+
+@dataclass
+class ColumnInfo:
+    name: str
+    type: str
+    notnull: bool
+    default: Optional[str]
+    pk: int  # позиция в первичном ключе, 0 - не входит
+
+
+@dataclass
+class IndexInfo:
+    name: str
+    columns: List[str]
+    unique: bool
+    origin: str  # 'c' - CREATE INDEX, 'pk' / 'u' - автоматический (PRIMARY KEY / UNIQUE)
+    partial: bool
+
+
+@dataclass
+class TableInfo:
+    name: str
+    type: str  # 'table' или 'view'
+    columns: List[ColumnInfo] = field(default_factory=list)
+    indexes: List[IndexInfo] = field(default_factory=list)
+    without_rowid: bool = False
+    # Число строк по статистике ANALYZE (sqlite_stat1) и max(rowid) - обе на момент
+    # чтения снимка; точный COUNT(*) здесь не выполняется
+    stat_rows: Optional[int] = None
+    max_rowid: Optional[int] = None
+
+    @property
+    def row_estimate(self) -> Optional[int]:
+        return self.stat_rows if self.stat_rows is not None else self.max_rowid
+
+    @property
+    def pk_columns(self) -> List[str]:
+        return [col.name for col in sorted(self.columns, key=lambda c: c.pk) if col.pk]
+
+
+@dataclass
+class Schema:
+    version: int
+    tables: Dict[str, TableInfo]
+
+    def table_names(self, include_views: bool = False) -> List[str]:
+        return [name for name, info in self.tables.items()
+                if info.type == 'table' or include_views]
+
+    def to_dict(self) -> Dict:
+        """Описание столбцов таблиц в формате /schema веб-интерфейса"""
+        return {
+            name: [
+                {'name': col.name, 'type': col.type, 'notnull': col.notnull,
+                 'dflt_value': col.default, 'pk': bool(col.pk)}
+                for col in info.columns
+            ]
+            for name, info in self.tables.items() if info.type == 'table'
+        }
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _stat1_rows(conn) -> Dict[str, int]:
+    """Число строк таблиц по sqlite_stat1 (первое число поля stat)"""
+    try:
+        stats = conn.execute("SELECT tbl, stat FROM sqlite_stat1").fetchall()
+    except sqlite3.OperationalError:
+        return {}  # ANALYZE не выполнялся
+    rows = {}
+    for table, stat in stats:
+        head = (stat or '').split(' ', 1)[0]
+        if head.isdigit():
+            rows[table] = max(rows.get(table, 0), int(head))
+    return rows
+
+
+def _without_rowid(conn) -> Optional[Dict[str, bool]]:
+    """Признак WITHOUT ROWID по PRAGMA table_list (SQLite 3.37+), иначе None"""
+    try:
+        rows = conn.execute("PRAGMA table_list").fetchall()
+    except sqlite3.OperationalError:
+        return None
+    return {row[1]: bool(row[4]) for row in rows if row[0] == 'main'}
+
+
+def load_schema(conn) -> Schema:
+    """Полное чтение схемы (PRAGMA по каждой таблице и индексу)"""
+    version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    stat_rows = _stat1_rows(conn)
+    without_rowid = _without_rowid(conn)
+    tables = {}
+    for name, kind, sql in conn.execute(
+            "SELECT name, type, sql FROM sqlite_master WHERE type IN ('table', 'view') ORDER BY name"
+    ).fetchall():
+        quoted = _quote(name)
+        info = TableInfo(name=name, type=kind)
+        info.columns = [
+            ColumnInfo(name=col[1], type=col[2], notnull=bool(col[3]), default=col[4], pk=col[5])
+            for col in conn.execute(f"PRAGMA table_info({quoted})").fetchall()
+        ]
+        if kind == 'table':
+            if without_rowid is not None:
+                info.without_rowid = without_rowid.get(name, False)
+            else:
+                info.without_rowid = 'WITHOUT ROWID' in (sql or '').upper()
+            for _, index_name, unique, origin, partial in conn.execute(f"PRAGMA index_list({quoted})").fetchall():
+                columns = [row[2] for row in conn.execute(f"PRAGMA index_info({_quote(index_name)})").fetchall()]
+                info.indexes.append(IndexInfo(index_name, columns, bool(unique), origin, bool(partial)))
+            info.stat_rows = stat_rows.get(name)
+            if not info.without_rowid:
+                # max(rowid) - один спуск по B-дереву, верхняя оценка числа строк
+                info.max_rowid = conn.execute(
+                    f"{INTERNAL_SQL_MARK} SELECT max(rowid) FROM {quoted}").fetchone()[0] or 0
+        tables[name] = info
+    return Schema(version=version, tables=tables)
+
+
+class SchemaCache:
+    """
+    Снимок схемы одной БД. get(conn) стоит один PRAGMA schema_version, пока схема
+    не изменилась. ANALYZE номер схемы не меняет - после него вызывайте invalidate(),
+    чтобы обновить оценки числа строк.
+    """
+
+    def __init__(self):
+        self._schema: Optional[Schema] = None
+        self._lock = threading.Lock()
+
+    def get(self, conn) -> Schema:
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        schema = self._schema
+        if schema is not None and schema.version == version:
+            return schema
+        with self._lock:
+            # Другой поток мог уже перечитать схему, пока мы ждали блокировку
+            schema = self._schema
+            if schema is None or schema.version != version:
+                schema = self._schema = load_schema(conn)
+            return schema
+
+    def invalidate(self):
+        self._schema = None
+
+
+# Общие кэши по пути к файлу БД: DatabaseManager и утилиты одной базы видят один снимок
+_caches: Dict[str, SchemaCache] = {}
+_caches_lock = threading.Lock()
+
+
+def schema_cache(db_path) -> SchemaCache:
+    key = os.path.abspath(str(db_path))
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = SchemaCache()
+        return cache
@@ -0,0 +1,140 @@
+import time
+
+from PyQt5.QtCore import Qt, QObject, QTimer, QEvent
+
+from app.utils.config import config
+
+
+class _Job:
+    __slots__ = ('owner', 'callback', 'interval', 'pause_when_hidden', 'next_due', 'last_run')
+
+    def __init__(self, owner, callback, interval, pause_when_hidden):
+        self.owner = owner
+        self.callback = callback
+        self.interval = interval            # None - каждый кадр
+        self.pause_when_hidden = pause_when_hidden
+        now = time.monotonic()
+        self.next_due = now + (interval or 0)
+        self.last_run = now
+
+
+class FrameScheduler(QObject):
+    """
+    Единые часы для анимаций и периодических задач GUI.
+
+    Все задачи выполняются из одного QTimer с ограничением частоты кадров.
+    Задачи скрытых вкладок и свернутых окон приостанавливаются; если активных
+    задач нет, таймер останавливается полностью. update() виджетов, запрошенные
+    за тик, сводятся в один вызов на виджет.
+    """
+
+    def __init__(self, fps_cap=None, parent=None):
+        super().__init__(parent)
+        self._jobs = []
+        self._dirty = []
+        self._watched = set()
+        self.frame_interval = 1.0 / max(1, fps_cap or config.ui.animation_fps)
+
+        self._tick_interval = self.frame_interval
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+
+    def set_fps_cap(self, fps):
+        self.frame_interval = 1.0 / max(1, fps)
+        self._sync_timer()
+
+    def add_job(self, owner, callback, interval_ms=None, pause_when_hidden=True):
+        """
+        Регистрация задачи: callback(dt) вызывается каждый кадр (interval_ms=None)
+        или не чаще, чем раз в interval_ms. Возвращает дескриптор для remove_job.
+        """
+        job = _Job(owner, callback, interval_ms / 1000 if interval_ms else None, pause_when_hidden)
+        self._jobs.append(job)
+        self._watch(owner)
+        self._sync_timer()
+        return job
+
+    def remove_job(self, job):
+        if job in self._jobs:
+            self._jobs.remove(job)
+        self._sync_timer()
+
+    def request_update(self, widget):
+        """Отложенный update(): за один тик виджет перерисовывается не более одного раза"""
+        if widget not in self._dirty:
+            self._dirty.append(widget)
+
+    def _watch(self, widget):
+        # Показ/скрытие виджета и сворачивание окна пересчитывают состояние таймера
+        for obj in (widget, widget.window()):
+            if obj not in self._watched:
+                obj.installEventFilter(self)
+                obj.destroyed.connect(lambda _=None, o=obj: self._forget(o))
+                self._watched.add(obj)
+
+    def _forget(self, obj):
+        self._watched.discard(obj)
+        self._jobs = [job for job in self._jobs if job.owner is not obj]
+        self._dirty = [widget for widget in self._dirty if widget is not obj]
+        self._sync_timer()
+
+    def eventFilter(self, obj, event):
+        if event.type() in (QEvent.Show, QEvent.Hide, QEvent.WindowStateChange):
+            self._sync_timer()
+        return False
+
+    @staticmethod
+    def _is_active(job):
+        if not job.pause_when_hidden:
+            return True
+        owner = job.owner
+        return owner.isVisible() and not owner.window().isMinimized()
+
+    def _sync_timer(self):
+        active = [job for job in self._jobs if self._is_active(job)]
+        if not active:
+            self._timer.stop()
+            return
+
+        # Частота тика - по самой "быстрой" активной задаче, но не выше ограничения FPS
+        interval = min(job.interval or self.frame_interval for job in active)
+        self._tick_interval = max(interval, self.frame_interval)
+        interval_ms = max(1, int(self._tick_interval * 1000))
+        if not self._timer.isActive() or self._timer.interval() != interval_ms:
+            self._timer.start(interval_ms)
+
+    def _tick(self):
+        now = time.monotonic()
+        for job in list(self._jobs):
+            # Задачу мог снять обработчик, выполненный раньше в этом же тике
+            if job not in self._jobs or not self._is_active(job):
+                continue
+            if job.interval is not None:
+                # Допуск в полтика: таймер может сработать чуть раньше срока
+                if now < job.next_due - self._tick_interval / 2:
+                    continue
+                job.next_due += job.interval
+                # После паузы не догоняем пропущенные тики пачкой
+                if job.next_due < now:
+                    job.next_due = now + job.interval
+            dt = now - job.last_run
+            job.last_run = now
+            job.callback(dt)
+
+        dirty, self._dirty = self._dirty, []
+        for widget in dirty:
+            widget.update()
+
+        self._sync_timer()
+
+
+_scheduler = None
+
+
+def frame_scheduler():
+    """Общий планировщик кадров приложения"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FrameScheduler()
+    return _scheduler
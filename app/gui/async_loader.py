@@ -0,0 +1,101 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from app.utils.logger import logger
+
+# Потоков под чтения БД: SQLite все равно сериализует запись, для чтений хватает двух
+MAX_QUERY_THREADS = 2
+
+
+class _TaskSignals(QObject):
+    # key, generation, result, error
+    finished = pyqtSignal(str, int, object, object)
+
+
+class _QueryTask(QRunnable):
+    def __init__(self, signals, key, generation, fn, args, kwargs):
+        super().__init__()
+        self.signals = signals
+        self.key = key
+        self.generation = generation
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        try:
+            result, error = self.fn(*self.args, **self.kwargs), None
+        except Exception as e:
+            result, error = None, e
+        # Сигнал объекта из GUI-потока доставляется туда через очередь событий
+        self.signals.finished.emit(self.key, self.generation, result, error)
+
+
+class AsyncQueryExecutor(QObject):
+    """
+    Выполнение чтений БД/pandas в пуле потоков с доставкой результата в GUI-поток.
+
+    Запросы группируются по ключу: новый submit с тем же ключом делает предыдущий
+    устаревшим, и его результат будет отброшен (например, при быстром переборе партий).
+    """
+
+    # key, занят ли ключ (для индикаторов загрузки)
+    busy_changed = pyqtSignal(str, bool)
+
+    def __init__(self, max_threads=MAX_QUERY_THREADS, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads)
+        # Потоки не завершаются по простою: у каждого свое соединение с БД
+        # (DatabaseManager.get_connection), и пересоздание потока стоило бы нового
+        self._pool.setExpiryTimeout(-1)
+        self._generations = {}
+        self._handlers = {}
+
+        self._signals = _TaskSignals()
+        self._signals.finished.connect(self._on_finished)
+
+    def submit(self, key, fn, *args, on_result=None, on_error=None, **kwargs):
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+        self._handlers[key] = (on_result, on_error)
+
+        self._pool.start(_QueryTask(self._signals, key, generation, fn, args, kwargs))
+        self.busy_changed.emit(key, True)
+        return generation
+
+    def cancel(self, key):
+        """Результат текущего запроса по ключу будет отброшен"""
+        if key in self._handlers:
+            self._generations[key] += 1
+            del self._handlers[key]
+            self.busy_changed.emit(key, False)
+
+    def is_busy(self, key):
+        return key in self._handlers
+
+    def _on_finished(self, key, generation, result, error):
+        if self._generations.get(key) != generation:
+            logger.debug(f"Отброшен устаревший результат запроса {key}")
+            return
+
+        on_result, on_error = self._handlers.pop(key, (None, None))
+        self.busy_changed.emit(key, False)
+
+        if error is not None:
+            if on_error:
+                on_error(error)
+            else:
+                logger.error(f"Ошибка фонового запроса {key}: {error}")
+        elif on_result:
+            on_result(result)
+
+
+_executor = None
+
+
+def query_executor():
+    """Общий исполнитель фоновых запросов приложения"""
+    global _executor
+    if _executor is None:
+        _executor = AsyncQueryExecutor()
+    return _executor
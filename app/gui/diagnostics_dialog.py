@@ -0,0 +1,68 @@
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QPushButton, QMessageBox
+)
+from PyQt5.QtGui import QFont
+from PyQt5.QtCore import Qt
+from app.gui.animation import frame_scheduler
+from app.utils import metrics
+
+# Период автообновления сводки, мс
+REFRESH_INTERVAL_MS = 1000
+
+
+class DiagnosticsDialog(QDialog):
+    """Сводка метрик производительности: задержки операций, счетчики и датчики"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Диалог создается при каждом открытии - после закрытия удаляется вместе с задачей обновления
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setWindowTitle("Диагностика производительности")
+        self.setMinimumSize(900, 600)
+
+        layout = QVBoxLayout(self)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setFont(QFont("Consolas", 10))
+        self.text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        layout.addWidget(self.text)
+
+        buttons = QHBoxLayout()
+        btn_reset = QPushButton("Сбросить")
+        btn_reset.clicked.connect(self.reset_metrics)
+        btn_dump = QPushButton("Сохранить в файл")
+        btn_dump.clicked.connect(self.dump_metrics)
+        btn_close = QPushButton("Закрыть")
+        btn_close.clicked.connect(self.accept)
+        buttons.addWidget(btn_reset)
+        buttons.addWidget(btn_dump)
+        buttons.addStretch()
+        buttons.addWidget(btn_close)
+        layout.addLayout(buttons)
+
+        self.refresh()
+        self._refresh_job = frame_scheduler().add_job(
+            self.text, lambda dt: self.refresh(), interval_ms=REFRESH_INTERVAL_MS
+        )
+        self.finished.connect(self._stop_refresh)
+
+    def _stop_refresh(self):
+        frame_scheduler().remove_job(self._refresh_job)
+
+    def refresh(self):
+        # Сохраняем позицию прокрутки при обновлении текста
+        scroll = self.text.verticalScrollBar().value()
+        self.text.setPlainText(metrics.registry.summary_text())
+        self.text.verticalScrollBar().setValue(scroll)
+
+    def reset_metrics(self):
+        metrics.registry.reset()
+        self.refresh()
+
+    def dump_metrics(self):
+        try:
+            path = metrics.registry.dump()
+            QMessageBox.information(self, "Диагностика", f"Метрики сохранены:\n{path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Диагностика", f"Не удалось сохранить метрики: {e}")
@@ -6,6 +6,7 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 from app.core.data_importer import ExternalDBImporter
+from app.utils import metrics
 
 
 class ImportDataDialog(QDialog):
@@ -254,7 +255,8 @@ class ImportDataDialog(QDialog):
                 return val
 
             # 1. Чтение данных
-            df = pd.read_csv(self.filepath) if self.filepath.endswith('.csv') else pd.read_excel(self.filepath)
+            with metrics.timer('import.file_read'):
+                df = pd.read_csv(self.filepath) if self.filepath.endswith('.csv') else pd.read_excel(self.filepath)
 
             # 2. Формируем маппинг из комбобоксов
             rename_map = {}
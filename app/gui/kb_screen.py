@@ -1,15 +1,56 @@
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
-    QTableWidgetItem, QHeaderView, QGroupBox, QLineEdit,
+    QWidget, QVBoxLayout, QHBoxLayout, QTableView,
+    QAbstractItemView, QHeaderView, QGroupBox, QLineEdit,
     QLabel, QComboBox, QPushButton, QFrame, QMessageBox
 )
 from PyQt5.QtCore import Qt
-from app.gui.import_dialog import ImportDataDialog
+from app.gui.async_loader import query_executor
+from app.gui.table_models import ColumnarTableModel
+
+# Сколько партий подгружать за одну прокрутку до конца таблицы
+BATCH_PAGE_SIZE = 500
+
+# Ключи фоновых запросов экрана (новый запрос с тем же ключом отменяет предыдущий)
+BATCHES_QUERY = 'kb.batches'
+PROCESS_QUERY = 'kb.process'
+
+# Столбцы реестра партий: (заголовок, поле, форматирование)
+BATCH_COLUMNS = [
+    ("ID Партии", 'batch_id', str),
+    ("Дата", 'extraction_date', str),
+    ("СФР", 'sulfate_number', lambda v: f"СФР-{v}"),
+    ("Масса, кг", 'sample_weight', lambda v: f"{v:.1f}"),
+    ("Извлеч. %", 'extraction_percent', lambda v: f"{v}%"),
+    ("Ni %", 'ni_percent', lambda v: f"{v:.2f}"),
+    ("Cu %", 'cu_percent', lambda v: f"{v:.2f}"),
+    ("Pt %", 'pt_percent', lambda v: f"{v:.2f}"),
+    ("Pd %", 'pd_percent', lambda v: f"{v:.2f}"),
+    ("SiO2 %", 'sio2_percent', lambda v: f"{v:.2f}"),
+    ("C %", 'c_percent', lambda v: f"{v:.2f}"),
+    ("Se %", 'se_percent', lambda v: f"{v:.2f}"),
+]
+
+# Столбцы процессных данных
+PROCESS_COLUMNS = [
+    ("Время", 'timestamp', str),
+    ("Т раст. 1", 'temperature_1', lambda v: f"{v:.1f}"),
+    ("Т раст. 2", 'temperature_2', lambda v: f"{v:.1f}"),
+    ("Т газа", 'temperature_3', lambda v: f"{v:.1f}"),
+    ("Ток", 'current_value', lambda v: f"{v:.3f}"),
+    ("Расход кисл.", 'acid_flow', lambda v: f"{v:.2f}"),
+    ("Уров. микс.", 'level_mixer', lambda v: f"{v:.1f}"),
+    ("Полож. электр.", 'electrodes_pos', lambda v: f"{v:.1f}"),
+    ("Опт. темп.", 'optimal_temp', lambda v: f"{v:.1f}"),
+]
 
 class KnowledgeBaseScreen(QWidget):
     def __init__(self, db_manager, parent=None):
         super().__init__(parent)
         self.db = db_manager
+        self.executor = query_executor()
+        self.executor.busy_changed.connect(self._on_query_busy)
+        # Номер выборки реестра: страницы прежних фильтров отбрасываются
+        self._batch_generation = 0
         self.init_ui()
 
     def init_ui(self):
@@ -64,6 +105,13 @@ class KnowledgeBaseScreen(QWidget):
             """)
         self.btn_delete.clicked.connect(self.delete_selected_batch)
 
+        # Кнопка Диагностика (метрики производительности)
+        self.btn_diagnostics = QPushButton("ДИАГНОСТИКА")
+        self.btn_diagnostics.setFixedWidth(btn_width)
+        self.btn_diagnostics.setFixedHeight(btn_height)
+        self.btn_diagnostics.setStyleSheet("background-color: #546E7A; color: white; font-weight: bold; padding: 5px 15px;")
+        self.btn_diagnostics.clicked.connect(self.open_diagnostics)
+
         filter_layout.addWidget(QLabel("Аппарат:"))
         filter_layout.addWidget(self.filter_sfr)
         filter_layout.addWidget(QLabel("Масса от:"))
@@ -71,29 +119,32 @@ class KnowledgeBaseScreen(QWidget):
         filter_layout.addWidget(QLabel("Эффективность:"))
         filter_layout.addWidget(self.filter_extract)
         filter_layout.addStretch()
+
+        # Индикатор фоновой загрузки
+        self.lbl_loading = QLabel("")
+        self.lbl_loading.setStyleSheet("color: #757575; font-style: italic;")
+        filter_layout.addWidget(self.lbl_loading)
         filter_layout.addWidget(self.btn_search)
         filter_layout.addWidget(self.btn_import)
         filter_layout.addWidget(self.btn_delete)
+        filter_layout.addWidget(self.btn_diagnostics)
         filter_group.setLayout(filter_layout)
         layout.addWidget(filter_group)
 
         # --- ОБЛАСТЬ 2: ТАБЛИЦА BATCHES (ВЕРХНЯЯ) ---
         layout.addWidget(QLabel("<b>Реестр успешных партий (batches):</b>"))
-        self.table_batches = QTableWidget()
+        self.batches_model = ColumnarTableModel(BATCH_COLUMNS, row_numbers=True, parent=self)
+        self.table_batches = QTableView()
+        self.table_batches.setModel(self.batches_model)
 
         self.table_batches.verticalHeader().setVisible(True)
+        self.table_batches.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.table_batches.verticalHeader().setDefaultSectionSize(25)
 
-        self.table_batches.setColumnCount(12)
-        self.table_batches.setHorizontalHeaderLabels([
-            "ID Партии", "Дата", "СФР", "Масса, кг", "Извлеч. %",
-            "Ni %", "Cu %", "Pt %", "Pd %", "SiO2 %", "C %", "Se %"
-        ])
-
         self.table_batches.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
-        self.table_batches.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table_batches.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.table_batches.itemSelectionChanged.connect(self.on_batch_selected)
+        self.table_batches.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table_batches.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table_batches.selectionModel().selectionChanged.connect(self.on_batch_selected)
         layout.addWidget(self.table_batches)
 
         # Разделитель
@@ -106,23 +157,21 @@ class KnowledgeBaseScreen(QWidget):
 
         self.lbl_process_title = QLabel("<b>Подробные параметры тех. процесса (process_data):</b>")
         layout.addWidget(self.lbl_process_title)
-        self.table_process = QTableWidget()
+        self.process_model = ColumnarTableModel(PROCESS_COLUMNS, parent=self)
+        self.table_process = QTableView()
+        self.table_process.setModel(self.process_model)
         self.table_process.verticalHeader().setVisible(False)
-        self.table_process.setColumnCount(9)
-        self.table_process.setHorizontalHeaderLabels([
-            "Время", "Т раст. 1", "Т раст. 2", "Т газа", "Ток", "Расход кисл.",
-            "Уров. микс.", "Полож. электр.", "Опт. темп."
-        ])
+        # Фиксированная высота строк: представление не измеряет каждую строку
+        self.table_process.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
 
         self.table_process.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.table_process.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table_process.setEditTriggers(QAbstractItemView.NoEditTriggers)
         layout.addWidget(self.table_process)
         self.table_batches.verticalHeader().setFixedWidth(40)
         self.load_batches()
 
     def load_batches(self):
-        """Загрузка данных с фильтрацией"""
-        all_batches = self.db.get_all_batches()
+        """Загрузка первой страницы реестра; фильтры выполняет SQL, остальное - по прокрутке"""
         sfr_filter = self.filter_sfr.currentText()
         extract_filter = self.filter_extract.currentText()
 
@@ -140,35 +189,49 @@ class KnowledgeBaseScreen(QWidget):
             except:
                 min_extract = 0
 
-        self.table_batches.setRowCount(0)
-        row_idx = 0
-        for b in all_batches:
-            # Фильтр СФР
-            if sfr_filter != "Все аппараты" and str(b['sulfate_number']) != sfr_filter:
-                continue
-
-            # Фильтр Масса
-            if b['sample_weight'] < min_mass:
-                continue
-
-            # Фильтр Извлечение (ИСПРАВЛЕНО)
-            if b['extraction_percent'] < min_extract:
-                continue
-
-            self.table_batches.insertRow(row_idx)
-            self.table_batches.setItem(row_idx, 0, QTableWidgetItem(str(b['batch_id'])))
-            self.table_batches.setItem(row_idx, 1, QTableWidgetItem(str(b['extraction_date'])))
-            self.table_batches.setItem(row_idx, 2, QTableWidgetItem(f"СФР-{b['sulfate_number']}"))
-            self.table_batches.setItem(row_idx, 3, QTableWidgetItem(f"{b['sample_weight']:.1f}"))
-            self.table_batches.setItem(row_idx, 4, QTableWidgetItem(f"{b['extraction_percent']}%"))
-
-            # Химия
-            fields = ['ni_percent', 'cu_percent', 'pt_percent', 'pd_percent', 'sio2_percent', 'c_percent', 'se_percent']
-            for col, field in enumerate(fields, start=5):
-                val = b.get(field, 0)
-                self.table_batches.setItem(row_idx, col, QTableWidgetItem(f"{val:.2f}"))
+        self._batch_filters = {
+            'sulfate_number': int(sfr_filter) if sfr_filter != "Все аппараты" else None,
+            'min_mass': min_mass,
+            'min_extraction': min_extract,
+        }
+        self._batch_cursor = None
+        self._batch_generation += 1
+        # Пока первая страница новой выборки не пришла, прокрутка не должна
+        # дозапрашивать страницы к строкам прежних фильтров
+        self.batches_model.set_fetcher(None)
+        self._submit_batches_page(self._on_first_batches_page)
+
+    def _submit_batches_page(self, on_result):
+        # Запрос выполняется в фоне; курсор меняется только в GUI-потоке (в on_result)
+        generation = self._batch_generation
+        self.executor.submit(
+            BATCHES_QUERY, self.db.query_batches,
+            after=self._batch_cursor, limit=BATCH_PAGE_SIZE, **self._batch_filters,
+            on_result=lambda page: on_result(generation, page)
+        )
 
-            row_idx += 1
+    def _on_first_batches_page(self, generation, page):
+        if generation != self._batch_generation:
+            return
+        df, self._batch_cursor = page
+        self.batches_model.set_frame(df)
+        if self._batch_cursor is not None:
+            self.batches_model.set_fetcher(self._fetch_batches_page)
+
+    def _fetch_batches_page(self):
+        self._submit_batches_page(self._on_next_batches_page)
+        return None  # страница придет асинхронно
+
+    def _on_next_batches_page(self, generation, page):
+        if generation != self._batch_generation:
+            return  # страница прежней выборки
+        df, self._batch_cursor = page
+        self.batches_model.finish_fetch(df, self._batch_cursor is not None)
+
+    def _on_query_busy(self, key, busy):
+        if key in (BATCHES_QUERY, PROCESS_QUERY):
+            loading = any(self.executor.is_busy(k) for k in (BATCHES_QUERY, PROCESS_QUERY))
+            self.lbl_loading.setText("⏳ Загрузка..." if loading else "")
 
     def open_import_dialog(self):
         from app.gui.import_dialog import ImportDataDialog
@@ -176,43 +239,39 @@ class KnowledgeBaseScreen(QWidget):
         if dialog.exec_():
             self.load_batches()
 
-    def on_batch_selected(self):
-        selected = self.table_batches.selectedItems()
-        if not selected:
-            return
+    def open_diagnostics(self):
+        from app.gui.diagnostics_dialog import DiagnosticsDialog
+        DiagnosticsDialog(self).exec_()
 
-        # batch_id берем из 0-й колонки (ID Партии)
-        batch_id = self.table_batches.item(selected[0].row(), 0).text()
+    def selected_batch_id(self):
+        rows = self.table_batches.selectionModel().selectedRows()
+        if not rows:
+            return None
+        # batch_id берем из данных модели (столбец "ID Партии")
+        return str(self.batches_model.value(rows[0].row(), 'batch_id'))
+
+    def on_batch_selected(self, *args):
+        batch_id = self.selected_batch_id()
+        if batch_id is None:
+            return
 
         # --- ОБНОВЛЯЕМ ТЕКСТ НАД ТАБЛИЦЕЙ ---
         self.lbl_process_title.setText(f"<b>Подробные параметры тех. процесса (Партия: {batch_id}):</b>")
-        df = self.db.get_process_data(batch_id)
+        self.process_model.clear()
 
-        self.table_process.setRowCount(0)
-        for i, row in df.iterrows():
-            self.table_process.insertRow(i)
-
-
-            self.table_process.setItem(i, 0, QTableWidgetItem(str(row.get('timestamp', ''))))
-            self.table_process.setItem(i, 1, QTableWidgetItem(f"{row.get('temperature_1', 0):.1f}"))
-            self.table_process.setItem(i, 2, QTableWidgetItem(f"{row.get('temperature_2', 0):.1f}"))
-            self.table_process.setItem(i, 3, QTableWidgetItem(f"{row.get('temperature_3', 0):.1f}"))
-            self.table_process.setItem(i, 4, QTableWidgetItem(f"{row.get('current_value', 0):.3f}"))
-            self.table_process.setItem(i, 5, QTableWidgetItem(f"{row.get('acid_flow', 0):.2f}"))
-            self.table_process.setItem(i, 6, QTableWidgetItem(f"{row.get('level_mixer', 0):.1f}"))
-            self.table_process.setItem(i, 7, QTableWidgetItem(f"{row.get('electrodes_pos', 0):.1f}"))
-            self.table_process.setItem(i, 8, QTableWidgetItem(f"{row.get('optimal_temp', 0):.1f}"))
+        # Модель хранит только столбцы; ячейки форматируются по мере прокрутки.
+        # При быстром переборе партий результаты предыдущих выборок отбрасываются
+        self.executor.submit(
+            PROCESS_QUERY, self.db.get_process_data, batch_id,
+            on_result=self.process_model.set_frame
+        )
 
     def delete_selected_batch(self):
-        selected = self.table_batches.selectedItems()
-        if not selected:
+        batch_id = self.selected_batch_id()
+        if batch_id is None:
             QMessageBox.warning(self, "Внимание", "Сначала выберите партию в таблице!")
             return
 
-        # Берем ID партии из первой колонки выделенной строки
-        row = selected[0].row()
-        batch_id = self.table_batches.item(row, 0).text()
-
         # Спрашиваем подтверждение
         reply = QMessageBox.question(
             self, 'Подтверждение',
@@ -224,6 +283,7 @@ class KnowledgeBaseScreen(QWidget):
             if self.db.delete_batch(batch_id):
                 QMessageBox.information(self, "Успех", f"Партия {batch_id} удалена.")
                 self.load_batches()  # Обновляем список партий
-                self.table_process.setRowCount(0)  # Очищаем нижнюю таблицу
+                self.executor.cancel(PROCESS_QUERY)
+                self.process_model.clear()  # Очищаем нижнюю таблицу
             else:
                 QMessageBox.critical(self, "Ошибка", "Не удалось удалить данные из базы.")
\ No newline at end of file
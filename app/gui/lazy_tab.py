@@ -0,0 +1,47 @@
+import time
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel
+from PyQt5.QtCore import Qt, QTimer
+
+from app.utils import startup
+from app.utils.logger import logger
+
+
+class LazyTab(QWidget):
+    """
+    Вкладка, содержимое которой строится при первом показе.
+
+    До этого на ее месте только надпись-заглушка; построение откладывается
+    на следующий проход цикла событий, чтобы окно успело отрисоваться.
+    """
+
+    def __init__(self, title, factory, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self._factory = factory
+        self.widget = None
+
+        self._layout = QVBoxLayout(self)
+        self._layout.setContentsMargins(0, 0, 0, 0)
+        self._placeholder = QLabel("Загрузка...")
+        self._placeholder.setAlignment(Qt.AlignCenter)
+        self._placeholder.setStyleSheet("color: #757575; font-size: 16px;")
+        self._layout.addWidget(self._placeholder)
+
+    def ensure_created(self):
+        """Содержимое вкладки (строится при первом обращении)"""
+        if self.widget is None:
+            start = time.perf_counter()
+            self.widget = self._factory()
+            self._layout.removeWidget(self._placeholder)
+            self._placeholder.deleteLater()
+            self._layout.addWidget(self.widget)
+
+            startup.mark(f"Вкладка {self.title}")
+            logger.debug(f"Вкладка {self.title} построена за {(time.perf_counter() - start) * 1000:.0f} мс")
+        return self.widget
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.widget is None:
+            QTimer.singleShot(0, self.ensure_created)
@@ -0,0 +1,42 @@
+from PyQt5.QtCore import QObject, QTimer
+
+from app.core.downsample import MinMaxPyramid
+
+
+class LodPlotController(QObject):
+    """
+    Уровень детализации для кривых pg.PlotWidget: при каждом изменении видимого
+    диапазона кривые получают не больше ~2 точек на пиксель ширины из пирамид min/max.
+    """
+
+    def __init__(self, plot_widget, points_per_pixel=2, parent=None):
+        super().__init__(parent)
+        self.plot_widget = plot_widget
+        self.view_box = plot_widget.getViewBox()
+        self.points_per_pixel = points_per_pixel
+        self.series = {}  # curve -> MinMaxPyramid
+
+        # Несколько сигналов диапазона за один цикл событий сводятся в одну перерисовку
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.timeout.connect(self.refresh)
+        self.view_box.sigXRangeChanged.connect(self._schedule_refresh)
+        self.view_box.sigResized.connect(self._schedule_refresh)
+
+    def set_series(self, curve, y, x0=0.0, dx=1.0):
+        """Пирамида строится один раз на ряд; дальше кривая перерисуется из кэша"""
+        self.series[curve] = MinMaxPyramid(y, x0=x0, dx=dx)
+
+    def clear_series(self, curve):
+        self.series.pop(curve, None)
+        curve.setData([], [])
+
+    def _schedule_refresh(self, *args):
+        self._refresh_timer.start(0)
+
+    def refresh(self):
+        (x_min, x_max), _ = self.view_box.viewRange()
+        max_points = max(200, int(self.view_box.width() * self.points_per_pixel))
+        for curve, pyramid in self.series.items():
+            x, y = pyramid.query(x_min, x_max, max_points)
+            curve.setData(x, y)
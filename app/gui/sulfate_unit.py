@@ -1,4 +1,5 @@
-from PyQt5.QtWidgets import QWidget, QStackedWidget, QVBoxLayout
+from PyQt5.QtWidgets import QWidget, QStackedWidget, QVBoxLayout, QMessageBox
+from app.gui.async_loader import query_executor
 from app.gui.input_screen import InputScreen
 from app.gui.work_screen import WorkScreen
 
@@ -33,6 +34,11 @@ class SulfateUnit(QWidget):
 
         layout.addWidget(self.stack)
 
+        # Поиск эталона и загрузка профиля выполняются в фоне
+        self.executor = query_executor()
+        self.query_key = f"unit.{unit_name}.start"
+        self.start_button_text = self.input_page.btn_start.text()
+
         # При нажатии "ОК" на экране ввода — запускаем расчет
         self.input_page.btn_start.clicked.connect(self.process_start_request)
 
@@ -40,6 +46,18 @@ class SulfateUnit(QWidget):
         self.work_page.stop_simulation()  # Обязательно гасим таймер
         self.stack.setCurrentIndex(0)
 
+    def _load_reference(self, raw_data):
+        """Фоновая часть запуска: поиск эталонной партии и чтение ее профиля"""
+        best_match = self.recommender.find_best_match(raw_data)
+        if not best_match:
+            return None
+        return best_match, self.db.get_process_data(best_match['batch_id'])
+
+    def _set_loading(self, loading):
+        btn = self.input_page.btn_start
+        btn.setEnabled(not loading)
+        btn.setText("⏳ Поиск эталонной партии..." if loading else self.start_button_text)
+
     def process_start_request(self):
         """Логика перехода от ввода к работе"""
         raw_data = self.input_page.get_data()
@@ -48,17 +66,27 @@ class SulfateUnit(QWidget):
         if raw_data is None:
             return
 
-        best_match = self.recommender.find_best_match(raw_data)
+        self._set_loading(True)
+        self.executor.submit(
+            self.query_key, self._load_reference, raw_data,
+            on_result=self._on_reference_loaded, on_error=self._on_reference_error
+        )
+
+    def _on_reference_loaded(self, result):
+        self._set_loading(False)
 
-        if best_match:
-            # Получаем историю из БД
-            history_df = self.db.get_process_data(best_match['batch_id'])
+        if result:
+            best_match, history_df = result
+            pulses = self.recommender.get_acid_pulses(best_match['batch_id'], history_df)
 
             # Обновляем экран работы данными
-            self.work_page.update_data(best_match, history_df)
+            self.work_page.update_data(best_match, history_df, pulses)
 
             # ПЕРЕКЛЮЧАЕМ ЭКРАН на работу внутри этой вкладки
             self.stack.setCurrentWidget(self.work_page)
         else:
-            from PyQt5.QtWidgets import QMessageBox
-            QMessageBox.warning(self, "Поиск", "Похожих партий не найдено.")
\ No newline at end of file
+            QMessageBox.warning(self, "Поиск", "Похожих партий не найдено.")
+
+    def _on_reference_error(self, error):
+        self._set_loading(False)
+        QMessageBox.critical(self, "Поиск", f"Ошибка поиска эталонной партии: {error}")
\ No newline at end of file
@@ -0,0 +1,279 @@
+import numpy as np
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, pyqtSignal
+
+# Строк в одном блоке, читаемом с курсора при прокрутке
+CURSOR_BLOCK_ROWS = 500
+# Открытый курсор держит разделяемую блокировку БД (журнал отката) и не дает писать
+# другим соединениям: без прокрутки дольше этого, мс, он закрывается
+CURSOR_IDLE_TIMEOUT_MS = 15_000
+# Ширина столбца по первому блоку: строк в выборке, отступ и предел, px
+WIDTH_SAMPLE_ROWS = 100
+WIDTH_PADDING = 16
+MAX_COLUMN_WIDTH = 400
+
+
+def _append_column(column, n_rows, values):
+    """
+    Дописывание values после первых n_rows значений столбца. Емкость массива растет
+    вдвое, поэтому подгрузка страниц не копирует все прочитанное на каждой странице.
+    """
+    needed = n_rows + len(values)
+    try:
+        dtype = np.result_type(column.dtype, values.dtype)
+    except TypeError:
+        dtype = np.dtype(object)
+    if needed > len(column) or dtype != column.dtype:
+        grown = np.empty(max(needed, 2 * len(column)), dtype=dtype)
+        grown[:n_rows] = column[:n_rows]
+        column = grown
+    column[n_rows:needed] = values
+    return column
+
+
+class ColumnarTableModel(QAbstractTableModel):
+    """
+    Табличная модель поверх столбцов NumPy.
+
+    Данные хранятся массивами (по одному на столбец), а текст ячейки
+    форматируется только когда представление запрашивает видимую ячейку -
+    никаких QTableWidgetItem на каждую клетку.
+    """
+
+    def __init__(self, columns, row_numbers=False, parent=None):
+        """columns: список (заголовок, ключ, форматтер значения -> str)"""
+        super().__init__(parent)
+        self._columns = columns
+        self._row_numbers = row_numbers
+        self._arrays = {}
+        self._rows = 0
+        self._fetcher = None
+        self._fetch_pending = False
+
+    def set_frame(self, df):
+        """Загрузка данных из DataFrame (отсутствующие столбцы заполняются нулями)"""
+        self.set_arrays(self._frame_arrays(df), len(df))
+
+    def _frame_arrays(self, df):
+        n = len(df)
+        return {key: df[key].to_numpy() if key in df.columns else np.zeros(n)
+                for _, key, _ in self._columns}
+
+    def set_arrays(self, arrays, n_rows):
+        self.beginResetModel()
+        self._arrays = arrays
+        self._rows = n_rows
+        self._fetcher = None
+        self._fetch_pending = False
+        self.endResetModel()
+
+    def append_frame(self, df):
+        """Дописывание строк в конец (подгрузка следующей страницы)"""
+        if df is None or df.empty:
+            return
+        arrays = self._frame_arrays(df)
+        self.beginInsertRows(QModelIndex(), self._rows, self._rows + len(df) - 1)
+        if self._arrays:
+            self._arrays = {key: _append_column(self._arrays[key], self._rows, arrays[key])
+                            for key in arrays}
+        else:
+            self._arrays = arrays
+        self._rows += len(df)
+        self.endInsertRows()
+
+    def set_fetcher(self, fetcher):
+        """
+        Источник следующих страниц: fetcher() -> (DataFrame, есть_еще). Представление
+        вызывает его само (canFetchMore/fetchMore), когда прокрутка доходит до конца.
+
+        Асинхронный fetcher возвращает None, а страницу позже передает в finish_fetch;
+        до этого повторные запросы следующей страницы не выполняются.
+        """
+        self._fetcher = fetcher
+        self._fetch_pending = False
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._fetcher is not None and not self._fetch_pending
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        page = self._fetcher()
+        if page is None:
+            self._fetch_pending = True
+            return
+        self.finish_fetch(*page)
+
+    def finish_fetch(self, df, has_more):
+        """Прием очередной страницы от fetcher"""
+        self._fetch_pending = False
+        if not has_more:
+            self._fetcher = None
+        self.append_frame(df)
+
+    def clear(self):
+        self.set_arrays({}, 0)
+
+    def value(self, row, key):
+        """Исходное (неформатированное) значение ячейки"""
+        return self._arrays[key][row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            _, key, fmt = self._columns[index.column()]
+            try:
+                return fmt(self._arrays[key][index.row()])
+            except (TypeError, ValueError):
+                return str(self._arrays[key][index.row()])
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._columns[section][0]
+        return str(section + 1) if self._row_numbers else None
+
+
+class CursorTableModel(QAbstractTableModel):
+    """
+    Результат SQL-запроса, читаемый с открытого курсора блоками по мере прокрутки.
+
+    Модель хранит только уже прочитанные строки (кортежи), текст ячейки
+    форматируется при отрисовке, поэтому результат любого размера показывается
+    сразу после первого блока. Модель владеет соединением курсора и закрывает его,
+    когда строки кончились, при смене результата, в close() и после idle_timeout мс
+    без чтения - пока курсор открыт, запись в БД из других соединений невозможна.
+    """
+
+    # Ошибка чтения очередного блока (исключение); чтение после нее прекращается
+    fetch_failed = pyqtSignal(object)
+    # Курсор закрыт по бездействию, строк прочитано (остальные уже не подгрузятся)
+    idle_closed = pyqtSignal(int)
+
+    def __init__(self, block_size=CURSOR_BLOCK_ROWS, idle_timeout=CURSOR_IDLE_TIMEOUT_MS, parent=None):
+        super().__init__(parent)
+        self.block_size = block_size
+        self._columns = []
+        self._rows = []
+        self._cursor = None
+        self._fetch = None
+        self._idle_timer = QTimer(self)
+        self._idle_timer.setSingleShot(True)
+        self._idle_timer.setInterval(idle_timeout)
+        self._idle_timer.timeout.connect(self._close_idle)
+
+    def set_cursor(self, cursor, rows, fetch=None):
+        """
+        cursor: открытый курсор (первый блок rows уже прочитан, например в фоне);
+        fetch(size) -> следующие строки, по умолчанию cursor.fetchmany(size).
+        Блок короче запрошенного означает конец результата.
+        """
+        self.close()
+        self.beginResetModel()
+        self._columns = [d[0] for d in cursor.description]
+        self._rows = list(rows)
+        self._cursor = cursor
+        self._fetch = fetch or cursor.fetchmany
+        self.endResetModel()
+        if len(self._rows) < self.block_size:
+            self.close()
+        else:
+            self._idle_timer.start()
+
+    def set_rows(self, columns, rows):
+        """Готовый (небольшой) результат без курсора"""
+        self.close()
+        self.beginResetModel()
+        self._columns = list(columns)
+        self._rows = list(rows)
+        self.endResetModel()
+
+    def clear(self):
+        self.set_rows([], [])
+
+    def close(self):
+        """Закрывает курсор и его соединение; прочитанные строки остаются"""
+        self._idle_timer.stop()
+        cursor, self._cursor, self._fetch = self._cursor, None, None
+        if cursor is not None:
+            cursor.connection.close()
+
+    def _close_idle(self):
+        if self._cursor is not None:
+            self.close()
+            self.idle_closed.emit(len(self._rows))
+
+    @property
+    def exhausted(self):
+        return self._cursor is None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._cursor is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        try:
+            rows = self._fetch(self.block_size)
+        except Exception as e:
+            self.close()
+            self.fetch_failed.emit(e)
+            return
+        if len(rows) < self.block_size:
+            self.close()
+        else:
+            self._idle_timer.start()
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    @staticmethod
+    def format_value(value):
+        if value is None:
+            return 'NULL'
+        if isinstance(value, bytes):
+            return f'<BLOB {len(value)} байт>'
+        return str(value)
+
+    def column_widths(self, font_metrics, sample_rows=WIDTH_SAMPLE_ROWS):
+        """
+        Ширины столбцов по заголовку и первым строкам - вместо ResizeToContents,
+        который измеряет каждую ячейку (и дочитывает для этого весь результат).
+        """
+        sample = self._rows[:sample_rows]
+        widths = []
+        for col, name in enumerate(self._columns):
+            texts = [name] + [self.format_value(row[col]) for row in sample]
+            # Одна самая длинная строка вместо измерения каждой
+            longest = max(texts, key=len)
+            widths.append(min(MAX_COLUMN_WIDTH, font_metrics.horizontalAdvance(longest) + WIDTH_PADDING))
+        return widths
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.format_value(self._rows[index.row()][index.column()])
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._columns[section]
+        return str(section + 1)
@@ -1,12 +1,18 @@
 import math
+import time
+from collections import deque
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtCore import Qt, QTimer, QRectF, QPointF
-from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QPolygonF, QFont
+from PyQt5.QtCore import Qt, QRectF, QPointF
+from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QPolygonF, QFont, QPixmap
+from app.gui.animation import frame_scheduler
+from app.utils import tracing
+from app.utils.logger import logger
 
-import math
-from PyQt5.QtWidgets import QWidget
-from PyQt5.QtCore import Qt, QTimer, QRectF, QPointF
-from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QPolygonF, QFont
+# Сколько последних кадров учитывать в статистике отрисовки
+FRAME_STATS_WINDOW = 100
+# Базовый шаг анимации (с) и предел шага после паузы (скрытая вкладка)
+ANIMATION_STEP = 0.05
+MAX_FRAME_DT = 0.25
 
 
 class SulfatizerWidget(QWidget):
@@ -24,18 +30,30 @@ class SulfatizerWidget(QWidget):
             "Tg": "0.0", "Lte": "0", "Ltr": "0"
         }
 
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self._update_frame)
+        # Кэш статических слоев: под электродами и мешалкой (корпус, раствор, индикаторы)
+        # и поверх них (верхняя трапеция, газоотвод, подпись)
+        self.use_static_cache = True
+        self._static_layer = None
+        self._overlay_layer = None
+
+        # Счетчик времени кадров
+        self.frame_count = 0
+        self._frame_times = deque(maxlen=FRAME_STATS_WINDOW)
 
-    def _update_frame(self):
-        self.angle = (self.angle + 5) % 360
+        # Анимацию ведет общий планировщик кадров (см. app/gui/animation.py)
+        self._animation_job = None
+
+    def _update_frame(self, dt):
+        # Шаги анимации нормированы на 50 мс, чтобы скорость не зависела от FPS
+        steps = min(dt, MAX_FRAME_DT) / ANIMATION_STEP
+        self.angle = (self.angle + 5 * steps) % 360
         diff = self.target_lte - self.current_lte
         if abs(diff) > 0.1:
-            self.current_lte += diff * 0.1
+            self.current_lte += diff * (1 - 0.9 ** steps)
         else:
             self.current_lte = self.target_lte
 
-        self.update()
+        frame_scheduler().request_update(self)
 
     def set_params(self, g, ip, tr, tg, lte, ltr):
         # Преобразуем входящее значение в float для анимации
@@ -44,10 +62,13 @@ class SulfatizerWidget(QWidget):
         except:
             self.target_lte = 0.0
 
-        self.data = {
+        data = {
             "G": str(g), "Ip": str(ip), "Tr": str(tr),
             "Tg": str(tg), "Lte": str(lte), "Ltr": str(ltr)
         }
+        if data != self.data:
+            self.data = data
+            self._static_layer = None
 
         # Если анимация не запущена, обновляем позицию мгновенно
         if not self.is_animating:
@@ -57,13 +78,21 @@ class SulfatizerWidget(QWidget):
 
     def start_animation(self):
         self.is_animating = True
-        self.timer.start(50)
+        if self._animation_job is None:
+            self._animation_job = frame_scheduler().add_job(self, self._update_frame)
 
     def stop_animation(self):
         self.is_animating = False
-        self.timer.stop()
+        if self._animation_job is not None:
+            frame_scheduler().remove_job(self._animation_job)
+            self._animation_job = None
         self.update()
 
+        stats = self.frame_stats()
+        logger.debug(f"{self.unit_label}: кадров {stats['frames']}, отрисовка в среднем "
+                     f"{stats['avg_ms']:.2f} мс, максимум {stats['max_ms']:.2f} мс "
+                     f"(кэш статики: {'вкл' if self.use_static_cache else 'выкл'})")
+
     def draw_indicator(self, painter, x, y, label, value, unit):
         # 1. Форматирование числа (0.00 с принудительной точкой)
         try:
@@ -105,17 +134,72 @@ class SulfatizerWidget(QWidget):
 
         return val_rect
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._static_layer = None
+        self._overlay_layer = None
+
+    def frame_stats(self):
+        """Время отрисовки последних кадров (мс) - для контроля нагрузки на CPU"""
+        times = list(self._frame_times)
+        if not times:
+            return {'frames': self.frame_count, 'avg_ms': 0.0, 'max_ms': 0.0}
+        return {
+            'frames': self.frame_count,
+            'avg_ms': sum(times) / len(times) * 1000,
+            'max_ms': max(times) * 1000,
+        }
 
+    def _geometry(self):
         cx = self.width() / 2
         cy = self.height() / 2
 
         tw, th = 240, 260
         tx = cx - tw / 2
         ty = cy - th / 2 + 30
+        return cx, cy, tx, ty, tw, th
+
+    def _render_layer(self, draw):
+        """Неподвижная часть мнемосхемы, нарисованная draw, в QPixmap"""
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.width() * dpr), int(self.height() * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        draw(painter, *self._geometry())
+        painter.end()
+        return pixmap
+
+    @tracing.traced(cat='paint')
+    def paintEvent(self, event):
+        started = time.perf_counter()
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        geometry = self._geometry()
+
+        # Каждый кадр - только электроды и вращающаяся мешалка, между двумя слоями статики.
+        # Статика перерисовывается только после resize или новых показаний (set_params)
+        if self.use_static_cache:
+            if self._static_layer is None:
+                self._static_layer = self._render_layer(self._draw_static)
+            if self._overlay_layer is None:
+                self._overlay_layer = self._render_layer(self._draw_overlay)
+            painter.drawPixmap(0, 0, self._static_layer)
+            self._draw_dynamic(painter, *geometry)
+            painter.drawPixmap(0, 0, self._overlay_layer)
+        else:
+            self._draw_static(painter, *geometry)
+            self._draw_dynamic(painter, *geometry)
+            self._draw_overlay(painter, *geometry)
+        painter.end()
+
+        self._frame_times.append(time.perf_counter() - started)
+        self.frame_count += 1
 
+    def _draw_static(self, painter, cx, cy, tx, ty, tw, th):
         # 1. Отрисовка раствора
         water_y = ty + 100
         painter.setBrush(QBrush(QColor(110, 90, 70, 220)))
@@ -135,6 +219,7 @@ class SulfatizerWidget(QWidget):
         self.draw_indicator(painter, tx + tw + 15, ty + 180, "H м:", self.data["Ltr"], "мм")
         self.draw_indicator(painter, cx - 85, ty + th - 35, "Тр:", self.data["Tr"], "°C")
 
+    def _draw_dynamic(self, painter, cx, cy, tx, ty, tw, th):
         # 4. Электроды
         electrode_width = 15
         visual_multiplier = 2.0
@@ -189,6 +274,7 @@ class SulfatizerWidget(QWidget):
             painter.setBrush(QBrush(get_dynamic_color(sin_val, part['is_left'])))
             painter.drawEllipse(QPointF(cx + part['w'], mixer_y), abs(part['w']), 8)
 
+    def _draw_overlay(self, painter, cx, cy, tx, ty, tw, th):
         # 6. ВЕРХНЯЯ ТРАПЕЦИЯ И ГАЗООТВОД (Тонкие линии - 1.5px)
         painter.setPen(QPen(Qt.black, 1.5))
         painter.setBrush(QBrush(QColor(240, 240, 240)))  # Цвет чуть светлее
@@ -208,4 +294,4 @@ class SulfatizerWidget(QWidget):
         # Подпись внизу
         painter.setPen(Qt.black)
         painter.setFont(QFont("Arial", 12, QFont.Bold))
-        painter.drawText(QRectF(cx - 50, ty + th + 15, 100, 30), Qt.AlignCenter, self.unit_label)
\ No newline at end of file
+        painter.drawText(QRectF(cx - 50, ty + th + 15, 100, 30), Qt.AlignCenter, self.unit_label)
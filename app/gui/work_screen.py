@@ -6,21 +6,45 @@ from PyQt5.QtWidgets import (
     QTableWidget, QTableWidgetItem, QHeaderView,
     QPushButton, QGroupBox, QFrame
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QColor
+from app.core.playback import PlaybackEngine, STATUS_NONE, STATUS_LOW, STATUS_NORMAL, STATUS_OVERHEAT
+from app.core.recommender import extract_acid_pulses
+from app.gui.animation import frame_scheduler
+from app.gui.plot_lod import LodPlotController
 from app.gui.widgets import SulfatizerWidget
+from app.utils import tracing
 from datetime import datetime, timedelta
 
+# Длительность "минуты" воспроизведения, мс (в продакт надо указать 60000 - реальная минута)
+SIMULATION_TICK_MS = 1000
+
+# Состояние советника -> (заголовок, цвет, текст совета)
+ADVISOR_MESSAGES = {
+    # Температура в будущем упадет ниже технологического минимума
+    STATUS_LOW: ("НИЖЕ РЕГЛАМЕНТА", "#1565C0",
+                 "<b>СОВЕТ:</b> Прогноз Т ниже минимума на {delta:.1f}°C. "
+                 "Подайте 5т кислоты сейчас для компенсации падения."),
+    # Ожидается чрезмерный перегрев
+    STATUS_OVERHEAT: ("РИСК ПЕРЕГРЕВА", "#B71C1C",
+                      "<b>СОВЕТ:</b> Ожидается резкий рост Т. "
+                      "Приостановите подачу кислоты и проверьте ток на электродах."),
+    STATUS_NORMAL: ("В НОРМЕ", "#2E7D32",
+                    "Температурный тренд соответствует оптимальному графику. Продолжайте текущий режим."),
+}
+
 class WorkScreen(QWidget):
     def __init__(self, unit_name="Неизвестно", parent=None):
         super().__init__(parent)
         self.unit_name = unit_name
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_simulation)
+        self._simulation_job = None
         self.current_minute = 0
         self.history_data = None
+        self.playback = None
         self.batch_info = None
         self.active_pulses = []
+        self.highlighted_row = -1
+        self._advice_state = None
         self.init_ui()
 
         self.btn_run.clicked.connect(self.start_simulation)
@@ -170,6 +194,9 @@ class WorkScreen(QWidget):
         self.v_line = pg.InfiniteLine(pos=0, angle=90, movable=False, pen=pg.mkPen('y', width=2, style=Qt.DashLine))
         self.plot_widget.addItem(self.v_line)
 
+        # Прореживание с сохранением пиков: детализация выбирается по видимому диапазону
+        self.plot_lod = LodPlotController(self.plot_widget, parent=self)
+
     def toggle_ai_window(self):
         """Метод для кнопки: открываем окно под таблицей поверх графика"""
         if self.btn_toggle_ai.isChecked():
@@ -211,7 +238,8 @@ class WorkScreen(QWidget):
         if hasattr(self, 'parent_unit'):
             self.parent_unit.return_to_input()
 
-    def update_data(self, batch_info, history_df):
+    @tracing.traced(cat='gui')
+    def update_data(self, batch_info, history_df, pulses=None):
         self.batch_info = batch_info
         self.history_data = history_df
         self.current_minute = 0
@@ -221,38 +249,45 @@ class WorkScreen(QWidget):
         start_timestamp = datetime.now()
 
         self.val_extraction.setText(f"Прогноз извлечения Rh: {batch_info.get('extraction_percent', 0.0)} %")
-        x = list(range(len(history_df)))
-        self.curve_tp1.setData(x, history_df['temperature_1'].values)
-        self.curve_tp2.setData(x, history_df['temperature_2'].values)
-        self.curve_tg.setData(x, history_df['temperature_3'].values)
-        self.curve_ip.setData(x, history_df['current_value'].values)
-        self.curve_gk.setData(x, history_df['acid_flow'].cumsum().values)
+        self.plot_lod.set_series(self.curve_tp1, history_df['temperature_1'].values)
+        self.plot_lod.set_series(self.curve_tp2, history_df['temperature_2'].values)
+        self.plot_lod.set_series(self.curve_tg, history_df['temperature_3'].values)
+        self.plot_lod.set_series(self.curve_ip, history_df['current_value'].values)
+        self.plot_lod.set_series(self.curve_gk, history_df['acid_flow'].cumsum().values)
 
         if 'optimal_temp' in history_df.columns:
-            self.curve_opt_temp.setData(x, history_df['optimal_temp'].values)
+            self.plot_lod.set_series(self.curve_opt_temp, history_df['optimal_temp'].values)
+        else:
+            self.plot_lod.clear_series(self.curve_opt_temp)
+
+        self.plot_lod.refresh()
+        self.plot_widget.enableAutoRange()
 
         self.v_line.setValue(0)
-        pulse_starts = history_df[
-            (history_df['acid_flow'] > 1.0) & (history_df['acid_flow'].shift(1, fill_value=0) < 1.0)].index
-        self.rec_table.setRowCount(len(pulse_starts))
 
-        for i, start_idx in enumerate(pulse_starts):
-            duration = 0
-            curr = start_idx
-            while curr < len(history_df) and history_df.iloc[curr]['acid_flow'] > 1.0:
-                duration += 1
-                curr += 1
+        # Лестница подачи кислоты (обычно приходит из кэша рекомендателя)
+        if pulses is None:
+            pulses = extract_acid_pulses(history_df['acid_flow'].to_numpy())
+        self.rec_table.setRowCount(len(pulses))
+        self.highlighted_row = -1
 
-            avg_flow = round(history_df.iloc[start_idx: start_idx + duration]['acid_flow'].mean(), 2)
+        # Кадры воспроизведения, советник и активная ступень - один раз на профиль
+        self.playback = PlaybackEngine(history_df, pulses)
+        self._advice_state = None
+
+        for i in range(len(pulses)):
+            start_idx = int(pulses.start[i])
+            duration = int(pulses.duration[i])
+            avg_flow = round(float(pulses.avg_flow[i]), 2)
 
             # --- РАСЧЕТ РЕАЛЬНОГО ВРЕМЕНИ ДЛЯ ТАБЛИЦЫ ---
             # К времени старта прибавляем количество минут (start_idx)
-            future_time = start_timestamp + timedelta(minutes=int(start_idx))
+            future_time = start_timestamp + timedelta(minutes=start_idx)
             # Формируем строку: День.Месяц Часы:Минуты
             time_display = future_time.strftime("%d.%m %H:%M")
             # --------------------------------------------
 
-            self.active_pulses.append({'start': start_idx, 'end': start_idx + duration, 'row': i})
+            self.active_pulses.append({'start': start_idx, 'end': int(pulses.end[i]), 'row': i})
 
             # Записываем рассчитанное время вместо "Х мин"
             self.rec_table.setItem(i, 0, QTableWidgetItem(time_display))
@@ -267,7 +302,7 @@ class WorkScreen(QWidget):
         self.lbl_process_time.setText("00:00")
 
     def start_simulation(self):
-        if self.history_data is not None:
+        if self.playback is not None:
             # 1. ОБНОВЛЯЕМ ТАБЛИЦУ (Актуальное время с датой)
             start_timestamp = datetime.now()
 
@@ -290,73 +325,74 @@ class WorkScreen(QWidget):
             self.update_ui_elements(0)
 
             # 4. ЗАПУСКАЕМ ТАЙМЕР И КНОПКИ
-            self.timer.start(1000) # В продакт надо указать 60000 - реальная минута
+            # Тик идет и на скрытой вкладке: процесс на аппарате не останавливается
+            if self._simulation_job is None:
+                self._simulation_job = frame_scheduler().add_job(
+                    self, self._on_simulation_tick,
+                    interval_ms=SIMULATION_TICK_MS, pause_when_hidden=False
+                )
             self.btn_run.setEnabled(False)
             self.btn_stop.setEnabled(True)
 
+    def _on_simulation_tick(self, dt):
+        self.update_simulation()
+
     def update_simulation(self):
         self.current_minute += 1
 
-        if self.current_minute >= len(self.history_data):
+        if self.current_minute >= len(self.playback):
             self.stop_simulation()
             return
         h, m = divmod(self.current_minute, 60)
         self.lbl_process_time.setText(f"{h:02d}:{m:02d}")
         self.v_line.setValue(self.current_minute)
-        for pulse in self.active_pulses:
-            row_idx = pulse['row']
-            is_active = pulse['start'] <= self.current_minute < pulse['end']
-            bg_color = QColor("#C8E6C9") if is_active else QColor("white")
-            for col in range(3):
-                if self.rec_table.item(row_idx, col):
-                    self.rec_table.item(row_idx, col).setBackground(bg_color)
+        self._highlight_pulse(int(self.playback.active_pulse[self.current_minute]))
         self.update_ui_elements(self.current_minute)
 
+    def _set_row_background(self, row_idx, color):
+        for col in range(self.rec_table.columnCount()):
+            item = self.rec_table.item(row_idx, col)
+            if item:
+                item.setBackground(color)
+
+    def _highlight_pulse(self, row_idx):
+        """Подсветка активной ступени: перекрашиваются только строки, у которых она сменилась"""
+        if row_idx == self.highlighted_row:
+            return
+        if self.highlighted_row >= 0:
+            self._set_row_background(self.highlighted_row, QColor("white"))
+        if row_idx >= 0:
+            self._set_row_background(row_idx, QColor("#C8E6C9"))
+        self.highlighted_row = row_idx
+
     def update_ui_elements(self, minute):
-        if minute < len(self.history_data):
-            row = self.history_data.iloc[minute]
-            self.sulfatizer.set_params(
-                g=round(row.get('acid_flow', 0.0), 3),
-                ip=int(row.get('current_value', 0)),
-                tr=row.get('temperature_1', 0.0),
-                tg=row.get('temperature_3', 0.0),
-                lte=row.get('electrodes_pos', 0.0),
-                ltr=row.get('level_mixer', 0.0)
-            )
+        if minute < len(self.playback):
+            self.sulfatizer.set_params(**self.playback.params(minute))
 
             # --- ЛОГИКА СОВЕТНИКА ---
-            future_idx = minute + 10
-            if future_idx < len(self.history_data):
-                future_row = self.history_data.iloc[future_idx]
-                future_t = future_row.get('temperature_1', 0.0)
-                future_opt = future_row.get('optimal_temp', 0.0)
-
-                future_delta = future_t - future_opt
-                self.ai_window.lbl_prediction.setText(f"T+10 мин: {future_t:.1f} °C")
-
-                if future_delta < -2.0:
-                    # Температура в будущем упадет ниже технологического минимума
-                    status = "НИЖЕ РЕГЛАМЕНТА"
-                    color = "#1565C0"
-                    advice = f"<b>СОВЕТ:</b> Прогноз Т ниже минимума на {abs(future_delta):.1f}°C. Подайте 5т кислоты сейчас для компенсации падения."
-
-                elif future_delta > 7.0:
-                    # Ожидается чрезмерный перегрев
-                    status = "РИСК ПЕРЕГРЕВА"
-                    color = "#B71C1C"
-                    advice = "<b>СОВЕТ:</b> Ожидается резкий рост Т. Приостановите подачу кислоты и проверьте ток на электродах."
-
-                else:
-                    status = "В НОРМЕ"
-                    color = "#2E7D32"
-                    advice = "Температурный тренд соответствует оптимальному графику. Продолжайте текущий режим."
-
-                self.ai_window.lbl_title.setText(f"<b>{status}</b>")
+            status = int(self.playback.status[minute])
+            if status == STATUS_NONE:
+                return
+
+            future_t = self.playback.future_t[minute]
+            future_delta = self.playback.future_delta[minute]
+            self.ai_window.lbl_prediction.setText(f"T+10 мин: {future_t:.1f} °C")
+
+            title, color, advice = ADVISOR_MESSAGES[status]
+            if status == STATUS_LOW:
+                advice = advice.format(delta=abs(future_delta))
+
+            # HTML советника перестраивается только при смене состояния или текста
+            if (status, advice) != self._advice_state:
+                self.ai_window.lbl_title.setText(f"<b>{title}</b>")
                 self.ai_window.lbl_title.setStyleSheet(f"color: {color}; border: none;")
                 self.ai_window.lbl_advice.setText(advice)
+                self._advice_state = (status, advice)
 
     def stop_simulation(self):
-        self.timer.stop()
+        if self._simulation_job is not None:
+            frame_scheduler().remove_job(self._simulation_job)
+            self._simulation_job = None
         self.sulfatizer.stop_animation()
         self.current_minute = 0
         self.v_line.setValue(0)
@@ -366,11 +402,7 @@ class WorkScreen(QWidget):
         self.sulfatizer.set_params(0, 0, 0, 0, 0, 0)
 
         # Сброс подсветки таблицы
-        for i in range(self.rec_table.rowCount()):
-            for j in range(self.rec_table.columnCount()):
-                item = self.rec_table.item(i, j)
-                if item:
-                    item.setBackground(QColor("white"))
+        self._highlight_pulse(-1)
         self.btn_run.setEnabled(True)
         self.btn_stop.setEnabled(False)
 
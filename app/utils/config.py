@@ -34,6 +34,24 @@ class ModelConfig:
     random_state: int = 42
 
 
+@dataclass
+class UIConfig:
+    """Конфигурация интерфейса"""
+    animation_fps: int = 20
+
+
+@dataclass
+class LoggingConfig:
+    """Конфигурация журнала"""
+    console_level: str = 'INFO'
+    file_level: str = 'DEBUG'
+    json_format: bool = False       # компактные JSON-строки вместо текста
+    max_bytes: int = 10 * 1024 * 1024
+    backup_count: int = 14
+    rotate_daily: bool = True
+    queue_size: int = 10000         # при переполнении записи отбрасываются
+
+
 class Config:
     """Главный класс конфигурации"""
 
@@ -45,6 +63,8 @@ class Config:
         self.db = DatabaseConfig()
         self.process = ProcessConfig()
         self.model = ModelConfig()
+        self.ui = UIConfig()
+        self.logging = LoggingConfig()
 
         # Загрузка из файла если существует
         self.load_from_file()
@@ -73,12 +93,24 @@ class Config:
                 if hasattr(self.model, key):
                     setattr(self.model, key, value)  # ← ИСПРАВЛЕНО
 
+        if 'ui' in config_dict:
+            for key, value in config_dict['ui'].items():
+                if hasattr(self.ui, key):
+                    setattr(self.ui, key, value)
+
+        if 'logging' in config_dict:
+            for key, value in config_dict['logging'].items():
+                if hasattr(self.logging, key):
+                    setattr(self.logging, key, value)
+
     def save_to_file(self):
         """Сохранение конфигурации в файл"""
         config_data = {
             'database': self.db.__dict__,
             'process': self.process.__dict__,
-            'model': self.model.__dict__
+            'model': self.model.__dict__,
+            'ui': self.ui.__dict__,
+            'logging': self.logging.__dict__
         }
 
         # Создаем директорию если не существует
@@ -1,44 +1,209 @@
 # app/utils/logger.py
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
+from datetime import date, datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from datetime import datetime
 from app.utils.config import config
 
+# Слушатели очередей настроенных логгеров (имя логгера -> QueueListener)
+_listeners = {}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Компактный формат: одна JSON-запись на строку"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DailyRotatingFileHandler(logging.FileHandler):
+    """
+    Журнал процесса с ротацией без переименования файлов. Имя файла содержит дату
+    и PID (expert_system_20240101_1234.log); при смене суток или превышении размера
+    открывается следующий файл (expert_system_20240101_1234.1.log, ...). Каждый
+    процесс пишет в свои файлы, поэтому ротация не упирается в файл, открытый
+    другим процессом (на Windows переименование такого файла невозможно).
+    Старые файлы сверх backup_count удаляются.
+    """
+
+    def __init__(self, log_dir, stem, suffix, max_bytes, backup_count, rotate_daily=True):
+        self.log_dir = Path(log_dir)
+        self.stem = stem
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_daily = rotate_daily
+        self.pid = os.getpid()
+        self._day = date.today()
+        self._part = 0
+        super().__init__(self._current_path(), encoding='utf-8', delay=True)
+        self._remove_old()
+
+    def _current_path(self) -> Path:
+        part = f".{self._part}" if self._part else ''
+        return self.log_dir / f"{self.stem}_{self._day:%Y%m%d}_{self.pid}{part}{self.suffix}"
+
+    def shouldRollover(self, record):
+        if self.rotate_daily and date.today() != self._day:
+            return True
+        if self.max_bytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        # Пустой файл не меняем, даже если одна запись длиннее max_bytes
+        size = self.stream.tell()
+        return size > 0 and size + len(self.format(record)) + 1 >= self.max_bytes
+
+    def doRollover(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        today = date.today()
+        if self.rotate_daily and today != self._day:
+            self._day = today
+            self._part = 0
+        else:
+            self._part += 1
+        self.baseFilename = os.path.abspath(self._current_path())
+        self._remove_old()
+
+    def _remove_old(self):
+        """Удаляет самые старые файлы журнала (всех процессов) сверх backup_count"""
+        if self.backup_count <= 0:
+            return
+        current = Path(self.baseFilename)
+        files = []
+        for path in self.log_dir.glob(f"{self.stem}_*{self.suffix}"):
+            try:
+                if path != current:
+                    files.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        files.sort()
+        for _, path in files[:-self.backup_count]:
+            try:
+                path.unlink()
+            except OSError:
+                # Файл еще открыт другим процессом - удалится при следующей ротации
+                pass
+
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+        except Exception:
+            self.handleError(record)
+            return
+        super().emit(record)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Запись в ограниченную очередь без ожидания: если фоновый поток записи не успевает,
+    записи отбрасываются и подсчитываются, а вызывающий поток (GUI, импорт) не блокируется.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            from app.utils import metrics
+            metrics.inc('logging.dropped')
+
 
 def setup_logger(name: str = 'expert_system'):
-    """Настройка системы логирования"""
+    """
+    Настройка системы логирования. Вызывающие потоки только кладут записи в очередь,
+    в консоль и файл их пишет фоновый QueueListener. Повторный вызов возвращает
+    уже настроенный логгер, не добавляя обработчиков.
+    """
 
     # Создаем логгер
     logger = logging.getLogger(name)
+    if name in _listeners:
+        return logger
     logger.setLevel(logging.DEBUG)
+    settings = config.logging
 
     # Форматтер
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    if settings.json_format:
+        formatter = JsonLinesFormatter()
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
 
     # Консольный обработчик
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
+    console_handler.setLevel(settings.console_level)
     console_handler.setFormatter(formatter)
 
     # Файловый обработчик
     log_dir = config.base_dir / 'logs'
     log_dir.mkdir(exist_ok=True)
 
-    log_file = log_dir / f'expert_system_{datetime.now().strftime("%Y%m%d")}.log'
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(logging.DEBUG)
+    file_handler = DailyRotatingFileHandler(
+        log_dir, 'expert_system', '.jsonl' if settings.json_format else '.log',
+        settings.max_bytes, settings.backup_count, settings.rotate_daily
+    )
+    file_handler.setLevel(settings.file_level)
     file_handler.setFormatter(formatter)
 
-    # Добавляем обработчики
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    # Очередь между логгером и обработчиками
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=settings.queue_size))
+    listener = QueueListener(queue_handler.queue, console_handler, file_handler,
+                             respect_handler_level=True)
+    listener.start()
+    _listeners[name] = listener
+
+    # Снимаем обработчики, оставшиеся от прежней настройки
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
 
     return logger
 
 
+def shutdown_logging():
+    """Дописывает очереди и останавливает фоновые потоки записи (вызывается при выходе)"""
+    for name, listener in list(_listeners.items()):
+        listener.stop()
+        for handler in logging.getLogger(name).handlers:
+            if isinstance(handler, DroppingQueueHandler) and handler.dropped:
+                # Поток записи уже остановлен - сообщаем напрямую в его обработчики
+                record = logging.LogRecord(
+                    name, logging.WARNING, __file__, 0,
+                    f"Журнал: отброшено записей при переполнении очереди: {handler.dropped}", None, None
+                )
+                for target in listener.handlers:
+                    target.handle(record)
+        for handler in listener.handlers:
+            handler.close()
+        del _listeners[name]
+
+
+atexit.register(shutdown_logging)
+
+
 # Глобальный логгер
-logger = setup_logger()
\ No newline at end of file
+logger = setup_logger()
@@ -0,0 +1,201 @@
+# app/utils/metrics.py
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+# Верхние границы корзин гистограммы задержек, мс (последняя корзина - "больше")
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+_BOUNDS_NS = [int(b * 1_000_000) for b in LATENCY_BUCKETS_MS]
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'count', 'total_ns', 'max_ns')
+
+    def __init__(self):
+        self.buckets = [0] * (len(_BOUNDS_NS) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def observe(self, ns):
+        self.buckets[bisect_left(_BOUNDS_NS, ns)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+
+class _Shard:
+    """Счетчики и гистограммы одного потока: пишет только владелец, без блокировок"""
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+
+def _percentile_ms(buckets, count, q):
+    """Оценка перцентиля по гистограмме: верхняя граница корзины, в которую он попал
+    (сверху ограничивается максимумом при сводке)"""
+    rank = q * count
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if seen >= rank and n:
+            return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else float('inf')
+    return 0.0
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик: счетчики, датчики (последнее значение) и гистограммы задержек.
+
+    Каждый поток накапливает данные в собственном шарде, поэтому горячий путь не
+    берет блокировок; шарды объединяются только при чтении сводки. Значения
+    накапливаются с запуска приложения (или с последнего reset).
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._gauges = {}
+        self.started = time.time()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            # Блокировка - только при первом обращении потока
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name, value=1):
+        counters = self._shard().counters
+        counters[name] = counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        self._gauges[name] = value
+
+    def observe_ns(self, name, ns):
+        histograms = self._shard().histograms
+        hist = histograms.get(name)
+        if hist is None:
+            hist = histograms[name] = _Histogram()
+        hist.observe(ns)
+
+    def timed(self, name):
+        """Декоратор: время каждого вызова в гистограмму name, исключения - в счетчик name.errors"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                except Exception:
+                    self.inc(f"{name}.errors")
+                    raise
+                finally:
+                    self.observe_ns(name, time.perf_counter_ns() - start)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def timer(self, name):
+        """То же для блока with (этапы внутри длинных функций)"""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.observe_ns(name, time.perf_counter_ns() - start)
+
+    def snapshot(self):
+        """Объединенная сводка по всем потокам"""
+        with self._shards_lock:
+            shards = list(self._shards)
+
+        counters, merged = {}, {}
+        for shard in shards:
+            # Копии словарей: владелец шарда может дописывать их параллельно
+            for name, value in list(shard.counters.items()):
+                counters[name] = counters.get(name, 0) + value
+            for name, hist in list(shard.histograms.items()):
+                acc = merged.setdefault(name, _Histogram())
+                acc.buckets = [a + b for a, b in zip(acc.buckets, hist.buckets)]
+                acc.count += hist.count
+                acc.total_ns += hist.total_ns
+                acc.max_ns = max(acc.max_ns, hist.max_ns)
+
+        histograms = {}
+        for name, hist in merged.items():
+            if not hist.count:
+                continue
+            histograms[name] = {
+                'count': hist.count,
+                'mean_ms': hist.total_ns / hist.count / 1e6,
+                'p50_ms': min(_percentile_ms(hist.buckets, hist.count, 0.50), hist.max_ns / 1e6),
+                'p95_ms': min(_percentile_ms(hist.buckets, hist.count, 0.95), hist.max_ns / 1e6),
+                'p99_ms': min(_percentile_ms(hist.buckets, hist.count, 0.99), hist.max_ns / 1e6),
+                'max_ms': hist.max_ns / 1e6,
+                'buckets': hist.buckets,
+            }
+
+        return {
+            'since': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'counters': dict(sorted(counters.items())),
+            'gauges': dict(sorted(self._gauges.items())),
+            'histograms': dict(sorted(histograms.items())),
+            'bucket_bounds_ms': list(LATENCY_BUCKETS_MS),
+        }
+
+    def reset(self):
+        # Шарды живых потоков не заменяем (их держит threading.local), а очищаем
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+        self._gauges.clear()
+        self.started = time.time()
+
+    def summary_text(self):
+        """Сводка в виде текста для панели диагностики"""
+        snap = self.snapshot()
+        lines = [f"Метрики с {snap['since']}", "", "Задержки:"]
+        lines.append(f"  {'операция':<38}{'вызовов':>9}{'сред.,мс':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'макс.':>10}")
+        for name, h in snap['histograms'].items():
+            lines.append(
+                f"  {name:<38}{h['count']:>9}{h['mean_ms']:>10.2f}{h['p50_ms']:>9g}"
+                f"{h['p95_ms']:>9g}{h['p99_ms']:>9g}{h['max_ms']:>10.2f}"
+            )
+        lines += ["", "Счетчики:"]
+        lines += [f"  {name:<38}{value:>12}" for name, value in snap['counters'].items()]
+        lines += ["", "Датчики:"]
+        lines += [f"  {name:<38}{value:>12}" for name, value in snap['gauges'].items()]
+        return "\n".join(lines)
+
+    def dump(self, path=None):
+        """Сохранение сводки в JSON (по умолчанию logs/metrics_<дата_время>.json)"""
+        if path is None:
+            from app.utils.config import config
+            path = config.base_dir / 'logs' / f'metrics_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+# Общий реестр приложения
+registry = MetricsRegistry()
+
+inc = registry.inc
+set_gauge = registry.set_gauge
+observe_ns = registry.observe_ns
+timed = registry.timed
+timer = registry.timer
@@ -0,0 +1,29 @@
+# app/utils/startup.py
+import sys
+import time
+
+# Точка отсчета - импорт этого модуля (в main.py он импортируется первым)
+_T0 = time.perf_counter()
+_marks = []
+
+# Модули, загрузка которых заметно удлиняет холодный старт
+HEAVY_MODULES = ['pandas', 'pyqtgraph', 'sklearn', 'joblib', 'sqlalchemy']
+
+
+def mark(stage: str):
+    """Отметка о завершении этапа запуска"""
+    _marks.append((stage, time.perf_counter() - _T0))
+
+
+def report():
+    """Отчет о длительности этапов запуска и уже загруженных тяжелых модулях"""
+    from app.utils.logger import logger
+
+    lines, prev = [], 0.0
+    for stage, t in _marks:
+        lines.append(f"  {stage:<36} +{(t - prev) * 1000:8.1f} мс  (всего {t * 1000:8.1f} мс)")
+        prev = t
+
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    lines.append(f"  Загружены тяжелые модули: {', '.join(loaded) or 'нет'}")
+    logger.info("Время запуска:\n" + "\n".join(lines))
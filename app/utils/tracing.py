@@ -0,0 +1,194 @@
+# app/utils/tracing.py
+"""
+Опциональная трассировка запуска и действий оператора.
+
+Включается переменной окружения EXPERT_TRACE до запуска приложения:
+    EXPERT_TRACE=1            - трасса в logs/trace_<дата_время>.json
+    EXPERT_TRACE=путь.json    - трасса в указанный файл
+
+Пишется формат Chrome Trace Event (chrome://tracing, ui.perfetto.dev, speedscope):
+время импорта модулей (аналог -X importtime), интервалы выполнения помеченных
+функций и счетчики. Трасса сохраняется при выходе из приложения.
+
+Без переменной окружения traced() возвращает функцию без обертки, а span()/count()
+сводятся к одной проверке флага. Модуль использует только стандартную библиотеку:
+он импортируется первым, чтобы учесть импорт всех остальных.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+TRACE_ENV = 'EXPERT_TRACE'
+
+_setting = os.environ.get(TRACE_ENV, '').strip()
+ENABLED = _setting not in ('', '0')
+
+_T0 = time.perf_counter()
+_PID = os.getpid()
+_events = []
+_counters = {}
+_counter_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return ENABLED
+
+
+def _now_us() -> float:
+    return (time.perf_counter() - _T0) * 1e6
+
+
+def _complete_event(name, cat, start_us, args=None):
+    event = {
+        'name': name, 'cat': cat, 'ph': 'X', 'pid': _PID, 'tid': threading.get_ident(),
+        'ts': start_us, 'dur': _now_us() - start_us,
+    }
+    if args:
+        event['args'] = args
+    # list.append атомарен, отдельная блокировка для событий не нужна
+    _events.append(event)
+
+
+@contextmanager
+def _span(name, cat, args):
+    start = _now_us()
+    try:
+        yield
+    finally:
+        _complete_event(name, cat, start, args)
+
+
+@contextmanager
+def _null_span():
+    yield
+
+
+def span(name: str, cat: str = 'app', **args):
+    """Интервал для блока with: with tracing.span('Загрузка профиля'): ..."""
+    if not ENABLED:
+        return _null_span()
+    return _span(name, cat, args)
+
+
+def traced(name: str = None, cat: str = 'app'):
+    """Декоратор интервала на каждый вызов функции; при выключенной трассировке - без обертки"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = _now_us()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _complete_event(span_name, cat, start)
+        return wrapper
+    return decorator
+
+
+def count(name: str, value: int = 1):
+    """Увеличение счетчика (например, прочитанных строк); в трассе - нарастающий итог"""
+    if not ENABLED or not value:
+        return
+    with _counter_lock:
+        total = _counters[name] = _counters.get(name, 0) + value
+    _events.append({'name': name, 'ph': 'C', 'pid': _PID, 'ts': _now_us(), 'args': {'value': total}})
+
+
+def counters() -> dict:
+    with _counter_lock:
+        return dict(_counters)
+
+
+# --- Время импорта модулей ---
+
+class _TimedLoader:
+    """Обертка загрузчика: замеряет выполнение модуля, остальное делегирует исходному"""
+
+    def __init__(self, loader, name):
+        self._loader = loader
+        self._name = name
+
+    def __getattr__(self, item):
+        return getattr(self._loader, item)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Модулю возвращаем исходный загрузчик: обертка нужна только на время импорта
+        module.__loader__ = self._loader
+        if getattr(module, '__spec__', None) is not None:
+            module.__spec__.loader = self._loader
+        start = _now_us()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            # Вложенные импорты попадают внутрь интервала - как cumulative в -X importtime
+            _complete_event(self._name, 'import', start)
+
+
+class _ImportTimer:
+    """Искатель в начале sys.meta_path: находит модуль остальными искателями и оборачивает загрузчик"""
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find_spec = getattr(finder, 'find_spec', None)
+            if find_spec is None:
+                continue
+            spec = find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimedLoader(spec.loader, name)
+        return spec
+
+
+# --- Экспорт ---
+
+def _default_path() -> Path:
+    if _setting not in ('1', 'true', 'yes'):
+        return Path(_setting)
+    log_dir = Path(__file__).parent.parent.parent / 'logs'
+    return log_dir / f'trace_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+
+
+def export(path=None) -> Path:
+    """Сохранение трассы в JSON (Chrome Trace Event Format)"""
+    path = Path(path) if path else _default_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    events = list(_events)
+    events.append({'name': 'process_name', 'ph': 'M', 'pid': _PID, 'args': {'name': 'Extract Expert System'}})
+    events.append({'name': 'thread_name', 'ph': 'M', 'pid': _PID,
+                   'tid': threading.main_thread().ident, 'args': {'name': 'GUI'}})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+    return path
+
+
+def _export_at_exit():
+    try:
+        path = export()
+        print(f"Трасса сохранена: {path}", file=sys.stderr)
+    except Exception as e:
+        print(f"Не удалось сохранить трассу: {e}", file=sys.stderr)
+
+
+if ENABLED:
+    sys.meta_path.insert(0, _ImportTimer())
+    atexit.register(_export_at_exit)
@@ -0,0 +1,10 @@
+"""
+Воспроизводимые замеры основного пути принятия решения: поиск эталонной партии,
+запись и чтение БД, подготовка данных, обучение и прогноз модели, выделение
+импульсов подачи кислоты.
+
+Каждый замер выполняется на временной БД с синтетическими данными (фиксированный
+seed) в масштабах 1k, 10k, 100k и 1M. Запуск и сравнение двух прогонов:
+    python benchmarks/run.py --scales 1k,10k
+    python benchmarks/compare.py benchmarks/results/old.json benchmarks/results/new.json
+"""
@@ -0,0 +1,171 @@
+# benchmarks/cases.py
+"""
+Замеры основного пути принятия решения.
+
+Замер - подготовка состояния (setup, в замер не входит) и измеряемое действие (run).
+Масштаб означает для каждого замера свое (поле unit): число партий в БД, длина
+профиля или общее число строк process_data. БД создается в config.base_dir,
+который исполнитель на время замера подменяет временным каталогом.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+from app.core.database import DatabaseManager
+from app.core.models import TemperaturePredictor
+from app.core.recommender import ProcessRecommender, extract_acid_pulses
+from benchmarks import data
+
+# add_batch: партий, добавляемых за одно выполнение (одиночная вставка слишком коротка)
+ADD_BATCH_OPS = 100
+# Обучающая выборка для замера прогноза, строк process_data
+PREDICT_TRAIN_ROWS = 20_000
+
+
+@dataclass
+class Case:
+    name: str
+    unit: str
+    setup: Callable[[int], Dict]
+    run: Callable[[Dict], object]
+    # Подготовка перед каждым выполнением (например, новые данные для вставки)
+    prepare: Optional[Callable[[Dict], None]] = None
+    # Операций за одно выполнение - для времени на операцию
+    ops: int = 1
+
+    def teardown(self, state: Dict):
+        db = state.get('db')
+        if db is not None:
+            db.close()
+
+
+def _batches_db(scale: int) -> Dict:
+    db = DatabaseManager()
+    data.fill_batches(db, scale)
+    return {'db': db, 'scale': scale, 'round': 0}
+
+
+# --- Рекомендатель ---
+
+def _setup_find_best_match(scale):
+    state = _batches_db(scale)
+    # Входные данные - состав партии из середины базы: кандидаты гарантированно есть
+    state['input'] = pd.read_sql_query(
+        "SELECT * FROM batches WHERE batch_id = ?", state['db'].get_connection(),
+        params=[data.batch_id(scale // 2)]
+    ).iloc[0].to_dict()
+    state['recommender'] = ProcessRecommender(state['db'])
+    return state
+
+
+def _run_find_best_match(state):
+    if state['recommender'].find_best_match(state['input']) is None:
+        raise RuntimeError("эталонная партия не найдена")
+
+
+# --- DatabaseManager ---
+
+def _prepare_add_batch(state):
+    offset = state['scale'] + state['round'] * ADD_BATCH_OPS
+    state['pending'] = data.make_batches(ADD_BATCH_OPS, offset=offset).to_dict('records')
+    state['round'] += 1
+
+
+def _run_add_batch(state):
+    for batch in state['pending']:
+        state['db'].add_batch(batch)
+
+
+def _setup_add_process_data(scale):
+    state = {'db': DatabaseManager(), 'round': 0}
+    state['records'] = data.profile_records(data.make_profile(scale))
+    return state
+
+
+def _prepare_add_process_data(state):
+    # Каждое выполнение пишет профиль новой партии
+    batch = data.make_batches(1, offset=state['round'])
+    data.insert_rows(state['db'].get_connection(), 'batches', batch)
+    state['db'].get_connection().commit()
+    state['batch'] = batch['batch_id'].iloc[0]
+    state['round'] += 1
+
+
+def _run_add_process_data(state):
+    if not state['db'].add_process_data(state['batch'], 3, state['records']):
+        raise RuntimeError("запись профиля не удалась")
+
+
+def _setup_get_process_data(scale):
+    db = DatabaseManager()
+    data.fill_batches(db, 1)
+    data.insert_rows(db.get_connection(), 'process_data', data.make_profile(scale))
+    db.get_connection().commit()
+    return {'db': db}
+
+
+def _run_get_process_data(state):
+    state['db'].get_process_data(data.batch_id(0))
+
+
+def _run_get_all_batches(state):
+    state['db'].get_all_batches()
+
+
+# --- Модель температуры ---
+
+def _setup_predictor(scale):
+    db = DatabaseManager()
+    data.fill_profiles(db, scale)
+    return {'db': db, 'predictor': TemperaturePredictor()}
+
+
+def _run_prepare_training_data(state):
+    X, _ = state['predictor'].prepare_training_data()
+    if X is None:
+        raise RuntimeError("нет данных для обучения")
+
+
+def _run_train(state):
+    if not state['predictor'].train():
+        raise RuntimeError("обучение не удалось")
+
+
+def _setup_predict(scale):
+    state = _setup_predictor(PREDICT_TRAIN_ROWS)
+    _run_train(state)
+    state['profile'] = data.make_profile(scale)
+    return state
+
+
+def _run_predict(state):
+    result = state['predictor'].predict_temperature(state['profile'])
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+
+
+# --- Экран работы ---
+
+def _setup_pulses(scale):
+    return {'profile': data.make_profile(scale)}
+
+
+def _run_pulses(state):
+    # То же, что WorkScreen.update_data делает без кэша рекомендателя
+    extract_acid_pulses(state['profile']['acid_flow'].to_numpy())
+
+
+CASES = [
+    Case('recommender.find_best_match', 'партий в БД', _setup_find_best_match, _run_find_best_match),
+    Case('db.add_batch', 'партий в БД', _batches_db, _run_add_batch,
+         prepare=_prepare_add_batch, ops=ADD_BATCH_OPS),
+    Case('db.add_process_data', 'строк профиля', _setup_add_process_data, _run_add_process_data,
+         prepare=_prepare_add_process_data),
+    Case('db.get_process_data', 'строк профиля', _setup_get_process_data, _run_get_process_data),
+    Case('db.get_all_batches', 'партий в БД', _batches_db, _run_get_all_batches),
+    Case('model.prepare_training_data', 'строк process_data', _setup_predictor, _run_prepare_training_data),
+    Case('model.train', 'строк process_data', _setup_predictor, _run_train),
+    Case('model.predict_temperature', 'строк профиля', _setup_predict, _run_predict),
+    Case('work_screen.pulse_extraction', 'минут профиля', _setup_pulses, _run_pulses),
+]
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Сравнение двух прогонов benchmarks/run.py: изменение времени по каждому замеру и
+масштабу, регрессии отмечаются. Код возврата 1, если есть хотя бы одна регрессия.
+
+Регрессия - рост выбранной статистики (по умолчанию медианы) больше чем на
+--threshold и больше чем на --min-delta-ms: короткие замеры шумят сильнее.
+
+Пример:
+    python benchmarks/compare.py benchmarks/results/base.json benchmarks/results/new.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.run import format_scale, format_seconds
+
+DEFAULT_THRESHOLD = 0.10
+DEFAULT_MIN_DELTA_MS = 0.05
+# Сведения о машине, расхождение в которых делает сравнение сомнительным
+MACHINE_KEYS = ('hostname', 'platform', 'processor', 'cpu_count', 'python', 'numpy', 'pandas',
+                'sklearn', 'sqlite')
+
+
+def load(path) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(base: dict, new: dict, stat: str = 'median', threshold: float = DEFAULT_THRESHOLD,
+            min_delta: float = DEFAULT_MIN_DELTA_MS / 1000) -> list:
+    """Строки сравнения: (имя, масштаб, было, стало, изменение, статус)"""
+    base_results = {(r['name'], r['scale']): r for r in base['results']}
+    new_results = {(r['name'], r['scale']): r for r in new['results']}
+    rows = []
+    for key in list(base_results) + [k for k in new_results if k not in base_results]:
+        old, cur = base_results.get(key), new_results.get(key)
+        if old is None or cur is None:
+            rows.append((*key, old and old.get(stat), cur and cur.get(stat), None,
+                         'только в новом' if old is None else 'только в базовом'))
+            continue
+        if 'error' in old or 'error' in cur:
+            rows.append((*key, old.get(stat), cur.get(stat), None,
+                         f"ошибка: {cur.get('error') or old.get('error')}"))
+            continue
+        before, after = old[stat], cur[stat]
+        change = after / before - 1 if before > 0 else 0.0
+        if change > threshold and after - before > min_delta:
+            status = 'РЕГРЕССИЯ'
+        elif change < -threshold and before - after > min_delta:
+            status = 'ускорение'
+        else:
+            status = ''
+        rows.append((*key, before, after, change, status))
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Сравнение двух прогонов замеров")
+    parser.add_argument('base', help="базовый прогон (JSON)")
+    parser.add_argument('new', help="новый прогон (JSON)")
+    parser.add_argument('--stat', default='median', choices=('median', 'min', 'mean'),
+                        help="сравниваемая статистика")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимый относительный рост (0.10 = 10%%)")
+    parser.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help="рост меньше этого (мс) регрессией не считается")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    base, new = load(args.base), load(args.new)
+
+    print(f"Базовый: {args.base} ({base['created']}, {base['machine'].get('commit')})")
+    print(f"Новый:   {args.new} ({new['created']}, {new['machine'].get('commit')})")
+    differs = [k for k in MACHINE_KEYS if base['machine'].get(k) != new['machine'].get(k)]
+    if differs:
+        print("⚠️  Прогоны сделаны в разном окружении: " + ', '.join(
+            f"{k}: {base['machine'].get(k)} -> {new['machine'].get(k)}" for k in differs))
+    print()
+
+    rows = compare(base, new, args.stat, args.threshold, args.min_delta_ms / 1000)
+    print(f"{'Замер':<32} {'Масштаб':>7} {'Было':>12} {'Стало':>12} {'Изменение':>10}")
+    for name, scale, before, after, change, status in rows:
+        print(f"{name:<32} {format_scale(scale):>7} "
+              f"{format_seconds(before) if before is not None else '-':>12} "
+              f"{format_seconds(after) if after is not None else '-':>12} "
+              f"{f'{change:+.1%}' if change is not None else '':>10}  {status}")
+
+    regressions = [row for row in rows if row[5] == 'РЕГРЕССИЯ']
+    print(f"\nРегрессий: {len(regressions)} (порог {args.threshold:.0%}, статистика: {args.stat})")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
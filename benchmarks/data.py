@@ -0,0 +1,133 @@
+# benchmarks/data.py
+"""
+Синтетические данные для замеров: партии, процессные профили и заполнение БД.
+
+Генераторы детерминированы (seed), поэтому два прогона на одной версии кода
+работают с одинаковыми данными. Заполнение идет пакетным INSERT в обход
+DatabaseManager - подготовка данных в замер не входит.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+SEED = 42
+# Длина профиля одной партии, минут (для замеров, где масштаб - общее число строк)
+PROFILE_MINUTES = 1000
+# Время старта профилей
+START = datetime(2024, 1, 1)
+
+CHEMISTRY = {
+    'ni_percent': (5.0, 15.0),
+    'cu_percent': (2.0, 8.0),
+    'pt_percent': (0.5, 3.0),
+    'pd_percent': (1.0, 5.0),
+    'sio2_percent': (10.0, 30.0),
+    'c_percent': (0.5, 3.0),
+    'se_percent': (0.1, 1.0),
+}
+
+BATCH_COLUMNS = ['batch_id', 'extraction_date', 'sulfate_number', 'sample_weight',
+                 *CHEMISTRY, 'extraction_percent', 'is_good']
+PROCESS_COLUMNS = ['batch_id', 'sulfate_number', 'timestamp', 'temperature_1', 'temperature_2',
+                   'temperature_3', 'acid_flow', 'current_value', 'electrodes_pos', 'level_mixer',
+                   'optimal_temp']
+
+
+def batch_id(i: int) -> str:
+    return f"B{i:07d}"
+
+
+def make_batches(n: int, seed: int = SEED, offset: int = 0) -> pd.DataFrame:
+    """n партий с номерами offset..offset+n-1"""
+    rng = np.random.default_rng(seed + offset)
+    data = {
+        'batch_id': [batch_id(offset + i) for i in range(n)],
+        'extraction_date': [(START + timedelta(days=int(d))).strftime('%Y-%m-%d')
+                            for d in rng.integers(0, 1500, n)],
+        'sulfate_number': rng.integers(1, 5, n),
+        'sample_weight': rng.uniform(80.0, 120.0, n).round(2),
+    }
+    for column, (low, high) in CHEMISTRY.items():
+        data[column] = rng.uniform(low, high, n).round(3)
+    data['extraction_percent'] = rng.uniform(70.0, 99.0, n).round(2)
+    data['is_good'] = np.ones(n, dtype=np.int64)
+    return pd.DataFrame(data, columns=BATCH_COLUMNS)
+
+
+def make_acid_flow(n: int, seed: int = SEED) -> np.ndarray:
+    """Ступенчатый расход кислоты: импульсы 5-60 минут с паузами 5-120 минут"""
+    rng = np.random.default_rng(seed)
+    flow = np.zeros(n)
+    pos = 0
+    while pos < n:
+        pos += int(rng.integers(5, 120))
+        length = int(rng.integers(5, 60))
+        flow[pos:pos + length] = rng.uniform(2.0, 10.0)
+        pos += length
+    return flow + rng.normal(0.0, 0.05, n).clip(0.0)
+
+
+def make_profile(n: int, batch: str = 'B0000000', sulfate_number: int = 3,
+                 seed: int = SEED) -> pd.DataFrame:
+    """Процессный профиль партии из n минут (столбцы таблицы process_data)"""
+    rng = np.random.default_rng(seed)
+    minutes = np.arange(n)
+    base = 60.0 + 40.0 * (1.0 - np.exp(-minutes / 300.0))
+    timestamps = pd.date_range(START, periods=n, freq='min').strftime('%Y-%m-%d %H:%M:%S')
+    return pd.DataFrame({
+        'batch_id': batch,
+        'sulfate_number': sulfate_number,
+        'timestamp': timestamps,
+        'temperature_1': base + rng.normal(0.0, 1.0, n),
+        'temperature_2': base - 5.0 + rng.normal(0.0, 1.0, n),
+        'temperature_3': base - 10.0 + rng.normal(0.0, 1.5, n),
+        'acid_flow': make_acid_flow(n, seed),
+        'current_value': 150.0 + rng.normal(0.0, 5.0, n),
+        'electrodes_pos': rng.uniform(0.0, 1.0, n),
+        'level_mixer': rng.uniform(0.0, 1.0, n),
+        'optimal_temp': np.full(n, 90.0),
+    }, columns=PROCESS_COLUMNS)
+
+
+def profile_records(df: pd.DataFrame) -> List[Dict]:
+    """Профиль в виде, который принимает DatabaseManager.add_process_data"""
+    return df.drop(columns=['batch_id', 'sulfate_number']).to_dict('records')
+
+
+def insert_rows(conn, table: str, df: pd.DataFrame):
+    placeholders = ', '.join('?' * len(df.columns))
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(df.columns)}) VALUES ({placeholders})",
+        df.itertuples(index=False, name=None)
+    )
+
+
+def fill_batches(db, n: int, chunk: int = 100_000):
+    """n партий в таблице batches"""
+    conn = db.get_connection()
+    for offset in range(0, n, chunk):
+        insert_rows(conn, 'batches', make_batches(min(chunk, n - offset), offset=offset))
+    conn.commit()
+
+
+def fill_profiles(db, total_rows: int, minutes: int = PROFILE_MINUTES) -> List[str]:
+    """
+    Успешные партии (извлечение >= 85%, их берет обучение) с профилями по minutes
+    строк (последняя - короче), всего total_rows строк process_data. Признаки для
+    обучения пересчитываются здесь же.
+    """
+    n_batches = max(1, -(-total_rows // minutes))
+    batches = make_batches(n_batches)
+    batches['extraction_percent'] = (85.0 + (batches['extraction_percent'] - 70.0) / 2).round(2)
+    conn = db.get_connection()
+    insert_rows(conn, 'batches', batches)
+    ids = []
+    for i in range(n_batches):
+        rows = min(minutes, total_rows - i * minutes)
+        ids.append(batch_id(i))
+        insert_rows(conn, 'process_data', make_profile(rows, ids[-1], seed=SEED + i))
+    conn.commit()
+    db.rebuild_features(stale_only=True)
+    return ids
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Запуск замеров benchmarks/cases.py и запись результатов в JSON вместе со
+сведениями о машине (для сравнения прогонов: benchmarks/compare.py).
+
+Каждый замер в каждом масштабе выполняется на своей временной БД: одно
+прогревочное выполнение, затем до --rounds измеряемых, пока не исчерпан
+бюджет --max-time (медленные замеры в больших масштабах выполняются один раз).
+
+Пример:
+    python benchmarks/run.py                          # все замеры, 1k..1M
+    python benchmarks/run.py --scales 1k,10k --only db. --out benchmarks/results/base.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+
+# Добавляем корневую директорию в путь Python, чтобы импорты app работали
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.utils.config import config
+
+DEFAULT_SCALES = '1k,10k,100k,1M'
+DEFAULT_ROUNDS = 5
+# Бюджет времени на замер в одном масштабе, с
+DEFAULT_MAX_TIME = 30.0
+RESULTS_DIR = ROOT / 'benchmarks' / 'results'
+SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_scale(text: str) -> int:
+    text = text.strip().lower().replace('_', '')
+    if text[-1:] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+
+def format_scale(n: int) -> str:
+    for suffix, size in (('M', 1_000_000), ('k', 1_000)):
+        if n >= size and n % size == 0:
+            return f"{n // size}{suffix}"
+    return str(n)
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        if out.returncode != 0:
+            return None
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, timeout=10).stdout.strip()
+        return out.stdout.strip() + ('-dirty' if dirty else '')
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def machine_info() -> dict:
+    import numpy
+    import pandas
+    try:
+        import sklearn
+        sklearn_version = sklearn.__version__
+    except ImportError:
+        sklearn_version = None
+    return {
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor() or None,
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'sklearn': sklearn_version,
+        'sqlite': sqlite3.sqlite_version,
+        'commit': _git_commit(),
+    }
+
+
+def _timed(case, state) -> float:
+    if case.prepare is not None:
+        case.prepare(state)
+    gc.collect()
+    started = time.perf_counter()
+    case.run(state)
+    return time.perf_counter() - started
+
+
+def measure(case, scale: int, rounds: int, max_time: float) -> dict:
+    """Один замер в одном масштабе; ошибка не прерывает прогон, а попадает в результат"""
+    result = {'name': case.name, 'scale': scale, 'unit': case.unit, 'ops': case.ops}
+    workdir = Path(tempfile.mkdtemp(prefix='bench_'))
+    base_dir = config.base_dir
+    config.base_dir = workdir
+    state = None
+    try:
+        started = time.perf_counter()
+        state = case.setup(scale)
+        result['setup_s'] = round(time.perf_counter() - started, 3)
+
+        warmup = _timed(case, state)
+        if warmup >= max_time:
+            # Слишком долго для повторов: прогревочное выполнение и есть замер
+            samples = [warmup]
+        else:
+            n = max(1, min(rounds, int((max_time - warmup) / max(warmup, 1e-9))))
+            samples = [_timed(case, state) for _ in range(n)]
+
+        median = statistics.median(samples)
+        result.update({
+            'rounds': len(samples),
+            'min': min(samples),
+            'max': max(samples),
+            'mean': statistics.fmean(samples),
+            'median': median,
+            'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            'per_op': median / case.ops,
+            'items_per_s': scale / median if median > 0 else None,
+        })
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc(limit=5)
+    finally:
+        if state is not None:
+            try:
+                case.teardown(state)
+            except Exception:
+                pass
+        config.base_dir = base_dir
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def format_seconds(value: float) -> str:
+    if value >= 1:
+        return f"{value:.2f} с"
+    if value >= 1e-3:
+        return f"{value * 1e3:.2f} мс"
+    return f"{value * 1e6:.1f} мкс"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Замеры основного пути экспертной системы")
+    parser.add_argument('--scales', default=DEFAULT_SCALES, help="масштабы через запятую (1k, 10k, 100k, 1M)")
+    parser.add_argument('--only', action='append', default=[],
+                        help="только замеры, в имени которых есть подстрока (можно несколько)")
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help="измеряемых выполнений")
+    parser.add_argument('--max-time', type=float, default=DEFAULT_MAX_TIME,
+                        help="бюджет времени на замер в одном масштабе, с")
+    parser.add_argument('--out', help="файл результатов (по умолчанию benchmarks/results/bench_<дата_время>.json)")
+    parser.add_argument('--log-level', default='WARNING', help="уровень журнала приложения во время замеров")
+    parser.add_argument('--list', action='store_true', help="показать замеры и выйти")
+    return parser.parse_args()
+
+
+def main():
+    # Замеры импортируют приложение целиком - не при импорте модуля (его использует compare.py)
+    from benchmarks.cases import CASES
+
+    args = parse_args()
+    cases = [c for c in CASES if not args.only or any(s in c.name for s in args.only)]
+    if args.list or not cases:
+        for case in cases or CASES:
+            print(f"{case.name:<32} масштаб: {case.unit}")
+        return 0 if cases else 1
+
+    scales = [parse_scale(s) for s in args.scales.split(',') if s.strip()]
+    logging.getLogger('expert_system').setLevel(args.log_level.upper())
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'machine': machine_info(),
+        'settings': {'scales': scales, 'rounds': args.rounds, 'max_time': args.max_time},
+        'results': [],
+    }
+    for case in cases:
+        for scale in scales:
+            print(f"{case.name:<32} {format_scale(scale):>5} ... ", end='', flush=True)
+            result = measure(case, scale, args.rounds, args.max_time)
+            report['results'].append(result)
+            if 'error' in result:
+                print(f"ошибка: {result['error']}")
+            else:
+                per_op = f", на операцию {format_seconds(result['per_op'])}" if case.ops > 1 else ''
+                print(f"медиана {format_seconds(result['median'])} "
+                      f"(мин {format_seconds(result['min'])}, выполнений: {result['rounds']}{per_op})")
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты: {out}")
+    return 1 if any('error' in r for r in report['results']) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,13 +14,18 @@ else:
 sys.path.append(basedir)
 # ---------------------------------------
 
+# Первым делом - точка отсчета времени запуска и (опционально) трассировка импортов
+from app.utils import startup
+from app.utils import tracing
+
 from PyQt5.QtWidgets import QApplication, QMainWindow, QStackedWidget, QMessageBox, QTabWidget
+from PyQt5.QtCore import QTimer
 from app.core.database import DatabaseManager
 from app.core.recommender import ProcessRecommender
-from app.gui.input_screen import InputScreen
-from app.gui.work_screen import WorkScreen
-from app.gui.sulfate_unit import SulfateUnit
-from app.gui.kb_screen import KnowledgeBaseScreen
+from app.gui.lazy_tab import LazyTab
+# Экраны аппаратов (pyqtgraph, pandas) и БЗ импортируются при первом показе вкладки
+
+startup.mark("Импорт модулей")
 
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -33,31 +38,39 @@ class MainWindow(QMainWindow):
         # Ресурсы
         self.db = DatabaseManager()
         self.recommender = ProcessRecommender(self.db)
+        startup.mark("Подключение к БД")
 
         # Создаем виджет вкладок
         self.tabs = QTabWidget()
 
-        # 1. Создаем аппараты
-        self.unit3 = SulfateUnit("СФР-3", self.recommender, self.db)
-        self.unit4 = SulfateUnit("СФР-4", self.recommender, self.db)
-
-        # 2. Создаем экран Базы Знаний
-        self.kb_screen = KnowledgeBaseScreen(self.db)
+        # 1. Аппараты и 2. экран Базы Знаний строятся при первом открытии вкладки
+        self.unit3_tab = LazyTab("СФР-3", lambda: self._create_unit("СФР-3"))
+        self.unit4_tab = LazyTab("СФР-4", lambda: self._create_unit("СФР-4"))
+        self.kb_tab = LazyTab("БАЗА ЗНАНИЙ", self._create_kb_screen)
 
         # Добавляем три вкладки
-        self.tabs.addTab(self.unit3, "СФР-3")
-        self.tabs.addTab(self.unit4, "СФР-4")
-        self.tabs.addTab(self.kb_screen, "БАЗА ЗНАНИЙ")
+        self.tabs.addTab(self.unit3_tab, "СФР-3")
+        self.tabs.addTab(self.unit4_tab, "СФР-4")
+        self.tabs.addTab(self.kb_tab, "БАЗА ЗНАНИЙ")
 
         self.setCentralWidget(self.tabs)
 
         # Обновляем БЗ при переключении на вкладку
         self.tabs.currentChanged.connect(self.handle_tab_change)
 
+    def _create_unit(self, unit_name):
+        from app.gui.sulfate_unit import SulfateUnit
+        return SulfateUnit(unit_name, self.recommender, self.db)
+
+    def _create_kb_screen(self):
+        from app.gui.kb_screen import KnowledgeBaseScreen
+        return KnowledgeBaseScreen(self.db)
+
     def handle_tab_change(self, index):
-        # Если переключились на 2-ю вкладку (БЗ), обновляем таблицу
-        if index == 2:
-            self.kb_screen.load_batches()
+        # Если переключились на 2-ю вкладку (БЗ), обновляем таблицу.
+        # При первом открытии экран строится и загружает таблицу сам
+        if index == 2 and self.kb_tab.widget is not None:
+            self.kb_tab.widget.load_batches()
 
     def switch_to_sfr(self):
         sender = self.sender()
@@ -90,9 +103,14 @@ class MainWindow(QMainWindow):
 if __name__ == "__main__":
     # 1. Создаем экземпляр приложения
     app = QApplication(sys.argv)
+    startup.mark("Создание QApplication")
 
     # 2. Создаем и показываем главное окно
     window = MainWindow()
+    startup.mark("Создание главного окна")
     window.show()
+
+    # Отчет - после первого прохода цикла событий (окно и первая вкладка построены)
+    QTimer.singleShot(0, startup.report)
     # 3. Запускаем цикл обработки событий
     sys.exit(app.exec_())
\ No newline at end of file
@@ -6,28 +6,57 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
-    QTextEdit, QPushButton, QTableWidget, QTableWidgetItem,
-    QLabel, QHeaderView, QMessageBox
+    QTextEdit, QPushButton, QTableView,
+    QLabel, QMessageBox, QListWidget, QListWidgetItem, QSplitter
 )
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt
-import pandas as pd
 
 
 from app.core.database import DatabaseManager
+from app.core.query_guard import QueryGuard
+from app.gui.async_loader import query_executor
+from app.gui.table_models import CursorTableModel
+
+# Ключ фонового запроса в общем исполнителе
+QUERY_KEY = 'db_manager.query'
+# Бюджеты одного запроса: время, с, и строк в таблице результатов
+QUERY_TIME_BUDGET = 60
+QUERY_ROW_BUDGET = 100_000
+# Следующие блоки читаются в GUI-потоке при прокрутке: предельное время на блок, с
+FETCH_TIME_BUDGET = 5
 
 
 class SimpleDBManager(QWidget):
     def __init__(self):
         super().__init__()
         self.db_manager = DatabaseManager()
+        self._guard = None
         self.init_ui()
 
     def init_ui(self):
         self.setWindowTitle("SulfateDB Explorer (DatabaseManager Edition)")
         self.resize(1000, 700)
 
-        layout = QVBoxLayout(self)
+        root_layout = QHBoxLayout(self)
+        splitter = QSplitter(Qt.Horizontal)
+        root_layout.addWidget(splitter)
+
+        # Список таблиц (из кэша схемы: перечитывается только при изменении схемы)
+        tables_panel = QWidget()
+        tables_layout = QVBoxLayout(tables_panel)
+        tables_layout.setContentsMargins(0, 0, 0, 0)
+        tables_layout.addWidget(QLabel("Таблицы:"))
+        self.tables_list = QListWidget()
+        self.tables_list.itemDoubleClicked.connect(self.select_table)
+        tables_layout.addWidget(self.tables_list)
+        splitter.addWidget(tables_panel)
+
+        query_panel = QWidget()
+        layout = QVBoxLayout(query_panel)
+        layout.setContentsMargins(0, 0, 0, 0)
+        splitter.addWidget(query_panel)
+        splitter.setSizes([220, 780])
 
         # Поле ввода запроса
         layout.addWidget(QLabel("Введите SQL запрос (например, SELECT * FROM process_data):"))
@@ -53,16 +82,26 @@ class SimpleDBManager(QWidget):
         """)
         self.btn_run.clicked.connect(self.execute_query)
 
+        self.btn_cancel = QPushButton("Отменить")
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.cancel_query)
+
         self.btn_clear = QPushButton("Очистить")
         self.btn_clear.clicked.connect(lambda: self.query_input.clear())
 
         btn_layout.addWidget(self.btn_run)
+        btn_layout.addWidget(self.btn_cancel)
         btn_layout.addWidget(self.btn_clear)
         layout.addLayout(btn_layout)
 
         # Таблица результатов
         layout.addWidget(QLabel("Результаты:"))
-        self.table = QTableWidget()
+        # Строки читаются с курсора блоками по мере прокрутки
+        self.model = CursorTableModel(parent=self)
+        self.model.fetch_failed.connect(self._on_fetch_failed)
+        self.model.idle_closed.connect(self._on_cursor_idle_closed)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.setAlternatingRowColors(True)
         layout.addWidget(self.table)
 
@@ -70,65 +109,164 @@ class SimpleDBManager(QWidget):
         self.status_label = QLabel("Готов к работе")
         layout.addWidget(self.status_label)
 
+        self.refresh_tables()
+
+    def refresh_tables(self):
+        try:
+            schema = self.db_manager.get_schema()
+        except Exception as e:
+            self.status_label.setText(f"Не удалось прочитать схему: {e}")
+            return
+
+        self.tables_list.clear()
+        for name in schema.table_names(include_views=True):
+            info = schema.tables[name]
+            text = name if info.type == 'table' else f"{name} (view)"
+            if info.row_estimate is not None:
+                text += f"  ~{info.row_estimate}"
+            item = QListWidgetItem(text)
+            item.setData(Qt.UserRole, name)
+            columns = "\n".join(f"  {col.name} {col.type}" for col in info.columns)
+            indexes = "\n".join(f"  {idx.name} ({', '.join(idx.columns)})" for idx in info.indexes)
+            item.setToolTip(f"Столбцы:\n{columns}" + (f"\nИндексы:\n{indexes}" if indexes else ""))
+            self.tables_list.addItem(item)
+
+    def select_table(self, item):
+        self.query_input.setText(f'SELECT * FROM "{item.data(Qt.UserRole)}" LIMIT 100')
+        self.execute_query()
+
     def execute_query(self):
         query = self.query_input.toPlainText().strip()
-        if not query:
+        if not query or self._guard is not None:
             return
 
+        if not query.lower().startswith("select"):
+            # Открытый курсор прошлого результата держит блокировку БД - запись не пройдет
+            self.model.close()
+
+        # Запрос выполняется в фоновом потоке: окно не зависает, а долгий запрос
+        # можно отменить или он остановится сам по бюджету времени
+        self._guard = QueryGuard(QUERY_TIME_BUDGET, QUERY_ROW_BUDGET, sql=query)
+        self.btn_run.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.status_label.setText("Выполняется...")
+        self.status_label.setStyleSheet("")
+        query_executor().submit(
+            QUERY_KEY, self._run_query, query, self._guard,
+            on_result=self._on_query_result, on_error=self._on_query_error
+        )
+
+    def _run_query(self, query, guard):
+        """
+        Выполняется в фоновом потоке (у потока свое соединение DatabaseManager).
+        Возвращает (столбцы, строки, открытый курсор или None, число измененных строк).
+        """
+        # Проверяем, это запрос на чтение (SELECT) или на изменение
+        if query.lower().startswith("select"):
+            # В фоне читается только первый блок, остальные модель дочитывает при прокрутке
+            cursor = self.db_manager.open_cursor(query, guard=guard)
+            try:
+                with guard.attach(cursor.connection):
+                    rows = guard.fetch(cursor, self.model.block_size)
+            except Exception:
+                cursor.connection.close()
+                raise
+            return [d[0] for d in cursor.description], rows, cursor, None
+        if query.lower().startswith("pragma"):
+            conn = self.db_manager.get_connection()
+            with guard.attach(conn):
+                cursor = conn.execute(query)
+                rows = guard.fetch_all(cursor)
+            return [d[0] for d in cursor.description or ()], rows, None, None
+        # Для DELETE, UPDATE, INSERT - число измененных строк (изменения фиксируются)
+        return None, None, None, self.db_manager.execute_query(query, guard=guard)
+
+    def _fetch_block(self, cursor, guard, size):
+        """Следующий блок строк при прокрутке (GUI-поток); бюджет строк - общий на запрос"""
+        block = QueryGuard(FETCH_TIME_BUDGET)
         try:
-            # Получаем соединение через ваш db_manager
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
+            with block.attach(cursor.connection):
+                rows = guard.fetch(cursor, size)
+        except Exception as e:
+            raise RuntimeError(block.error_message(e)) from e
+        if guard.truncated:
+            self.status_label.setText(f"Показаны первые {QUERY_ROW_BUDGET} строк результата")
+        return rows
 
-                # Проверяем, это запрос на чтение (SELECT) или на изменение
-                is_select = query.lower().startswith("select") or query.lower().startswith("pragma")
+    def _on_cursor_idle_closed(self, rows):
+        self.status_label.setText(
+            f"Курсор закрыт после простоя, чтобы не блокировать запись в БД: показаны первые {rows} строк"
+        )
 
-                if is_select:
-                    # Для SELECT используем pandas
-                    df = pd.read_sql_query(query, conn)
-                    self.display_data(df)
-                    self.status_label.setText(f"Успешно: получено строк: {len(df)}")
-                else:
-                    # Для DELETE, UPDATE, INSERT используем обычный курсор
-                    cursor.execute(query)
-                    conn.commit()  # Фиксируем изменения в файле!
+    def _on_fetch_failed(self, e):
+        self.status_label.setText(f"Чтение следующих строк остановлено: {e}")
+        self.status_label.setStyleSheet("color: #E65100")
 
-                    # Очищаем таблицу, так как данных для показа нет
-                    self.table.setRowCount(0)
-                    self.table.setColumnCount(0)
+    def cancel_query(self):
+        if self._guard is not None:
+            self._guard.cancel()
+            self.status_label.setText("Отмена...")
 
-                    self.status_label.setText(f"Запрос выполнен успешно (изменено строк: {cursor.rowcount})")
+    def _finish_query(self):
+        guard, self._guard = self._guard, None
+        self.btn_run.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+        return guard
 
-                self.status_label.setStyleSheet("color: green")
+    def _on_query_result(self, result):
+        guard = self._finish_query()
+        columns, rows, cursor, affected = result
+        stats = guard.stats()
+        timing = f"{stats['elapsed_ms']:.0f} мс, шагов VM: {stats['vm_steps']}"
 
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка SQL", f"Произошла ошибка: {str(e)}")
-            self.status_label.setText("Ошибка при выполнении")
-            self.status_label.setStyleSheet("color: red")
+        if columns is not None:
+            self.display_data(columns, rows, cursor, guard)
+            if guard.truncated:
+                shown = f"показаны первые {QUERY_ROW_BUDGET}"
+            elif self.model.exhausted:
+                shown = f"получено строк: {len(rows)}"
+            else:
+                shown = f"первые {len(rows)} строк, остальные - при прокрутке"
+            self.status_label.setText(f"Успешно: {shown} | {timing}")
+        else:
+            # Очищаем таблицу, так как данных для показа нет
+            self.model.clear()
 
-    def display_data(self, df):
-        # Очистка таблицы
-        self.table.setRowCount(0)
-        self.table.setColumnCount(0)
+            self.status_label.setText(f"Запрос выполнен успешно (изменено строк: {affected}) | {timing}")
+            # CREATE/DROP/ALTER меняют номер схемы - иначе список берется из кэша
+            self.refresh_tables()
 
-        if df.empty:
-            return
+        self.status_label.setStyleSheet("color: green")
 
-        self.table.setRowCount(df.shape[0])
-        self.table.setColumnCount(df.shape[1])
-        self.table.setHorizontalHeaderLabels(df.columns)
+    def _on_query_error(self, e):
+        guard = self._finish_query()
+        message = guard.error_message(e)
+        if guard.reason is not None:
+            # Остановлен по бюджету или пользователем - не ошибка SQL
+            self.status_label.setText(f"{message} ({guard.stats()['elapsed_ms']:.0f} мс)")
+            self.status_label.setStyleSheet("color: #E65100")
+            return
+        QMessageBox.critical(self, "Ошибка SQL", f"Произошла ошибка: {message}")
+        self.status_label.setText("Ошибка при выполнении")
+        self.status_label.setStyleSheet("color: red")
 
-        for i in range(df.shape[0]):
-            for j in range(df.shape[1]):
-                val = str(df.iat[i, j])
-                item = QTableWidgetItem(val)
-                item.setFlags(item.flags() ^ Qt.ItemIsEditable)  # Только для чтения
-                self.table.setItem(i, j, item)
+    def display_data(self, columns, rows, cursor=None, guard=None):
+        if cursor is not None:
+            self.model.set_cursor(cursor, rows, fetch=lambda size: self._fetch_block(cursor, guard, size))
+        else:
+            self.model.set_rows(columns, rows)
+        self.table.scrollToTop()
 
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        # Ширины столбцов - по первому блоку, без измерения каждой ячейки
+        for col, width in enumerate(self.model.column_widths(self.table.fontMetrics())):
+            self.table.setColumnWidth(col, width)
 
     def closeEvent(self, event):
-        # Закрываем менеджер при закрытии окна
+        # Прерываем выполняющийся запрос и закрываем менеджер при закрытии окна
+        if self._guard is not None:
+            self._guard.cancel()
+            query_executor().cancel(QUERY_KEY)
+        self.model.close()
         self.db_manager.close()
         event.accept()
 
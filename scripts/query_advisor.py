@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Разбор планов SQL-запросов и предложения по индексам.
+
+Запросы берутся из журналов, сохраненных приложением (EXPERT_SQL_CAPTURE=1) или
+веб-интерфейсом (sqlite_web.py --save-sql), и/или передаются через --sql.
+
+Пример:
+    EXPERT_SQL_CAPTURE=1 python main.py          # поработать и закрыть приложение
+    python scripts/query_advisor.py logs/sql_capture_*.json
+    python scripts/query_advisor.py --sql "SELECT * FROM batches WHERE sulfate_number = 5"
+"""
+import argparse
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+# Добавляем корневую директорию в путь Python, чтобы импорты app работали
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.query_advisor import StatementLog, analyze, format_report
+
+DB_PATH = 'data/database.db'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Советник по индексам для базы экспертной системы")
+    parser.add_argument('captures', nargs='*', help="журналы запросов (JSON)")
+    parser.add_argument('--db', default=DB_PATH, help="путь к файлу базы данных")
+    parser.add_argument('--sql', action='append', default=[], help="запрос для разбора (можно несколько)")
+    parser.add_argument('--json', action='store_true', help="вывести отчет в формате JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    log = StatementLog()
+    for path in args.captures:
+        log.merge(StatementLog.load(path).snapshot())
+    for sql in args.sql:
+        log.record(sql)
+    if not log.snapshot():
+        print("Нет запросов для разбора: укажите журнал или --sql", file=sys.stderr)
+        return 1
+
+    if not Path(args.db).exists():
+        print(f"База данных не найдена: {args.db}", file=sys.stderr)
+        return 1
+    conn = sqlite3.connect(f"file:{Path(args.db).resolve().as_posix()}?mode=ro", uri=True)
+    try:
+        report = analyze(conn, log.snapshot())
+    finally:
+        conn.close()
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
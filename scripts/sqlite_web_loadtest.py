@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест sqlite_web.py: N параллельных клиентов в течение заданного времени
+запрашивают страницы сервера; печатаются запросы в секунду и перцентили задержки.
+
+Пример (сервер уже запущен):
+    python scripts/sqlite_web_loadtest.py --clients 16 --duration 10
+    python scripts/sqlite_web_loadtest.py --slow-query "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x+1 FROM c) SELECT count(*) FROM c"
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+DEFAULT_PATHS = ['/tables', '/schema', '/table/batches?limit=50']
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def request(base_url, path, body=None, timeout=60):
+    """Один запрос; возвращает (HTTP-статус или 0 при сетевой ошибке, задержка в секундах)"""
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(base_url + path, data=data,
+                                 headers={'Content-Type': 'application/json'} if data else {})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def client(base_url, paths, deadline, results, offset):
+    i = offset
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        results.append((path,) + request(base_url, path))
+        i += 1
+
+
+def slow_client(base_url, query, deadline, results):
+    # Долгие запросы /execute идут параллельно, чтобы видеть, блокируют ли они остальных
+    while time.perf_counter() < deadline:
+        results.append(('/execute',) + request(base_url, '/execute', {'query': query}))
+
+
+def report(title, results, elapsed):
+    latencies = sorted(r[2] for r in results)
+    ok = sum(1 for r in results if r[1] == 200)
+    by_status = {}
+    for _, status, _ in results:
+        by_status[status] = by_status.get(status, 0) + 1
+    print(f"{title}: запросов {len(results)}, успешных {ok}, {len(results) / elapsed:.1f} запр/с")
+    if latencies:
+        print(f"  задержка, мс: p50 {percentile(latencies, 0.50) * 1000:.1f}"
+              f"  p95 {percentile(latencies, 0.95) * 1000:.1f}"
+              f"  p99 {percentile(latencies, 0.99) * 1000:.1f}"
+              f"  макс. {latencies[-1] * 1000:.1f}")
+    print(f"  статусы: {dict(sorted(by_status.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест sqlite_web.py")
+    parser.add_argument('--url', default='http://localhost:8080')
+    parser.add_argument('--clients', type=int, default=8, help="параллельных клиентов")
+    parser.add_argument('--duration', type=float, default=10.0, help="длительность, с")
+    parser.add_argument('--path', action='append', dest='paths',
+                        help=f"запрашиваемый путь (можно несколько), по умолчанию {DEFAULT_PATHS}")
+    parser.add_argument('--slow-query', help="SQL, который отдельный клиент выполняет через /execute по кругу")
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PATHS
+    base_url = args.url.rstrip('/')
+    results, slow_results = [], []
+    deadline = time.perf_counter() + args.duration
+
+    threads = [threading.Thread(target=client, args=(base_url, paths, deadline, results, i))
+               for i in range(args.clients)]
+    if args.slow_query:
+        threads.append(threading.Thread(target=slow_client,
+                                        args=(base_url, args.slow_query, deadline, slow_results)))
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"Сервер {base_url}, клиентов {args.clients}, {elapsed:.1f} с")
+    report("Обычные запросы", results, elapsed)
+    if args.slow_query:
+        report("Долгие запросы", slow_results, elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,25 +2,475 @@
 """
 Простой веб-интерфейс для SQLite - не требует установки программ!
 """
+import argparse
+import base64
+import gzip
+import hashlib
+import itertools
+import queue
 import sqlite3
 import json
+import math
 import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
+from urllib.request import pathname2url
 import html
 
+# Общие с приложением кэши схемы и результатов (модули без внешних зависимостей)
+from app.core.query_advisor import StatementLog, analyze
+from app.core.query_cache import DEFAULT_MAX_ENTRIES, QueryCache, is_cacheable, make_key
+from app.core.query_guard import ActiveQueries, QueryGuard
+from app.core.schema_cache import SchemaCache
+
+DB_PATH = 'data/database.db'
+
+# Параллельная обработка: потоков-обработчиков и мест в очереди ожидания сверх них
+DEFAULT_WORKERS = 8
+DEFAULT_BACKLOG = 32
+# Таймауты: чтение запроса от клиента и выполнение SQL, секунды
+DEFAULT_REQUEST_TIMEOUT = 30
+DEFAULT_QUERY_TIMEOUT = 20
+
+# Долгоживущие соединения: отображение файла в память и кэш подготовленных запросов
+MMAP_SIZE = 256 * 1024 * 1024
+CACHED_STATEMENTS = 256
+# Сколько ждать свободное соединение пула / блокировку записи в файле БД, с
+POOL_WAIT_TIMEOUT = 30
+WRITER_BUSY_TIMEOUT_MS = 5000
+
+# Запросы, которые пробуем выполнить на соединении только для чтения
+READ_KEYWORDS = ('select', 'with', 'explain', 'pragma', 'values')
+# Запросы, которые можно продолжить с нужной строки, обернув в подзапрос с OFFSET
+PAGEABLE_KEYWORDS = ('select', 'with', 'values')
+
+# Потоковая выдача результатов: строк за одно чтение курсора, по умолчанию на страницу
+# и предельное число строк в одном ответе (в том числе в обычном JSON-режиме)
+STREAM_FETCH_ROWS = 500
+STREAM_PAGE_ROWS = 1000
+DEFAULT_ROW_CAP = 10000
+
+# Начиная с такого размера (по sqlite_stat1) таблица показывается с оценкой числа строк
+# вместо точного COUNT(*)
+COUNT_ESTIMATE_MIN_ROWS = 1_000_000
+
+# HTTP-кэширование и сжатие: сколько браузер не перепроверяет главную страницу, с;
+# ответы короче порога отдаются без сжатия
+STATIC_MAX_AGE = 600
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_LEVEL = 6
+
+
+def json_default(value):
+    """Значения, которые json не умеет сериализовать сам (BLOB)"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<BLOB: {len(value)} байт>"
+    return str(value)
+
+
+def encode_token(data):
+    """Непрозрачный курсор продолжения: base64 от JSON"""
+    return base64.urlsafe_b64encode(json.dumps(data).encode('utf-8')).decode('ascii')
+
+
+def decode_token(token):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError("Некорректный курсор продолжения")
+    if not isinstance(data, dict):
+        raise ValueError("Некорректный курсор продолжения")
+    return data
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def ndjson_line(obj):
+    return (json.dumps(obj, ensure_ascii=False, default=json_default) + '\n').encode('utf-8')
+
+
+def accepted_encoding(header):
+    """Сжатие, которое принимает клиент (по Accept-Encoding): 'gzip', 'deflate' или None"""
+    if not header:
+        return None
+    weights = {}
+    for part in header.split(','):
+        name, _, params = part.partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    default = weights.get('*', 0.0)
+    best = max(('gzip', 'deflate'), key=lambda name: weights.get(name, default))
+    return best if weights.get(best, default) > 0 else None
+
+
+def compress_body(data, encoding):
+    if encoding == 'gzip':
+        return gzip.compress(data, COMPRESS_LEVEL, mtime=0)
+    return zlib.compress(data, COMPRESS_LEVEL)
+
+
+def etag_matches(header, etag):
+    """Есть ли etag в If-None-Match (сравнение слабое, как требует RFC 9110 для GET)"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    def strip_weak(tag):
+        return tag[2:] if tag.startswith('W/') else tag
+    return any(strip_weak(tag.strip()) == strip_weak(etag) for tag in header.split(','))
+
+
+def client_limit(value, default, cap, cast):
+    """
+    Ограничение, переданное клиентом: пустое или неположительное - значение сервера
+    default, больше cap - cap. Нечисловое значение - ValueError.
+    """
+    if value is None or value == '' or isinstance(value, bool):
+        return default
+    number = cast(value)
+    if not math.isfinite(number):
+        raise ValueError(f"недопустимое значение: {value!r}")
+    return min(number, cap) if number > 0 else default
+
+
+class ConnectionPool:
+    """
+    Постоянные соединения с БД: пул только для чтения (mode=ro, query_only) и один
+    писатель, через который последовательно проходят все изменяющие запросы.
+    Соединения не закрываются между запросами, поэтому кэш страниц SQLite и
+    подготовленные запросы (cached_statements) переживают отдельный HTTP-запрос.
+    Если передан журнал statements, в него попадают запросы читателей и писателя.
+    """
+
+    def __init__(self, db_path, size=DEFAULT_WORKERS, statements=None):
+        self.db_path = os.path.abspath(db_path)
+        self.size = max(1, size)
+        self.statements = statements
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._all = []
+        self._writer = None
+        self._write_lock = threading.Lock()
+        self._probe = None
+        self._probe_lock = threading.Lock()
+        # Номера версий ниже имеют смысл только в пределах процесса (data_version -
+        # даже в пределах соединения), поэтому в ETag добавляется метка запуска
+        self.instance = os.urandom(4).hex()
+
+    def _probe_pragma(self, name):
+        with self._probe_lock:
+            if self._probe is None:
+                self._probe = self._open_reader()
+            return self._probe.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def data_version(self):
+        """
+        Номер версии данных: меняется после каждой фиксации изменений в БД любым
+        соединением или процессом (в том числе нашим писателем). PRAGMA data_version
+        не видит изменений своего же соединения, поэтому читаем его через отдельное
+        соединение, которое никогда не пишет.
+        """
+        return self._probe_pragma('data_version')
+
+    def schema_version(self):
+        """Номер версии схемы из заголовка файла БД: меняется при CREATE/ALTER/DROP"""
+        return self._probe_pragma('schema_version')
+
+    def _open_reader(self):
+        uri = 'file:' + pathname2url(self.db_path) + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        return conn
+
+    def _open_writer(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS)
+        conn.execute(f"PRAGMA busy_timeout = {WRITER_BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        return conn
+
+    def _acquire_reader(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                conn = self._open_reader()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            if self.statements is not None:
+                self.statements.attach(conn)
+            with self._lock:
+                self._all.append(conn)
+            return conn
+        return self._idle.get(timeout=POOL_WAIT_TIMEOUT)
+
+    @contextmanager
+    def reader(self):
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            # Возвращаем соединение в исходном состоянии
+            conn.set_progress_handler(None, 0)
+            conn.row_factory = None
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    @contextmanager
+    def writer(self):
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open_writer()
+                if self.statements is not None:
+                    self.statements.attach(self._writer)
+            conn = self._writer
+            try:
+                yield conn
+            except Exception:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+            finally:
+                conn.set_progress_handler(None, 0)
+                conn.row_factory = None
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+            self._created = 0
+        self._idle = queue.LifoQueue()
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._probe_lock:
+            if self._probe is not None:
+                self._probe.close()
+                self._probe = None
+
+
+class RowCountCache:
+    """
+    Число строк таблиц, действительное до следующего изменения БД (по data_version).
+    Для очень больших таблиц с собранной статистикой (ANALYZE) отдается оценка из
+    sqlite_stat1 (через кэш схемы) без полного прохода COUNT(*).
+    """
+
+    def __init__(self, pool, schema):
+        self.pool = pool
+        self.schema = schema
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def get(self, conn, table):
+        """(число строк, точное ли оно)"""
+        # Версию берем до подсчета: изменение во время COUNT(*) просто вызовет пересчет
+        version = self.pool.data_version()
+        with self._lock:
+            cached = self._counts.get(table)
+        if cached and cached[0] == version:
+            return cached[1], True
+
+        info = self.schema.get(conn).tables.get(table)
+        estimate = info.stat_rows if info else None
+        if estimate is not None and estimate >= COUNT_ESTIMATE_MIN_ROWS:
+            return estimate, False
+
+        count = conn.execute(f"SELECT COUNT(*) FROM {quote_identifier(table)}").fetchone()[0]
+        with self._lock:
+            self._counts[table] = (version, count)
+        return count, True
+
+
+class CachedRows:
+    """Сохраненный в кэше результат с интерфейсом курсора (для повторной потоковой выдачи)"""
+
+    def __init__(self, columns, rows):
+        self.description = [(name,) for name in columns]
+        self._rows = iter(rows)
+
+    def fetchmany(self, size):
+        return list(itertools.islice(self._rows, size))
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTP-сервер с ограниченным пулом потоков: медленный запрос одного пользователя
+    не блокирует остальных. Если заняты все потоки и очередь ожидания, новое
+    соединение сразу получает 503, а не копится без ограничений.
+    """
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS, backlog=DEFAULT_BACKLOG):
+        super().__init__(server_address, handler_class)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sqlite-web')
+        self.slots = threading.BoundedSemaphore(workers + backlog)
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            self._reject(request)
+            return
+        self.pool.submit(self._process_request_thread, request, client_address)
+
+    def _process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def _reject(self, request):
+        try:
+            request.sendall(b"HTTP/1.0 503 Service Unavailable\r\n"
+                            b"Retry-After: 1\r\nContent-Length: 0\r\n\r\n")
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
 
 class SQLiteWebHandler(BaseHTTPRequestHandler):
+    # Таймаут сокета: клиент, не приславший запрос целиком, не держит поток вечно
+    timeout = DEFAULT_REQUEST_TIMEOUT
+    db_path = DB_PATH
+    query_timeout = DEFAULT_QUERY_TIMEOUT
+    row_cap = DEFAULT_ROW_CAP
+    pool = None  # ConnectionPool, создается в main()
+    row_counts = None  # RowCountCache
+    schema = None  # SchemaCache
+    results = QueryCache(max_entries=0)  # кэш результатов, настраивается в main()
+    active = ActiveQueries()  # выполняющиеся /execute, которые клиент может отменить
+    guard = None  # QueryGuard текущего HTTP-запроса
+    # Главная страница не меняется за время работы сервера: (ETag, {сжатие: тело})
+    _index_page = None
+
+    def query_guard(self):
+        """Бюджеты текущего HTTP-запроса; по умолчанию - только query_timeout"""
+        if self.guard is None:
+            self.guard = QueryGuard(time_budget=self.query_timeout)
+        return self.guard
+
+    @contextmanager
+    def read_connection(self):
+        with self.pool.reader() as conn, self.query_guard().attach(conn):
+            yield conn
+
+    @contextmanager
+    def write_connection(self):
+        with self.pool.writer() as conn, self.query_guard().attach(conn):
+            yield conn
+
+    def timeout_message(self, e):
+        return self.query_guard().error_message(e)
+
+    # --- HTTP-кэширование и сжатие ---
+
+    def version_etag(self, kind):
+        """
+        Слабый ETag ответа, зависящего от БД: 'schema' меняется только при изменении
+        схемы, 'data' - после любой фиксации изменений
+        """
+        version = self.pool.schema_version() if kind == 'schema' else self.pool.data_version()
+        return f'W/"{kind}-{self.pool.instance}-{version}"'
+
+    def not_modified(self, etag, cache_control='no-cache'):
+        """Отвечает 304, если у клиента уже есть версия etag"""
+        if not etag_matches(self.headers.get('If-None-Match'), etag):
+            return False
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        self.end_headers()
+        return True
+
+    def response_encoding(self, size=None):
+        if size is not None and size < COMPRESS_MIN_BYTES:
+            return None
+        return accepted_encoding(self.headers.get('Accept-Encoding'))
+
+    def _send_encoded(self, body, content_type, status, encoding, etag, cache_control):
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_body(self, body, content_type, status=200, etag=None, cache_control='no-store'):
+        """Ответ целиком, сжатый, если клиент это принимает"""
+        encoding = self.response_encoding(len(body))
+        if encoding:
+            body = compress_body(body, encoding)
+        self._send_encoded(body, content_type, status, encoding, etag, cache_control)
+
+    def send_json(self, obj, status=200, etag=None, cache_control='no-store'):
+        body = json.dumps(obj, ensure_ascii=False, default=json_default).encode('utf-8')
+        self.send_body(body, 'application/json; charset=utf-8', status, etag, cache_control)
+
+    def send_index(self):
+        """Главная страница: собирается и сжимается один раз, браузер держит ее STATIC_MAX_AGE"""
+        page = type(self)._index_page
+        if page is None:
+            body = self.get_index_html().encode('utf-8')
+            page = (f'W/"index-{hashlib.sha1(body).hexdigest()[:16]}"', {None: body})
+            type(self)._index_page = page
+        etag, variants = page
+
+        cache_control = f'public, max-age={STATIC_MAX_AGE}'
+        if self.not_modified(etag, cache_control):
+            return
+        encoding = self.response_encoding(len(variants[None]))
+        body = variants.get(encoding)
+        if body is None:
+            body = variants[encoding] = compress_body(variants[None], encoding)
+        self._send_encoded(body, 'text/html; charset=utf-8', 200, encoding, etag, cache_control)
+
     def do_GET(self):
         parsed = urlparse(self.path)
+        self.guard = None
 
         if parsed.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html; charset=utf-8')
-            self.end_headers()
-
-            html_content = self.get_index_html()
-            self.wfile.write(html_content.encode('utf-8'))
+            self.send_index()
 
         elif parsed.path == '/tables':
             self.send_tables_json()
@@ -30,30 +480,75 @@ class SQLiteWebHandler(BaseHTTPRequestHandler):
             params = parse_qs(parsed.query)
             limit = int(params.get('limit', [100])[0])
             offset = int(params.get('offset', [0])[0])
-            self.send_table_data(table_name, limit, offset)
+            cursor = params.get('cursor', [None])[0]
+            self.send_table_data(table_name, limit, offset, cursor)
 
         elif parsed.path == '/schema':
             self.send_schema_json()
 
+        elif parsed.path == '/stats':
+            self.send_json({'result_cache': self.results.stats()})
+
+        elif parsed.path == '/queries':
+            self.send_json({'queries': self.active.snapshot()})
+
+        elif parsed.path == '/advisor':
+            self.send_advisor_json()
+
         else:
             self.send_error(404, "Not Found")
 
     def do_POST(self):
+        self.guard = None
         if self.path == '/execute':
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length).decode('utf-8')
-            data = json.loads(post_data)
+            data = self.read_json_body()
+            if data is None:
+                return
             query = data.get('query', '')
 
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
+            # Клиент может сузить бюджеты сервера (но не расширить) и, передав query_id,
+            # отменить запрос через /cancel
+            try:
+                time_budget = client_limit(data.get('timeout'), self.query_timeout, self.query_timeout, float)
+                row_budget = client_limit(data.get('max_rows'), self.row_cap, self.row_cap, int)
+                limit = client_limit(data.get('limit'), min(STREAM_PAGE_ROWS, row_budget), row_budget, int)
+            except (TypeError, ValueError) as e:
+                self.send_json({'error': f"Некорректный параметр запроса: {e}"}, status=400)
+                return
+            self.guard = QueryGuard(time_budget=time_budget, row_budget=row_budget, sql=query)
+
+            with self.active.track(data.get('query_id'), self.guard):
+                if data.get('format') == 'ndjson':
+                    self.stream_query(query, limit, data.get('cursor'))
+                    return
+                result = self.execute_query(query)
+            self.send_json(dict(result, stats=self.guard.stats()))
 
-            result = self.execute_query(query)
-            self.wfile.write(json.dumps(result, ensure_ascii=False).encode('utf-8'))
+        elif self.path == '/cancel':
+            data = self.read_json_body()
+            if data is None:
+                return
+            self.send_json({'cancelled': self.active.cancel(str(data.get('query_id', '')))})
+
+        elif self.path == '/advisor/reset':
+            self.pool.statements.clear()
+            self.send_json({'reset': True})
         else:
             self.send_error(404, "Not Found")
 
+    def read_json_body(self):
+        """JSON-объект из тела POST; при ошибке отвечает 400 и возвращает None"""
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            data = json.loads(self.rfile.read(length).decode('utf-8')) if length else {}
+        except (ValueError, UnicodeDecodeError) as e:
+            self.send_json({'error': f"Некорректное тело запроса: {e}"}, status=400)
+            return None
+        if not isinstance(data, dict):
+            self.send_json({'error': "Тело запроса должно быть JSON-объектом"}, status=400)
+            return None
+        return data
+
     def get_index_html(self):
         return '''
         <!DOCTYPE html>
@@ -89,7 +584,7 @@ class SQLiteWebHandler(BaseHTTPRequestHandler):
             <div class="container">
                 <div class="header">
                     <h1>🧪 SQLite Browser - Экспертная система извлечения металлов</h1>
-                    <p>База данных: data/database.db</p>
+                    <p>База данных: __DB_PATH__</p>
                 </div>
 
                 <div class="sidebar">
@@ -107,6 +602,7 @@ class SQLiteWebHandler(BaseHTTPRequestHandler):
                         <span class="tab active" onclick="switchTab('query')">📝 SQL Запрос</span>
                         <span class="tab" onclick="switchTab('structure')">🏗️ Структура</span>
                         <span class="tab" onclick="switchTab('data')">👁️ Данные</span>
+                        <span class="tab" onclick="switchTab('advisor')">⚡ Индексы</span>
                     </div>
 
                     <div id="query-tab" class="tab-content active">
@@ -114,6 +610,7 @@ class SQLiteWebHandler(BaseHTTPRequestHandler):
                         <textarea id="sql-query" placeholder="Введите SQL запрос..."></textarea>
                         <div>
                             <button onclick="executeQuery()">▶ Выполнить</button>
+                            <button id="cancel-query" onclick="cancelQuery()" disabled>⏹ Отменить</button>
                             <button onclick="clearQuery()">🗑️ Очистить</button>
                             <button onclick="saveQuery()">💾 Сохранить</button>
                         </div>
@@ -125,6 +622,14 @@ class SQLiteWebHandler(BaseHTTPRequestHandler):
                         <div id="structure-content"></div>
                     </div>
 
+                    <div id="advisor-tab" class="tab-content">
+                        <h3>Планы запросов и индексы</h3>
+                        <p>Разбираются запросы, выполненные через этот интерфейс с момента запуска или сброса журнала.</p>
+                        <button onclick="loadAdvisor()">🔄 Обновить</button>
+                        <button onclick="resetAdvisor()">🗑️ Сбросить журнал</button>
+                        <div id="advisor-content"></div>
+                    </div>
+
                     <div id="data-tab" class="tab-content">
                         <h3>Просмотр данных</h3>
                         <div id="data-content">
@@ -148,6 +653,7 @@ class SQLiteWebHandler(BaseHTTPRequestHandler):
 
                     if (tabName === 'structure') loadStructure();
                     if (tabName === 'data' && currentTable) loadTableData(currentTable);
+                    if (tabName === 'advisor') loadAdvisor();
                 }
 
                 function loadTables() {
@@ -200,62 +706,230 @@ class SQLiteWebHandler(BaseHTTPRequestHandler):
                         });
                 }
 
-                function loadTableData(table) {
-                    fetch(`/table/${table}?limit=50`)
+                // Курсоры открытых страниц таблицы: назад - по стеку, вперед - по курсору сервера
+                let tablePages = [null];
+
+                function loadTableData(table, cursor) {
+                    if (cursor === undefined) tablePages = [null];
+                    let url = `/table/${encodeURIComponent(table)}?limit=50`;
+                    if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+                    fetch(url)
                         .then(r => r.json())
                         .then(data => {
                             const content = document.getElementById('data-content');
                             if (data.error) {
-                                content.innerHTML = `<div class="error">${data.error}</div>`;
+                                content.innerHTML = `<div class="error">${esc(data.error)}</div>`;
                                 return;
                             }
 
-                            let html = `<h4>${table} (${data.count} записей)</h4>`;
+                            const count = data.count_exact ? data.count : `≈${data.count}`;
+                            let html = `<h4>${esc(table)} (${count} записей, стр. ${tablePages.length})</h4>`;
                             if (data.rows.length > 0) {
                                 html += '<table>';
-                                html += '<tr>' + Object.keys(data.rows[0]).map(k => `<th>${k}</th>`).join('') + '</tr>';
+                                html += '<tr>' + Object.keys(data.rows[0]).map(k => `<th>${esc(k)}</th>`).join('') + '</tr>';
                                 data.rows.forEach(row => {
-                                    html += '<tr>' + Object.values(row).map(v => `<td>${v}</td>`).join('') + '</tr>';
+                                    html += '<tr>' + Object.values(row).map(v => `<td>${esc(v)}</td>`).join('') + '</tr>';
                                 });
                                 html += '</table>';
                             }
+                            html += '<div>';
+                            if (tablePages.length > 1) {
+                                html += '<button id="page-first">⏮ В начало</button><button id="page-prev">← Назад</button>';
+                            }
+                            if (data.next) html += '<button id="page-next">Далее →</button>';
+                            html += '</div>';
                             content.innerHTML = html;
+
+                            const bind = (id, handler) => {
+                                const btn = document.getElementById(id);
+                                if (btn) btn.onclick = handler;
+                            };
+                            bind('page-first', () => loadTableData(table));
+                            bind('page-prev', () => {
+                                tablePages.pop();
+                                loadTableData(table, tablePages[tablePages.length - 1]);
+                            });
+                            bind('page-next', () => {
+                                tablePages.push(data.next);
+                                loadTableData(table, data.next);
+                            });
                         });
                 }
 
+                // Строк на одну порцию потоковой выдачи (сервер ограничивает сверху)
+                const PAGE_ROWS = 500;
+                let streamedRows = 0;
+                // Идентификатор выполняющегося запроса - для отмены через /cancel
+                let currentQueryId = null;
+
+                function esc(v) {
+                    if (v === null) return '<i>NULL</i>';
+                    return String(v).replace(/[&<>]/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;'}[c]));
+                }
+
                 function executeQuery() {
                     const query = document.getElementById('sql-query').value.trim();
                     if (!query) return;
 
                     const resultDiv = document.getElementById('query-result');
                     resultDiv.innerHTML = '<p>Выполняю запрос...</p>';
+                    streamedRows = 0;
+                    streamQuery(query, null).catch(e => {
+                        resultDiv.innerHTML = `<div class="error"><b>Ошибка:</b> ${esc(e)}</div>`;
+                    });
+                }
+
+                // Результат приходит построчно (NDJSON): заголовок со столбцами, строки-массивы
+                // и итоговая запись; строки дорисовываются по мере получения
+                async function streamQuery(query, cursor) {
+                    const queryId = Date.now().toString(36) + Math.random().toString(36).slice(2);
+                    currentQueryId = queryId;
+                    document.getElementById('cancel-query').disabled = false;
+                    try {
+                        await readStream(query, cursor, queryId);
+                    } finally {
+                        if (currentQueryId === queryId) {
+                            currentQueryId = null;
+                            document.getElementById('cancel-query').disabled = true;
+                        }
+                    }
+                }
 
-                    fetch('/execute', {
+                function cancelQuery() {
+                    if (!currentQueryId) return;
+                    fetch('/cancel', {
                         method: 'POST',
                         headers: {'Content-Type': 'application/json'},
-                        body: JSON.stringify({query: query})
-                    })
-                    .then(r => r.json())
-                    .then(data => {
-                        if (data.error) {
-                            resultDiv.innerHTML = `<div class="error"><b>Ошибка:</b> ${data.error}</div>`;
-                        } else {
-                            let html = `<div class="success"><b>Успешно!</b> Записей: ${data.affected || 0}</div>`;
-                            if (data.results && data.results.length > 0) {
-                                html += '<table>';
-                                html += '<tr>' + Object.keys(data.results[0]).map(k => `<th>${k}</th>`).join('') + '</tr>';
-                                data.results.slice(0, 100).forEach(row => {
-                                    html += '<tr>' + Object.values(row).map(v => `<td>${v}</td>`).join('') + '</tr>';
-                                });
-                                html += '</table>';
-                                if (data.results.length > 100) {
-                                    html += `<p><small>Показано 100 из ${data.results.length} записей</small></p>`;
+                        body: JSON.stringify({query_id: currentQueryId})
+                    });
+                }
+
+                async function readStream(query, cursor, queryId) {
+                    const resultDiv = document.getElementById('query-result');
+                    const response = await fetch('/execute', {
+                        method: 'POST',
+                        headers: {'Content-Type': 'application/json'},
+                        body: JSON.stringify({query: query, format: 'ndjson', limit: PAGE_ROWS, cursor: cursor,
+                                              query_id: queryId})
+                    });
+
+                    const more = document.getElementById('load-more');
+                    if (more) more.remove();
+                    let tbody = cursor ? resultDiv.querySelector('tbody') : null;
+
+                    const reader = response.body.getReader();
+                    const decoder = new TextDecoder();
+                    let buffer = '';
+                    while (true) {
+                        const {value, done} = await reader.read();
+                        if (value) buffer += decoder.decode(value, {stream: true});
+                        const lines = buffer.split('\\n');
+                        buffer = done ? '' : lines.pop();
+
+                        let rowsHtml = '';
+                        for (const line of lines) {
+                            if (!line) continue;
+                            const msg = JSON.parse(line);
+                            if (Array.isArray(msg)) {
+                                rowsHtml += '<tr>' + msg.map(v => `<td>${esc(v)}</td>`).join('') + '</tr>';
+                                streamedRows++;
+                            } else if (msg.columns) {
+                                if (!tbody) {
+                                    resultDiv.innerHTML = '<div class="success" id="query-status">Загрузка...</div>' +
+                                        '<table><thead><tr>' + msg.columns.map(c => `<th>${esc(c)}</th>`).join('') +
+                                        '</tr></thead><tbody></tbody></table>';
+                                    tbody = resultDiv.querySelector('tbody');
                                 }
+                            } else if (msg.done) {
+                                if (rowsHtml && tbody) tbody.insertAdjacentHTML('beforeend', rowsHtml);
+                                rowsHtml = '';
+                                finishQuery(query, msg, tbody !== null);
                             }
-                            resultDiv.innerHTML = html;
-                            loadTables(); // Обновить список таблиц
                         }
-                    });
+                        if (rowsHtml && tbody) tbody.insertAdjacentHTML('beforeend', rowsHtml);
+                        if (done) break;
+                    }
+                }
+
+                function finishQuery(query, msg, hasTable) {
+                    const resultDiv = document.getElementById('query-result');
+                    const status = document.getElementById('query-status');
+
+                    if (msg.error) {
+                        const errorHtml = `<div class="error"><b>Ошибка:</b> ${esc(msg.error)}</div>`;
+                        if (hasTable) resultDiv.insertAdjacentHTML('beforeend', errorHtml);
+                        else resultDiv.innerHTML = errorHtml;
+                        if (status) status.innerHTML = `<b>Прервано.</b> Получено записей: ${streamedRows}`;
+                        return;
+                    }
+
+                    if (!hasTable) {
+                        // Изменяющий запрос: строк нет, только число затронутых записей
+                        resultDiv.innerHTML = `<div class="success"><b>Успешно!</b> Записей: ${msg.affected || 0}</div>`;
+                        loadTables(); // Обновить список таблиц
+                        return;
+                    }
+
+                    status.innerHTML = `<b>Успешно!</b> Записей: ${streamedRows}` + (msg.has_more ? ' (есть еще)' : '')
+                        + (msg.cached ? ' <small>(из кэша)</small>' : '')
+                        + (msg.stats ? ` <small>за ${msg.stats.elapsed_ms} мс</small>` : '');
+                    if (msg.has_more && msg.next) {
+                        resultDiv.insertAdjacentHTML('beforeend', '<button id="load-more">Загрузить еще</button>');
+                        document.getElementById('load-more').onclick = () => streamQuery(query, msg.next);
+                    } else if (msg.has_more) {
+                        resultDiv.insertAdjacentHTML('beforeend',
+                            `<p><small>Показаны первые ${streamedRows} записей</small></p>`);
+                    }
+                }
+
+                function loadAdvisor() {
+                    const content = document.getElementById('advisor-content');
+                    content.innerHTML = '<p>Разбираю планы...</p>';
+                    fetch('/advisor')
+                        .then(r => r.json())
+                        .then(report => {
+                            const problems = report.statements.filter(
+                                s => s.full_scans.length || s.temp_btrees.length || s.error);
+                            let html = `<h4>Запросы с полным просмотром или временным B-деревом: ${problems.length}
+                                        из ${report.statements.length}</h4>`;
+                            if (problems.length) {
+                                html += '<table><tr><th>Выполнений</th><th>Запрос</th><th>План</th></tr>';
+                                problems.forEach(s => {
+                                    html += `<tr><td>${s.count}</td><td><code>${esc(s.fingerprint)}</code></td>
+                                             <td><pre>${esc(s.error || s.plan.join('\\n'))}</pre></td></tr>`;
+                                });
+                                html += '</table>';
+                            }
+
+                            html += '<h4>Предлагаемые индексы</h4>';
+                            if (report.suggestions.length) {
+                                html += '<table><tr><th>Индекс</th><th>Строк на выполнение</th><th>Запросов</th><th>Оценка выигрыша</th></tr>';
+                                report.suggestions.forEach(s => {
+                                    const notes = (s.removes_sort ? ', без сортировки' : '') + (s.covering ? ', покрывающий' : '');
+                                    html += `<tr><td><code>${esc(s.sql)};</code></td>
+                                             <td>~${s.rows_before} → ~${s.rows_after}${notes}</td>
+                                             <td>${s.statements}</td><td>${s.benefit}</td></tr>`;
+                                });
+                                html += '</table>';
+                            } else {
+                                html += '<p>Нет</p>';
+                            }
+
+                            html += '<h4>Индексы, не использованные ни одним запросом</h4>';
+                            html += report.unused_indexes.length
+                                ? '<ul>' + report.unused_indexes.map(
+                                    u => `<li><code>${esc(u.index)}</code> ON ${esc(u.table)}(${esc(u.columns.join(', '))})</li>`
+                                  ).join('') + '</ul>'
+                                : '<p>Нет</p>';
+                            content.innerHTML = html;
+                        })
+                        .catch(e => {
+                            content.innerHTML = `<div class="error">Ошибка: ${esc(e.message)}</div>`;
+                        });
+                }
+
+                function resetAdvisor() {
+                    fetch('/advisor/reset', {method: 'POST'}).then(() => loadAdvisor());
                 }
 
                 function runQuery(query) {
@@ -285,117 +959,344 @@ class SQLiteWebHandler(BaseHTTPRequestHandler):
             </script>
         </body>
         </html>
-        '''
+        '''.replace('__DB_PATH__', html.escape(self.db_path))
 
     def send_tables_json(self):
         try:
-            conn = sqlite3.connect('data/database.db')
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = [row[0] for row in cursor.fetchall()]
-            conn.close()
-
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({'tables': tables}).encode('utf-8'))
+            etag = self.version_etag('schema')
+            if self.not_modified(etag):
+                return
+            with self.read_connection() as conn:
+                tables = self.schema.get(conn).table_names()
+
+            self.send_json({'tables': tables}, etag=etag, cache_control='no-cache')
         except Exception as e:
             self.send_error(500, str(e))
 
-    def send_table_data(self, table_name, limit=100, offset=0):
+    def _table_key(self, conn, table_name):
+        """
+        Ключ постраничного обхода: rowid, первичный ключ (WITHOUT ROWID) или, для
+        представлений, OFFSET. Возвращает (способ, список столбцов ключа).
+        """
+        info = self.schema.get(conn).tables.get(table_name)
+        if info is None:
+            raise ValueError(f"Таблица {table_name} не найдена")
+        if info.type == 'view':
+            return 'offset', []
+        if not info.without_rowid:
+            return 'rowid', ['rowid']
+        pk = info.pk_columns
+        return ('pk', pk) if pk else ('offset', [])
+
+    def send_table_data(self, table_name, limit=100, offset=0, cursor=None):
+        """
+        Страница таблицы по ключу (keyset): следующая страница продолжает с последнего
+        ключа, а не пропускает OFFSET строк, поэтому глубокие страницы не дороже первой.
+        """
         try:
-            conn = sqlite3.connect('data/database.db')
-            conn.row_factory = sqlite3.Row
-
-            # Получить количество записей
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT COUNT(*) as count FROM {table_name}")
-            count = cursor.fetchone()['count']
-
-            # Получить данные
-            cursor.execute(f"SELECT * FROM {table_name} LIMIT ? OFFSET ?", (limit, offset))
-            rows = [dict(row) for row in cursor.fetchall()]
-            conn.close()
-
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            etag = self.version_etag('data')
+            if self.not_modified(etag):
+                return
+            limit = max(1, min(limit, self.row_cap))
+            after = None
+            if cursor:
+                token = decode_token(cursor)
+                if token.get('t') != table_name:
+                    raise ValueError("Курсор относится к другой таблице")
+                after = token.get('k')
+                offset = int(token.get('o', 0))
+
+            with self.read_connection() as conn:
+                mode, key = self._table_key(conn, table_name)
+                table = quote_identifier(table_name)
+
+                # Получить количество записей (из кэша, пока данные не менялись)
+                count, count_exact = self.row_counts.get(conn, table_name)
+
+                # Получить данные: ключевые столбцы идут первыми и в ответ не попадают.
+                # OFFSET остается для представлений и старого параметра ?offset=
+                key_cols = ', '.join(col if mode == 'rowid' else quote_identifier(col) for col in key)
+                key_sql, where, params, order = '', '', [], ''
+                if mode != 'offset':
+                    key_sql, order = key_cols + ', ', f" ORDER BY {key_cols}"
+                    if after is not None:
+                        if len(after) != len(key):
+                            raise ValueError("Некорректный курсор продолжения")
+                        where = f" WHERE ({key_cols}) > ({', '.join('?' * len(key))})"
+                        params, offset = list(after), 0
+                tail = f"{order} LIMIT ? OFFSET ?"
+                tail_params = [limit + 1, offset]
+
+                rows_cursor = conn.execute(f"SELECT {key_sql}* FROM {table}{where}{tail}", params + tail_params)
+                n_key = len(key) if mode != 'offset' else 0
+                columns = [d[0] for d in rows_cursor.description][n_key:]
+                fetched = rows_cursor.fetchall()
+
+            page = fetched[:limit]
+            rows = [dict(zip(columns, row[n_key:])) for row in page]
+
+            next_cursor = None
+            if len(fetched) > limit:
+                if mode == 'offset':
+                    next_cursor = encode_token({'t': table_name, 'o': offset + limit})
+                else:
+                    next_cursor = encode_token({'t': table_name, 'k': list(page[-1][:n_key])})
+
+            self.send_json({
                 'count': count,
-                'rows': rows
-            }, ensure_ascii=False).encode('utf-8'))
+                'count_exact': count_exact,
+                'rows': rows,
+                'next': next_cursor
+            }, etag=etag, cache_control='no-cache')
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({'error': str(e)}).encode('utf-8'))
+            self.send_json({'error': self.timeout_message(e)}, status=500)
 
     def send_schema_json(self):
         try:
-            conn = sqlite3.connect('data/database.db')
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = [row[0] for row in cursor.fetchall()]
-
-            schema = {}
-            for table in tables:
-                cursor.execute(f"PRAGMA table_info({table})")
-                columns = cursor.fetchall()
-                schema[table] = [
-                    {
-                        'name': col[1],
-                        'type': col[2],
-                        'notnull': bool(col[3]),
-                        'dflt_value': col[4],
-                        'pk': bool(col[5])
-                    }
-                    for col in columns
-                ]
+            etag = self.version_etag('schema')
+            if self.not_modified(etag):
+                return
+            with self.read_connection() as conn:
+                schema = self.schema.get(conn).to_dict()
 
-            conn.close()
+            self.send_json(schema, etag=etag, cache_control='no-cache')
+        except Exception as e:
+            self.send_error(500, str(e))
 
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(schema).encode('utf-8'))
+    def send_advisor_json(self):
+        """Планы запросов, выполненных через веб-интерфейс, и предложения по индексам"""
+        try:
+            with self.read_connection() as conn:
+                report = analyze(conn, self.pool.statements.snapshot(), self.schema)
+            self.send_json(report)
         except Exception as e:
             self.send_error(500, str(e))
 
     def execute_query(self, query):
         try:
-            conn = sqlite3.connect('data/database.db')
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
             query_lower = query.lower().strip()
 
-            if query_lower.startswith('select'):
-                cursor.execute(query)
-                rows = cursor.fetchall()
-                return {
-                    'results': [dict(row) for row in rows],
-                    'affected': len(rows)
-                }
-            else:
-                cursor.execute(query)
+            if query_lower.startswith(READ_KEYWORDS):
+                # Версию данных берем до запроса: изменение во время него лишь сделает
+                # запись кэша устаревшей при следующем обращении
+                # Бюджет строк клиента (max_rows) входит в ключ: результат, обрезанный по
+                # чужому бюджету, не должен попасть другим клиентам
+                cacheable = self.results.enabled and is_cacheable(query)
+                if cacheable:
+                    row_budget = self.query_guard().row_budget or self.row_cap
+                    key, version = make_key(query, ('json', row_budget)), self.pool.data_version()
+                    cached = self.results.get(key, version)
+                    if cached is not None:
+                        return dict(cached, cached=True)
+                try:
+                    with self.read_connection() as conn:
+                        result = self._run_query(conn, query)
+                    # Обрезанный результат не кэшируется (как в DatabaseManager.execute_query)
+                    if cacheable and not result.get('has_more'):
+                        self.results.put(key, version, result, len(result.get('results', ())) or 1)
+                    return result
+                except sqlite3.OperationalError as e:
+                    # Например, PRAGMA с присваиванием или WITH ... DELETE - уходит писателю
+                    if 'readonly' not in str(e) and 'read-only' not in str(e):
+                        raise
+
+            with self.write_connection() as conn:
+                result = self._run_query(conn, query)
                 conn.commit()
-                return {'affected': cursor.rowcount}
+            if query_lower.startswith('analyze'):
+                # Статистика обновилась, а schema_version - нет
+                self.schema.invalidate()
+            return result
 
         except Exception as e:
-            return {'error': str(e)}
-        finally:
-            if 'conn' in locals():
-                conn.close()
+            return {'error': self.timeout_message(e)}
+
+    def _run_query(self, conn, query):
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(query)
+        if cursor.description is None:
+            return {'affected': cursor.rowcount}
+        # Не больше бюджета строк (row_cap) в памяти; полный результат - через потоковый режим
+        guard = self.query_guard()
+        if guard.row_budget is None:
+            guard.row_budget = self.row_cap
+        rows = guard.fetch_all(cursor)
+        result = {
+            'results': [dict(row) for row in rows],
+            'affected': len(rows)
+        }
+        if guard.truncated:
+            result['has_more'] = True
+        return result
+
+    # --- Потоковая выдача (NDJSON) ---
+
+    @staticmethod
+    def _query_hash(query):
+        return hashlib.sha1(query.strip().encode('utf-8')).hexdigest()[:16]
+
+    def _encode_cursor(self, query, offset):
+        return encode_token({'q': self._query_hash(query), 'o': offset})
+
+    def _decode_cursor(self, query, cursor):
+        token = decode_token(cursor)
+        try:
+            offset = int(token['o'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Некорректный курсор продолжения")
+        if token.get('q') != self._query_hash(query) or offset < 0:
+            raise ValueError("Курсор продолжения относится к другому запросу")
+        return offset
+
+    def stream_query(self, query, limit=None, cursor=None):
+        """
+        Результат построчно в NDJSON (HTTP/1.1 chunked): {"columns": [...]}, затем по строке
+        на запись (массив значений) и итог {"done": true, "rows": n, "has_more", "next"}.
+        Сервер читает курсор порциями, поэтому память не зависит от размера результата.
+        """
+        try:
+            offset = self._decode_cursor(query, cursor) if cursor else 0
+        except ValueError as e:
+            self._send_ndjson({'done': True, 'error': str(e)})
+            return
+        limit = max(1, min(int(limit or STREAM_PAGE_ROWS), self.row_cap))
+        query_lower = query.lower().strip()
+
+        if query_lower.startswith(READ_KEYWORDS):
+            cacheable = self.results.enabled and is_cacheable(query)
+            if cacheable:
+                key, version = make_key(query, ('ndjson', offset, limit)), self.pool.data_version()
+                cached = self.results.get(key, version)
+                if cached is not None:
+                    self._stream_rows(CachedRows(*cached), query, offset, limit, cached=True)
+                    return
+            sql = query
+            if offset:
+                sql = f"SELECT * FROM ({query.strip().rstrip(';')}) LIMIT -1 OFFSET {offset}"
+            try:
+                with self.read_connection() as conn:
+                    rows = conn.execute(sql)
+                    # Страница ограничена row_cap строками, поэтому ее можно сохранить целиком
+                    collected = [] if cacheable else None
+                    columns = [d[0] for d in rows.description or []]
+                    if self._stream_rows(rows, query, offset, limit, collect=collected) and cacheable:
+                        self.results.put(key, version, (columns, collected), len(collected) or 1)
+                    return
+            except sqlite3.OperationalError as e:
+                if 'readonly' not in str(e) and 'read-only' not in str(e):
+                    self._send_ndjson({'done': True, 'error': self.timeout_message(e)})
+                    return
+            except sqlite3.Error as e:
+                self._send_ndjson({'done': True, 'error': self.timeout_message(e)})
+                return
+
+        # Изменяющий запрос: без потоковой выдачи, итог одной строкой
+        result = dict(self.execute_query(query))
+        result.pop('results', None)
+        self._send_ndjson(dict(result, done=True))
+
+    def _send_ndjson(self, obj):
+        self.send_body(ndjson_line(obj), 'application/x-ndjson; charset=utf-8')
+
+    def _write_chunk(self, data, compressor=None):
+        if compressor is not None:
+            # SYNC_FLUSH: клиент может распаковать и показать строки, не дожидаясь конца
+            data = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+
+    def _stream_rows(self, cursor, query, offset, limit, collect=None, cached=False):
+        """
+        Выдача строк курсора; в collect (если задан) попадают отправленные строки и
+        строка-признак продолжения. Возвращает True, если результат выдан без ошибок.
+        """
+        # Chunked transfer есть только в HTTP/1.1; соединение после ответа закрываем
+        self.protocol_version = 'HTTP/1.1'
+        self.send_response(200)
+        self.send_header('Content-type', 'application/x-ndjson; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Vary', 'Accept-Encoding')
+        encoding = self.response_encoding()
+        compressor = None
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+            wbits = 16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS
+            compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, wbits)
+        self.end_headers()
+        self.close_connection = True
+
+        columns = [d[0] for d in cursor.description or []]
+        self._write_chunk(ndjson_line({'columns': columns}), compressor)
+
+        sent, has_more, error = 0, False, None
+        try:
+            while sent < limit:
+                rows = cursor.fetchmany(min(STREAM_FETCH_ROWS, limit - sent))
+                if not rows:
+                    break
+                if collect is not None:
+                    collect.extend(rows)
+                self.query_guard().rows += len(rows)
+                self._write_chunk(b''.join(ndjson_line(list(row)) for row in rows), compressor)
+                sent += len(rows)
+            else:
+                extra = cursor.fetchone()
+                has_more = extra is not None
+                if has_more and collect is not None:
+                    collect.append(extra)
+        except sqlite3.Error as e:
+            error = self.timeout_message(e)
+
+        summary = {'done': True, 'rows': sent, 'has_more': has_more, 'stats': self.query_guard().stats()}
+        if cached:
+            summary['cached'] = True
+        if has_more and query.lower().strip().startswith(PAGEABLE_KEYWORDS):
+            summary['next'] = self._encode_cursor(query, offset + sent)
+        if error:
+            summary['error'] = error
+        self._write_chunk(ndjson_line(summary), compressor)
+        if compressor is not None:
+            self._write_chunk(compressor.flush())
+        self.wfile.write(b"0\r\n\r\n")
+        return error is None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Веб-интерфейс для SQLite базы экспертной системы")
+    parser.add_argument('--db', default=DB_PATH, help="путь к файлу базы данных")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="потоков-обработчиков (0 - однопоточный режим)")
+    parser.add_argument('--backlog', type=int, default=DEFAULT_BACKLOG,
+                        help="запросов в очереди сверх занятых потоков, далее - 503")
+    parser.add_argument('--request-timeout', type=float, default=DEFAULT_REQUEST_TIMEOUT,
+                        help="таймаут чтения запроса от клиента, с")
+    parser.add_argument('--query-timeout', type=float, default=DEFAULT_QUERY_TIMEOUT,
+                        help="предельное время выполнения SQL, с")
+    parser.add_argument('--row-cap', type=int, default=DEFAULT_ROW_CAP,
+                        help="предельное число строк в одном ответе /execute")
+    parser.add_argument('--result-cache', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="записей в кэше результатов читающих запросов (0 - без кэша)")
+    parser.add_argument('--save-sql', metavar='PATH',
+                        help="сохранить журнал выполненных запросов при остановке "
+                             "(разбор: scripts/query_advisor.py)")
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
+    db_path = args.db
+
     # Проверяем наличие базы данных
-    if not os.path.exists('data/database.db'):
-        print("⚠️  База данных не найдена: data/database.db")
+    if not os.path.exists(db_path):
+        print(f"⚠️  База данных не найдена: {db_path}")
         print("Создаю структуру...")
-        os.makedirs('data', exist_ok=True)
-        conn = sqlite3.connect('data/database.db')
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(db_path)
 
         # Создаем таблицы как в вашем проекте
         conn.execute('''
@@ -466,14 +1367,29 @@ def main():
         conn.close()
         print("✅ База данных создана с тестовыми данными")
 
+    SQLiteWebHandler.db_path = db_path
+    SQLiteWebHandler.pool = ConnectionPool(db_path, size=args.workers, statements=StatementLog())
+    SQLiteWebHandler.schema = SchemaCache()
+    SQLiteWebHandler.row_counts = RowCountCache(SQLiteWebHandler.pool, SQLiteWebHandler.schema)
+    SQLiteWebHandler.timeout = args.request_timeout
+    SQLiteWebHandler.query_timeout = args.query_timeout
+    SQLiteWebHandler.row_cap = args.row_cap
+    SQLiteWebHandler.results = QueryCache(max_entries=args.result_cache)
+
     # Запускаем сервер
-    server_address = ('localhost', 8080)
-    httpd = HTTPServer(server_address, SQLiteWebHandler)
+    server_address = (args.host, args.port)
+    if args.workers > 0:
+        httpd = PooledHTTPServer(server_address, SQLiteWebHandler, args.workers, args.backlog)
+        mode = f"потоков: {args.workers}, очередь: {args.backlog}"
+    else:
+        httpd = HTTPServer(server_address, SQLiteWebHandler)
+        mode = "однопоточный"
 
     print("=" * 60)
     print("🌐 SQLite Web Browser запущен!")
-    print("📁 База данных: data/database.db")
-    print("🔗 Откройте в браузере: http://localhost:8080")
+    print(f"📁 База данных: {db_path}")
+    print(f"⚙️  Режим: {mode}, таймаут SQL: {args.query_timeout} с")
+    print(f"🔗 Откройте в браузере: http://{args.host}:{args.port}")
     print("🛑 Для остановки нажмите Ctrl+C")
     print("=" * 60)
 
@@ -481,6 +1397,11 @@ def main():
         httpd.serve_forever()
     except KeyboardInterrupt:
         print("\n👋 Сервер остановлен")
+    finally:
+        httpd.server_close()
+        SQLiteWebHandler.pool.close()
+        if args.save_sql:
+            print(f"📝 Журнал запросов: {SQLiteWebHandler.pool.statements.save(args.save_sql)}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,79 @@
+# tests/test_sqlite_web.py
+import json
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from http.server import HTTPServer
+from pathlib import Path
+from urllib.request import Request, urlopen
+
+from app.core.query_advisor import StatementLog
+from app.core.query_cache import QueryCache
+from app.core.schema_cache import SchemaCache
+import sqlite_web
+
+BATCHES = 30
+
+
+class ResultCacheTest(unittest.TestCase):
+    """Кэш результатов /execute и бюджет строк клиента (max_rows)"""
+
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp(prefix='sqlite_web_'))
+        db_path = str(self.workdir / 'test.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE batches (batch_id TEXT PRIMARY KEY)")
+        conn.executemany("INSERT INTO batches VALUES (?)", [(f"B{i:03d}",) for i in range(BATCHES)])
+        conn.commit()
+        conn.close()
+
+        # Отдельный класс обработчика: настройки сервера - атрибуты класса
+        pool = sqlite_web.ConnectionPool(db_path, size=1, statements=StatementLog())
+        schema = SchemaCache()
+        handler = type('Handler', (sqlite_web.SQLiteWebHandler,), {
+            'db_path': db_path,
+            'pool': pool,
+            'schema': schema,
+            'row_counts': sqlite_web.RowCountCache(pool, schema),
+            'results': QueryCache(max_entries=16),
+            'log_message': lambda *args: None,
+        })
+        self.httpd = HTTPServer(('127.0.0.1', 0), handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+        self.httpd.RequestHandlerClass.pool.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def execute(self, **body):
+        request = Request(f"http://127.0.0.1:{self.httpd.server_port}/execute",
+                          data=json.dumps(body).encode('utf-8'), method='POST',
+                          headers={'Content-Type': 'application/json'})
+        with urlopen(request, timeout=10) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+    def test_truncated_result_is_not_served_to_other_clients(self):
+        query = "SELECT batch_id FROM batches ORDER BY batch_id"
+
+        limited = self.execute(query=query, max_rows=5)
+        self.assertEqual(len(limited['results']), 5)
+        self.assertTrue(limited.get('has_more'))
+
+        full = self.execute(query=query)
+        self.assertEqual(len(full['results']), BATCHES)
+        self.assertFalse(full.get('has_more'))
+        self.assertFalse(full.get('cached'))
+
+        # Полный результат кэшируется, но не отдается клиенту с меньшим бюджетом
+        self.assertTrue(self.execute(query=query).get('cached'))
+        self.assertEqual(len(self.execute(query=query, max_rows=5)['results']), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()